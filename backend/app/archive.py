@@ -0,0 +1,208 @@
+"""Streaming project export/import as one tar archive.
+
+Export yields the archive in chunks as it is produced, so a multi-GB project
+moves with constant memory and nothing is staged on disk. The manifest and the
+stores (snapshot + operation log per store) go first, read together under the
+project lock so they are consistent with each other. They are small. The
+immutable assets (OCR JSON, ``original.pdf`` and, unless excluded, the page
+PNGs) follow and are streamed straight from their files, ``CHUNK_SIZE`` at a
+time. The tar stream is written by hand (header, data, padding) because
+``tarfile`` buffers a whole member before it can be handed on. Optional gzip
+goes through one ``zlib`` compressor. The last member, ``export.json``, counts
+the members before it, so a truncated upload is rejected rather than imported
+as a partial project.
+
+Import reads the archive in one pass (``tarfile`` stream mode, plain or
+gzipped) from a callable returning the next body chunk, and extracts each
+member straight to disk. Only the layout a project has is accepted (no links,
+absolute paths or ``..``). The files land in a temporary directory that is
+renamed into place under a new project id once the archive has been read
+completely. An archive without page rasters is complete: pages render from
+``original.pdf`` on first view (see ``ingest.render_page``).
+
+Tar rather than zip because a zip's index sits at the end of the file, so it
+cannot be read in one pass from a request body.
+"""
+
+from __future__ import annotations
+
+import io, os, re, shutil, tarfile, time, uuid, zlib
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from . import codec, oplog
+from .graph_index import STORE_FILENAMES
+from .ingest import is_processing, project_dir, read_manifest, write_manifest
+from .locks import dir_lock
+
+CHUNK_SIZE = 1 << 20
+TRAILER = "export.json"
+ARCHIVE_DIRS = ("ocr", "pages")
+_ASSET_NAME = re.compile(r"^(?:pages/page_\d+\.png|ocr/page_\d+\.json|original\.pdf)$")
+
+
+def _mutable_names() -> List[str]:
+    names = ["manifest.json"]
+    for filename in STORE_FILENAMES.values():
+        names += [filename, os.path.basename(oplog.log_path(filename))]
+    return names
+
+
+def _tar_header(name: str, size: int, mtime: float) -> bytes:
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = int(mtime)
+    info.mode = 0o644
+    return info.tobuf(tarfile.PAX_FORMAT)
+
+
+def _padding(size: int) -> bytes:
+    return b"\0" * (-size % tarfile.BLOCKSIZE)
+
+
+def _asset_files(pdir: str, rasters: bool) -> Iterator[str]:
+    if os.path.exists(os.path.join(pdir, "original.pdf")):
+        yield "original.pdf"
+    for sub in ARCHIVE_DIRS:
+        if sub == "pages" and not rasters:
+            continue
+        d = os.path.join(pdir, sub)
+        if os.path.isdir(d):
+            for name in sorted(os.listdir(d)):
+                if _ASSET_NAME.match(f"{sub}/{name}"):
+                    yield f"{sub}/{name}"
+
+
+def _tar_stream(pdir: str, project_id: str, rasters: bool) -> Iterator[bytes]:
+    with dir_lock(pdir):
+        mutable: List[Tuple[str, bytes]] = []
+        for name in _mutable_names():
+            try:
+                with open(os.path.join(pdir, name), "rb") as f:
+                    mutable.append((name, f.read()))
+            except FileNotFoundError:
+                continue
+    now = time.time()
+    files = 0
+    for name, data in mutable:
+        files += 1
+        yield _tar_header(name, len(data), now) + data + _padding(len(data))
+    for name in _asset_files(pdir, rasters):
+        files += 1
+        with open(os.path.join(pdir, name), "rb") as f:
+            st = os.fstat(f.fileno())
+            yield _tar_header(name, st.st_size, st.st_mtime)
+            remaining = st.st_size
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise OSError(f"{name} shrank while exporting")
+                remaining -= len(chunk)
+                yield chunk
+            if st.st_size % tarfile.BLOCKSIZE:
+                yield _padding(st.st_size)
+    trailer = codec.encode({"project_id": project_id, "files": files, "rasters": rasters, "exported_at": now}, "json")
+    yield _tar_header(TRAILER, len(trailer), now) + trailer + _padding(len(trailer))
+    yield b"\0" * (2 * tarfile.BLOCKSIZE)
+
+
+def export_archive(project_id: str, rasters: bool = True, compress: bool = False) -> Iterator[bytes]:
+    """Yield the project as a tar (or .tar.gz) archive, chunk by chunk."""
+    m = read_manifest(project_id)
+    if m is None:
+        raise FileNotFoundError(project_id)
+    if is_processing(m):
+        raise ValueError("Project is still being processed")
+    stream = _tar_stream(os.path.abspath(project_dir(project_id)), project_id, rasters)
+    if not compress:
+        return stream
+    return _gzip(stream)
+
+
+def _gzip(stream: Iterator[bytes]) -> Iterator[bytes]:
+    z = zlib.compressobj(1, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in stream:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+class _ChunkReader(io.RawIOBase):
+    """Read-only file over a `next_chunk()` callable returning b"" at the end."""
+
+    def __init__(self, next_chunk: Callable[[], bytes]):
+        self._next = next_chunk
+        self._buf = b""
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buf and not self._eof:
+            self._buf = self._next()
+            self._eof = not self._buf
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+
+def _member_path(root: str, member: tarfile.TarInfo) -> str:
+    name = member.name
+    while name.startswith("./"):
+        name = name[2:]
+    if not (name in _mutable_names() or _ASSET_NAME.match(name)):
+        raise ValueError(f"Unexpected archive member: {member.name}")
+    if not member.isfile():
+        raise ValueError(f"Archive member is not a regular file: {member.name}")
+    return os.path.join(root, *name.split("/"))
+
+
+def import_archive(next_chunk: Callable[[], bytes]) -> Dict[str, Any]:
+    """Create a new project from an archive read through `next_chunk`.
+
+    Raises ValueError for anything that is not a project archive; nothing is
+    left behind in that case.
+    """
+    new_id = uuid.uuid4().hex
+    final = os.path.abspath(project_dir(new_id))
+    tmp = os.path.join(os.path.dirname(final), f".tmp-import-{new_id}")
+    os.makedirs(tmp)
+    files = 0
+    total = 0
+    trailer = None
+    try:
+        try:
+            with tarfile.open(fileobj=io.BufferedReader(_ChunkReader(next_chunk), CHUNK_SIZE), mode="r|*") as tar:
+                for member in tar:
+                    if member.isdir():
+                        continue
+                    if member.name == TRAILER and member.isfile():
+                        trailer = codec.decode(tar.extractfile(member).read())
+                        continue
+                    dst = _member_path(tmp, member)
+                    os.makedirs(os.path.dirname(dst), exist_ok=True)
+                    with tar.extractfile(member) as src, open(dst, "wb") as out:
+                        shutil.copyfileobj(src, out, CHUNK_SIZE)
+                    files += 1
+                    total += member.size
+        except (tarfile.TarError, EOFError, zlib.error) as e:
+            raise ValueError(f"Not a readable project archive: {e}")
+        if trailer is None or trailer.get("files") != files:
+            raise ValueError("Archive is incomplete (truncated upload?)")
+        manifest_file = os.path.join(tmp, "manifest.json")
+        if not os.path.exists(manifest_file):
+            raise ValueError("Archive has no manifest.json")
+        m = codec.read_file(manifest_file)
+        source_id = m.get("project_id")
+        os.replace(tmp, final)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    m.update(project_id=new_id, imported_from=source_id)
+    write_manifest(new_id, m)
+    return {"project_id": new_id, "files": files, "bytes": total}
+
+
+__all__ = ["export_archive", "import_archive", "CHUNK_SIZE"]
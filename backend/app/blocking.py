@@ -0,0 +1,42 @@
+"""Running blocking store and file work from async endpoints.
+
+Store calls parse JSON, take the project lock (a writer holds it for the whole
+of a batch) and touch the disk. Called directly from an ``async def`` handler,
+any of these would stall the event loop and every other client with it.
+Endpoints therefore await :func:`run_blocking` instead. It runs the call on a
+worker thread, at most ``TIMBERGEM_IO_THREADS`` (default 32) at a time per
+event loop. This pool is separate from the one Starlette uses for streaming
+responses, so long downloads cannot starve store requests.
+"""
+
+from __future__ import annotations
+
+import functools, os
+from typing import Any, Callable, TypeVar
+
+import anyio
+from anyio.lowlevel import RunVar
+
+T = TypeVar("T")
+
+IO_THREADS = int(os.environ.get("TIMBERGEM_IO_THREADS", "32"))
+
+# Limiters belong to one event loop (TestClient starts several)
+_limiter: RunVar[anyio.CapacityLimiter] = RunVar("timbergem_io_limiter")
+
+
+def _io_limiter() -> anyio.CapacityLimiter:
+    try:
+        return _limiter.get()
+    except LookupError:
+        limiter = anyio.CapacityLimiter(IO_THREADS)
+        _limiter.set(limiter)
+        return limiter
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await `fn(*args, **kwargs)` run on the bounded store I/O thread pool."""
+    return await anyio.to_thread.run_sync(functools.partial(fn, *args, **kwargs), limiter=_io_limiter())
+
+
+__all__ = ["run_blocking", "IO_THREADS"]
@@ -0,0 +1,187 @@
+"""Per-project change feed with a monotonic revision.
+
+Every committed transaction appends one line per changed record to
+``projects/{id}/changes.log.jsonl``::
+
+    {"rev": 42, "store": "entities", "id": "...", "op": "upsert" | "delete"}
+
+Revisions are consecutive integers that survive restarts (the current revision
+is the last one in the file). A ``{"rev": n, "op": "reset"}`` line means that
+nothing is known about changes up to and including ``n``: it is written when a
+whole store is replaced (``save_*``) and when the log is trimmed. Clients that
+ask for changes since a revision below the latest reset must reload in full.
+
+The feed is tail-read: each process remembers how far into the file it has
+parsed and only reads the bytes appended since, so changes committed by other
+workers sharing the projects directory show up too. Writers hold the project
+lock (see locks.py) while appending.
+"""
+
+from __future__ import annotations
+
+import bisect, json, os, threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+CHANGES_FILENAME = "changes.log.jsonl"
+UPSERT = "upsert"
+DELETE = "delete"
+RESET = "reset"
+
+# Keep at most this many entries; older ones are folded into a reset marker.
+MAX_ENTRIES = int(os.environ.get("TIMBERGEM_CHANGES_MAX", "20000"))
+
+
+class Entry(NamedTuple):
+    rev: int
+    store: str
+    id: str
+    op: str
+
+
+class TailedLog:
+    """In-memory state folded from a shared JSONL file, kept current by tail-reading.
+
+    Subclasses implement ``_reset_state`` (forget everything) and ``_apply``
+    (fold in one parsed line). Appends and rewrites happen under the project
+    lock; readers only ever consume whole lines.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._offset = 0
+        self._ino: Optional[int] = None
+        self.lock = threading.RLock()
+        self._reset_state()
+
+    def _reset_state(self) -> None:
+        raise NotImplementedError
+
+    def _apply(self, rec: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def refresh(self) -> None:
+        """Parse whatever was appended to the file since the last call."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            if self._ino is not None:
+                self._reset_state()
+                self._offset, self._ino = 0, None
+            return
+        if st.st_ino != self._ino or st.st_size < self._offset:
+            # replaced (trimmed) or truncated: re-read from the start
+            self._reset_state()
+            self._offset, self._ino = 0, st.st_ino
+        if st.st_size == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(st.st_size - self._offset)
+        end = chunk.rfind(b"\n") + 1  # only whole lines; a writer may be mid-append
+        for line in chunk[:end].splitlines():
+            if line.strip():
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError):
+                    continue
+        self._offset += end
+
+    def _append(self, records: List[Dict[str, Any]]) -> None:
+        payload = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records).encode()
+        with open(self.path, "ab") as f:
+            f.write(payload)
+
+    def _rewrite(self, records: List[Dict[str, Any]]) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            for rec in records:
+                f.write(json.dumps(rec, separators=(",", ":")) + "\n")
+        os.replace(tmp, self.path)
+        self._ino = None
+        self.refresh()
+
+
+class ChangeFeed(TailedLog):
+    """In-memory mirror of one project's changes log."""
+
+    def _reset_state(self) -> None:
+        self.entries: List[Entry] = []
+        self.revision = 0
+        self.floor = 0  # changes with rev <= floor are unknown
+
+    def _apply(self, rec: Dict[str, Any]) -> None:
+        rev = int(rec["rev"])
+        if rec.get("op") == RESET:
+            self.floor = max(self.floor, rev)
+            self.entries = [e for e in self.entries if e.rev > rev]
+        else:
+            self.entries.append(Entry(rev, rec["store"], rec["id"], rec["op"]))
+        self.revision = max(self.revision, rev)
+
+    def record(self, changes: List[Tuple[str, str, str]]) -> int:
+        """Append (store, id, op) entries under consecutive new revisions.
+
+        Callers hold the project lock, so no other writer can claim the same
+        revisions in between the refresh and the append.
+        """
+        with self.lock:
+            self.refresh()
+            if not changes:
+                return self.revision
+            base = self.revision
+            records = [
+                {"rev": base + i + 1, "store": store, "id": obj_id, "op": op}
+                for i, (store, obj_id, op) in enumerate(changes)
+            ]
+            self._append(records)
+            self.refresh()
+            if len(self.entries) > MAX_ENTRIES:
+                self._trim()
+            return self.revision
+
+    def record_reset(self) -> int:
+        with self.lock:
+            self.refresh()
+            self._append([{"rev": self.revision + 1, "op": RESET}])
+            self.refresh()
+            return self.revision
+
+    def current(self) -> int:
+        with self.lock:
+            self.refresh()
+            return self.revision
+
+    def _trim(self) -> None:
+        keep = self.entries[-(MAX_ENTRIES // 2):]
+        floor = keep[0].rev - 1
+        self._rewrite([{"rev": floor, "op": RESET}] + [e._asdict() for e in keep])
+
+    def since(self, rev: int) -> Tuple[int, bool, List[Entry]]:
+        """(current revision, reset needed, latest entry per record after `rev`)."""
+        with self.lock:
+            self.refresh()
+            if rev < self.floor or rev > self.revision:
+                return self.revision, True, []
+            # Entries are in revision order; the tail after `rev` is all we look at
+            i = bisect.bisect_right(self.entries, rev, key=lambda e: e.rev)
+            latest: Dict[Tuple[str, str], Entry] = {}
+            for e in self.entries[i:]:
+                latest.pop((e.store, e.id), None)
+                latest[(e.store, e.id)] = e
+            return self.revision, False, list(latest.values())
+
+
+_feeds: Dict[str, ChangeFeed] = {}
+_feeds_lock = threading.Lock()
+
+
+def get_feed(pdir: str) -> ChangeFeed:
+    pdir = os.path.abspath(pdir)
+    with _feeds_lock:
+        feed = _feeds.get(pdir)
+        if feed is None:
+            feed = _feeds[pdir] = ChangeFeed(os.path.join(pdir, CHANGES_FILENAME))
+        return feed
+
+
+__all__ = ["TailedLog", "ChangeFeed", "Entry", "get_feed", "CHANGES_FILENAME", "UPSERT", "DELETE", "RESET"]
@@ -8,7 +8,7 @@ knowledge graph edges according to the PRD schema.
 from __future__ import annotations
 
 from pydantic import BaseModel, Field, validator
-from typing import Literal, Union, Optional
+from typing import List, Literal, Union, Optional
 import time
 
 
@@ -34,6 +34,9 @@ class Scope(BaseConcept):
 
 ConceptUnion = Union[Space, Scope]
 
+# kind discriminator -> concrete class (used when hydrating stored dicts)
+CONCEPT_CLASSES = {"space": Space, "scope": Scope}
+
 
 class CreateSpace(BaseModel):
     kind: Literal["space"]
@@ -63,16 +66,55 @@ class CreateRelationship(BaseModel):
     target_id: str
 
 
+class LinkBatchRequest(BaseModel):
+    """Bulk link edit: deletes are applied first, then creates, all-or-nothing."""
+    create: List[CreateRelationship] = Field(default_factory=list)
+    delete: List[str] = Field(default_factory=list)
+
+
+class LinkBatchResponse(BaseModel):
+    created: List[Relationship]
+    deleted: List[str]
+
+
+class TraversalStep(BaseModel):
+    """One hop of a traversal pattern (see traversal.py).
+
+    `edge` is a link rel_type or a reference field: a raw field name such as
+    ``instantiated_in_id`` or one of the short aliases ``definition``,
+    ``item``, ``instantiated_in``, ``defined_in``, ``drawing`` and ``parent``.
+    `then` branches: every sub-step starts from the nodes this step reached.
+    """
+    edge: str
+    direction: Literal["out", "in", "any"] = "out"
+    kinds: Optional[List[str]] = None  # keep only neighbours of these types/kinds
+    then: List["TraversalStep"] = Field(default_factory=list)
+
+
+class TraversalRequest(BaseModel):
+    start: List[str] = Field(..., min_length=1)
+    # Without steps every edge is followed in both directions, up to max_depth hops
+    steps: Optional[List[TraversalStep]] = None
+    max_depth: int = Field(3, ge=1, le=8)
+    max_fanout: int = Field(200, ge=1, le=10000)
+    max_nodes: int = Field(5000, ge=1, le=50000)
+
+
 __all__ = [
     "BaseConcept",
     "Space",
     "Scope",
     "ConceptUnion",
+    "CONCEPT_CLASSES",
     "CreateSpace",
     "CreateScope",
     "CreateConceptUnion",
     "Relationship",
     "CreateRelationship",
+    "LinkBatchRequest",
+    "LinkBatchResponse",
+    "TraversalStep",
+    "TraversalRequest",
 ]
 
 
@@ -2,13 +2,16 @@
 
 Stores JSON array under projects/{project_id}/concepts.json
 Each concept is stored as its dict representation (already validated by Pydantic).
+Mutations are appended to concepts.log.jsonl (see oplog.py).
 """
 
 from __future__ import annotations
 
-import os, json, uuid
+import os, uuid
 from typing import List
 from .ingest import project_dir
+from .locks import locked, read_lock
+from .graph_index import get_index, commit, transaction, Change, CONCEPTS, replace_store
 from .concepts_models import (
     ConceptUnion,
     CreateConceptUnion,
@@ -25,43 +28,19 @@ def concepts_path(project_id: str) -> str:
 
 
 def load_concepts(project_id: str) -> List[ConceptUnion]:
-    path = concepts_path(project_id)
-    if not os.path.exists(path):
-        return []
-    with open(path) as f:
-        raw = json.load(f)
-    concepts: List[ConceptUnion] = []
-    for item in raw:
-        kind = item.get("kind")
-        cls = {
-            "space": Space,
-            "scope": Scope,
-        }.get(kind)
-        if not cls:
-            continue
-        try:
-            concepts.append(cls(**item))
-        except Exception:
-            continue
-    return concepts
-
-
-def _atomic_write(path: str, data):
-    tmp = path + ".tmp"
-    with open(tmp, "w") as f:
-        json.dump(data, f, indent=2)
-    os.replace(tmp, path)
+    idx = get_index(project_id)
+    with read_lock(idx.pdir):
+        return list(idx.concepts.values())
 
 
+@locked
 def save_concepts(project_id: str, concepts: List[ConceptUnion]):
-    os.makedirs(project_dir(project_id), exist_ok=True)
-    path = concepts_path(project_id)
-    serializable = [c.dict() for c in concepts]
-    _atomic_write(path, serializable)
+    """Rewrite the whole store (snapshot) and drop its log."""
+    replace_store(project_id, CONCEPTS, [c.dict() for c in concepts])
 
 
+@locked
 def create_concept(project_id: str, payload: CreateConceptUnion) -> ConceptUnion:
-    concepts = load_concepts(project_id)
     new_id = uuid.uuid4().hex
     base_kwargs = {
         "id": new_id,
@@ -72,11 +51,11 @@ def create_concept(project_id: str, payload: CreateConceptUnion) -> ConceptUnion
         ent = Scope(**base_kwargs, description=getattr(payload, "description"), category=getattr(payload, "category", None))
     else:
         raise ValueError("Unsupported concept kind")
-    concepts.append(ent)
-    save_concepts(project_id, concepts)
+    commit(project_id, [Change(CONCEPTS, ent.id, None, ent)])
     return ent
 
 
+@locked
 def update_concept(
     project_id: str,
     concept_id: str,
@@ -85,15 +64,9 @@ def update_concept(
     description: str | None = None,
     category: str | None = None,
 ) -> ConceptUnion:
-    concepts = load_concepts(project_id)
-    found = None
-    for i, c in enumerate(concepts):
-        if getattr(c, "id", None) == concept_id:
-            found = (i, c)
-            break
-    if not found:
+    current = get_index(project_id).concepts.get(concept_id)
+    if current is None:
         raise ValueError("Concept not found")
-    idx, current = found
     data = current.dict()
     if data["kind"] == "space":
         if name is not None:
@@ -108,31 +81,24 @@ def update_concept(
     else:
         raise ValueError("Unsupported concept kind")
     updated = cls(**data)
-    concepts[idx] = updated
-    save_concepts(project_id, concepts)
+    commit(project_id, [Change(CONCEPTS, concept_id, current, updated)])
     return updated
 
 
+@locked
 def delete_concept(project_id: str, concept_id: str) -> bool:
     # CASCADE: Delete any links referencing this concept
     # Local import to avoid circular dependency
-    from .links_store import load_links, save_links  # type: ignore
-
-    links = load_links(project_id)
-    # Filter out links that reference the concept being deleted
-    filtered_links = [
-        l for l in links 
-        if getattr(l, "source_id", None) != concept_id and getattr(l, "target_id", None) != concept_id
-    ]
-    if len(filtered_links) < len(links):
-        # Some links were removed, save the updated list
-        save_links(project_id, filtered_links)
-    
-    concepts = load_concepts(project_id)
-    new_concepts = [c for c in concepts if getattr(c, "id", None) != concept_id]
-    if len(new_concepts) == len(concepts):
-        return False
-    save_concepts(project_id, new_concepts)
+    from .links_store import delete_links_for  # type: ignore
+
+    # One transaction, so the cascade is persisted (and undone) with the delete
+    with transaction(project_id):
+        delete_links_for(project_id, concept_id)
+
+        current = get_index(project_id).concepts.get(concept_id)
+        if current is None:
+            return False
+        commit(project_id, [Change(CONCEPTS, concept_id, current, None)])
     return True
 
 
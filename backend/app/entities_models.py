@@ -370,6 +370,24 @@ EntityUnion = Union[
 ]
 
 
+# entity_type discriminator -> concrete class (used when hydrating stored dicts)
+ENTITY_CLASSES: Dict[str, type] = {
+    "drawing": Drawing,
+    "legend": Legend,
+    "legend_item": LegendItem,
+    "schedule": Schedule,
+    "schedule_item": ScheduleItem,
+    "assembly_group": AssemblyGroup,
+    "assembly": Assembly,
+    "note": Note,
+    "scope": Scope,
+    "symbol_definition": SymbolDefinition,
+    "component_definition": ComponentDefinition,
+    "symbol_instance": SymbolInstance,
+    "component_instance": ComponentInstance,
+}
+
+
 class CreateEntityBase(BaseModel):
     status: Optional[StatusLiteral] = None
     validation: Optional[ValidationInfo] = None
@@ -624,6 +642,37 @@ CreateEntityUnion = Annotated[
     Field(discriminator='entity_type')
 ]
 
+class EntityBatchOperation(BaseModel):
+    """One step of an entities batch.
+
+    `create` takes a CreateEntityUnion payload in `data` and may name the new
+    entity with `ref`; `update` takes PATCH fields in `data`; `delete` only needs
+    `id`. Any `id` or `*_id` value of the form "$<ref>" resolves to the entity
+    created earlier in the same batch under that ref.
+    """
+    op: Literal["create", "update", "delete"]
+    ref: Optional[str] = None
+    id: Optional[str] = None
+    data: Dict[str, Any] = Field(default_factory=dict)
+
+
+class EntityBatchRequest(BaseModel):
+    operations: List[EntityBatchOperation]
+
+
+class EntityBatchResult(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: str
+    ref: Optional[str] = None
+    entity: Optional[EntityUnion] = None  # None for deletes
+    # Derived fields re-resolved on other entities: {"id", "field", "before", "after"}
+    recomputed: List[Dict[str, Any]] = Field(default_factory=list)
+
+
+class EntityBatchResponse(BaseModel):
+    results: List[EntityBatchResult]
+
+
 __all__ = [
     "BoundingBox",
     "BaseVisualEntity",
@@ -644,6 +693,7 @@ __all__ = [
     "SymbolInstance",
     "ComponentInstance",
     "EntityUnion",
+    "ENTITY_CLASSES",
     "CreateEntityUnion",
     "CreateDrawing",
     "CreateLegend",
@@ -658,4 +708,8 @@ __all__ = [
     "CreateComponentDefinition",
     "CreateSymbolInstance",
     "CreateComponentInstance",
+    "EntityBatchOperation",
+    "EntityBatchRequest",
+    "EntityBatchResult",
+    "EntityBatchResponse",
 ]
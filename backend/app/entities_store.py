@@ -2,13 +2,24 @@
 
 Stores JSON array under projects/{project_id}/entities.json
 Each entity is stored as its dict representation (already validated by Pydantic).
+Mutations are appended to entities.log.jsonl (see oplog.py) instead of
+rewriting the whole array.
+
+``instantiated_in_id`` and ``defined_in_id`` are derived from geometry. They
+are resolved when an instance or definition is written, and re-resolved for
+just the affected records when the drawing, legend or schedule they depend on
+moves, resizes or is deleted (see _recompute_dependents). Those fixes are
+committed in the same transaction as the change that caused them.
 """
 
 from __future__ import annotations
 
-import os, json, uuid
+import os, uuid
 from typing import List
+from pydantic import TypeAdapter
 from .ingest import project_dir
+from .locks import locked, read_lock
+from .graph_index import GraphIndex, get_index, commit, transaction, Change, ENTITIES, replace_store
 from .entities_models import (
     EntityUnion,
     CreateEntityUnion,
@@ -27,6 +38,7 @@ from .entities_models import (
     SymbolInstance,
     ComponentInstance,
     ValidationInfo,
+    ENTITY_CLASSES,
 )
 
 ENTITIES_FILENAME = "entities.json"
@@ -36,56 +48,35 @@ def entities_path(project_id: str) -> str:
     return os.path.join(project_dir(project_id), ENTITIES_FILENAME)
 
 
-def load_entities(project_id: str) -> List[EntityUnion]:
-    path = entities_path(project_id)
-    if not os.path.exists(path):
-        return []
-    with open(path) as f:
-        raw = json.load(f)
-    entities: List[EntityUnion] = []
-    for item in raw:
-        et = item.get("entity_type")
-        cls = {
-            "drawing": Drawing,
-            "legend": Legend,
-            "legend_item": LegendItem,
-            "schedule": Schedule,
-            "schedule_item": ScheduleItem,
-            "assembly_group": AssemblyGroup,
-            "assembly": Assembly,
-            "note": Note,
-            "scope": Scope,
-            "symbol_definition": SymbolDefinition,
-            "component_definition": ComponentDefinition,
-            "symbol_instance": SymbolInstance,
-            "component_instance": ComponentInstance,
-        }.get(et)
-        if not cls:
-            continue  # skip unknown types gracefully
-        try:
-            entities.append(cls(**item))
-        except Exception:
-            continue
-    return entities
+def query_entities(
+    project_id: str,
+    *,
+    sheets: List[int] | None = None,
+    entity_types: List[str] | None = None,
+    viewport: tuple[float, float, float, float] | None = None,
+) -> List[EntityUnion]:
+    """Entities filtered by sheet, type and/or a PDF-space viewport (see GraphIndex.query_entities)."""
+    idx = get_index(project_id)
+    with read_lock(idx.pdir):
+        return idx.query_entities(sheets, entity_types, viewport)
 
 
-def _atomic_write(path: str, data):
-    tmp = path + ".tmp"
-    with open(tmp, "w") as f:
-        json.dump(data, f, indent=2)
-    os.replace(tmp, path)
+def load_entities(project_id: str) -> List[EntityUnion]:
+    idx = get_index(project_id)
+    with read_lock(idx.pdir):
+        return list(idx.entities.values())
 
 
+@locked
 def save_entities(project_id: str, entities: List[EntityUnion]):
-    os.makedirs(project_dir(project_id), exist_ok=True)
-    path = entities_path(project_id)
-    serializable = [e.dict() for e in entities]
-    _atomic_write(path, serializable)
+    """Rewrite the whole store (snapshot) and drop its log."""
+    replace_store(project_id, ENTITIES, [e.dict() for e in entities])
 
 
+@locked
 def create_entity(project_id: str, payload: CreateEntityUnion) -> EntityUnion:
     """Validate and persist a new entity, returning the stored object."""
-    entities = load_entities(project_id)
+    index = get_index(project_id)
     new_id = uuid.uuid4().hex
     
     # Validate and process bounding_box if present (conceptual scopes may not have bbox)
@@ -129,7 +120,7 @@ def create_entity(project_id: str, payload: CreateEntityUnion) -> EntityUnion:
         )
     elif payload.entity_type == "legend_item":
         # Validate parent legend exists
-        parent = _get_entity_by_id(entities, getattr(payload, "legend_id", ""))
+        parent = _get_entity_by_id(index, getattr(payload, "legend_id", ""))
         if not parent or getattr(parent, "entity_type", None) != "legend":
             raise ValueError("legend_id not found or invalid")
         ent = LegendItem(
@@ -148,13 +139,13 @@ def create_entity(project_id: str, payload: CreateEntityUnion) -> EntityUnion:
         )
     elif payload.entity_type == "schedule_item":
         # Validate parent schedule exists
-        parent = _get_entity_by_id(entities, getattr(payload, "schedule_id", ""))
+        parent = _get_entity_by_id(index, getattr(payload, "schedule_id", ""))
         if not parent or getattr(parent, "entity_type", None) != "schedule":
             raise ValueError("schedule_id not found or invalid")
         # Validate drawing_id if provided
         drawing_id = getattr(payload, "drawing_id", None)
         if drawing_id:
-            drawing = _get_entity_by_id(entities, drawing_id)
+            drawing = _get_entity_by_id(index, drawing_id)
             if not drawing or getattr(drawing, "entity_type", None) != "drawing":
                 raise ValueError("drawing_id not found or invalid")
         ent = ScheduleItem(
@@ -174,13 +165,13 @@ def create_entity(project_id: str, payload: CreateEntityUnion) -> EntityUnion:
         )
     elif payload.entity_type == "assembly":
         # Validate parent assembly_group exists
-        parent = _get_entity_by_id(entities, getattr(payload, "assembly_group_id", ""))
+        parent = _get_entity_by_id(index, getattr(payload, "assembly_group_id", ""))
         if not parent or getattr(parent, "entity_type", None) != "assembly_group":
             raise ValueError("assembly_group_id not found or invalid")
         # Validate drawing_id if provided
         drawing_id = getattr(payload, "drawing_id", None)
         if drawing_id:
-            drawing = _get_entity_by_id(entities, drawing_id)
+            drawing = _get_entity_by_id(index, drawing_id)
             if not drawing or getattr(drawing, "entity_type", None) != "drawing":
                 raise ValueError("drawing_id not found or invalid")
         ent = Assembly(
@@ -221,7 +212,7 @@ def create_entity(project_id: str, payload: CreateEntityUnion) -> EntityUnion:
         )
     elif payload.entity_type == "symbol_instance":
         # Validate referenced symbol definition exists and scope allows placement
-        sym_def = _get_entity_by_id(entities, getattr(payload, "symbol_definition_id", ""))
+        sym_def = _get_entity_by_id(index, getattr(payload, "symbol_definition_id", ""))
         if not sym_def or getattr(sym_def, "entity_type", None) != "symbol_definition":
             raise ValueError("symbol_definition_id not found")
         # Scope check
@@ -232,7 +223,7 @@ def create_entity(project_id: str, payload: CreateEntityUnion) -> EntityUnion:
         definition_item_id = getattr(payload, "definition_item_id", None)
         definition_item_type = getattr(payload, "definition_item_type", None)
         if definition_item_id and definition_item_type:
-            def_item = _get_entity_by_id(entities, definition_item_id)
+            def_item = _get_entity_by_id(index, definition_item_id)
             if not def_item:
                 raise ValueError("definition_item_id not found")
             expected_type = definition_item_type
@@ -249,7 +240,7 @@ def create_entity(project_id: str, payload: CreateEntityUnion) -> EntityUnion:
             instantiated_in_id=None,
         )
     elif payload.entity_type == "component_instance":
-        comp_def = _get_entity_by_id(entities, getattr(payload, "component_definition_id", ""))
+        comp_def = _get_entity_by_id(index, getattr(payload, "component_definition_id", ""))
         if not comp_def or getattr(comp_def, "entity_type", None) != "component_definition":
             raise ValueError("component_definition_id not found")
         if getattr(comp_def, "scope", "sheet") == "sheet" and getattr(comp_def, "source_sheet_number", None) != payload.source_sheet_number:
@@ -261,14 +252,13 @@ def create_entity(project_id: str, payload: CreateEntityUnion) -> EntityUnion:
         )
     else:
         raise ValueError("Unsupported entity_type")
-    entities.append(ent)
     # Auto-link: if definition has no defined_in_id, and intersects a legend/schedule on same sheet, set defined_in_id
     if getattr(ent, "entity_type") == "symbol_definition" and not getattr(ent, "defined_in_id", None):
-        parent = _find_intersecting_parent(entities, ent, parent_type="legend")
+        parent = _find_intersecting_parent(index, ent, parent_type="legend")
         if parent:
             ent.defined_in_id = parent.id  # type: ignore
     if getattr(ent, "entity_type") == "component_definition" and not getattr(ent, "defined_in_id", None):
-        parent = _find_intersecting_parent(entities, ent, parent_type="schedule")
+        parent = _find_intersecting_parent(index, ent, parent_type="schedule")
         if parent:
             ent.defined_in_id = parent.id  # type: ignore
     # For instances, auto-set instantiated_in_id by locating containing drawing (if bbox exists and drawing found)
@@ -276,24 +266,55 @@ def create_entity(project_id: str, payload: CreateEntityUnion) -> EntityUnion:
         bbox = getattr(ent, "bounding_box", None)
         if bbox is not None:
             # Canvas-based instance: try to find containing drawing
-            drawing = _find_containing_drawing(entities, ent)
+            drawing = _find_containing_drawing(index, ent)
             if drawing:
                 # Found a containing drawing - set the reference
                 data = ent.dict()
                 data["instantiated_in_id"] = drawing.id  # type: ignore
                 ent_cls = SymbolInstance if ent.entity_type == "symbol_instance" else ComponentInstance  # type: ignore
                 ent = ent_cls(**data)
-                entities[-1] = ent
             # If no drawing found, instantiated_in_id remains None (instance is on canvas but not in a drawing)
         # Conceptual instance (no bbox): instantiated_in_id remains None
 
-    save_entities(project_id, entities)
+    commit(project_id, [Change(ENTITIES, ent.id, None, ent)])
     return ent
 
 
 # Sentinel to distinguish "not provided" from "explicitly None"
 _NOT_PROVIDED = object()
 
+# Keyword fields accepted by update_entity (PATCH bodies and batch "update" data)
+UPDATABLE_FIELDS = (
+    "bounding_box",
+    "source_sheet_number",
+    "title",
+    "text",
+    "name",
+    "description",
+    "visual_pattern_description",
+    "scope",
+    "defined_in_id",
+    "specifications",
+    "symbol_definition_id",
+    "component_definition_id",
+    "recognized_text",
+    "instantiated_in_id",
+    "status",
+    "validation",
+    "notes",
+    "schedule_type",
+    "legend_id",
+    "schedule_id",
+    "assembly_group_id",
+    "symbol_text",
+    "mark",
+    "code",
+    "drawing_id",
+    "definition_item_id",
+    "definition_item_type",
+)
+
+@locked
 def update_entity(
     project_id: str,
     entity_id: str,
@@ -326,16 +347,18 @@ def update_entity(
     definition_item_type: str | None = None,
     status: str | None = None,
     validation: dict | ValidationInfo | None = None,
+    recomputed: list | None = None,
 ) -> EntityUnion:
-    entities = load_entities(project_id)
-    found = None
-    for i, e in enumerate(entities):
-        if getattr(e, "id", None) == entity_id:
-            found = (i, e)
-            break
-    if not found:
+    """Apply PATCH fields to an entity.
+
+    When the entity is a drawing, legend or schedule whose box or sheet
+    changed, the dependent derived fields are re-resolved too. A description
+    of each of those changes is appended to `recomputed` when given.
+    """
+    index = get_index(project_id)
+    current = index.entities.get(entity_id)
+    if current is None:
         raise ValueError("Entity not found")
-    idx, current = found
     data = current.dict()
     # Handle bounding_box - can be explicit None to remove location
     if bounding_box is not _NOT_PROVIDED:
@@ -343,7 +366,7 @@ def update_entity(
             # Explicitly set to None to remove location
             data["bounding_box"] = None
         else:
-            if len(bounding_box) != 4:
+            if not isinstance(bounding_box, (list, tuple)) or len(bounding_box) != 4:
                 raise ValueError("bounding_box must have 4 numbers")
             try:
                 x1, y1, x2, y2 = [float(v) for v in bounding_box]
@@ -388,7 +411,7 @@ def update_entity(
     if data["entity_type"] == "legend_item":
         if legend_id is not None:
             # Validate parent exists
-            parent = _get_entity_by_id(entities, legend_id)
+            parent = _get_entity_by_id(index, legend_id)
             if not parent or getattr(parent, "entity_type", None) != "legend":
                 raise ValueError("legend_id not found or invalid")
             data["legend_id"] = legend_id
@@ -398,7 +421,7 @@ def update_entity(
     if data["entity_type"] == "schedule_item":
         if schedule_id is not None:
             # Validate parent exists
-            parent = _get_entity_by_id(entities, schedule_id)
+            parent = _get_entity_by_id(index, schedule_id)
             if not parent or getattr(parent, "entity_type", None) != "schedule":
                 raise ValueError("schedule_id not found or invalid")
             data["schedule_id"] = schedule_id
@@ -410,7 +433,7 @@ def update_entity(
             data["specifications"] = specifications
         if drawing_id is not None:
             # Validate drawing exists
-            drawing = _get_entity_by_id(entities, drawing_id)
+            drawing = _get_entity_by_id(index, drawing_id)
             if not drawing or getattr(drawing, "entity_type", None) != "drawing":
                 raise ValueError("drawing_id not found or invalid")
             data["drawing_id"] = drawing_id
@@ -418,7 +441,7 @@ def update_entity(
     if data["entity_type"] == "assembly":
         if assembly_group_id is not None:
             # Validate parent exists
-            parent = _get_entity_by_id(entities, assembly_group_id)
+            parent = _get_entity_by_id(index, assembly_group_id)
             if not parent or getattr(parent, "entity_type", None) != "assembly_group":
                 raise ValueError("assembly_group_id not found or invalid")
             data["assembly_group_id"] = assembly_group_id
@@ -432,7 +455,7 @@ def update_entity(
             data["specifications"] = specifications
         if drawing_id is not None:
             # Validate drawing exists
-            drawing = _get_entity_by_id(entities, drawing_id)
+            drawing = _get_entity_by_id(index, drawing_id)
             if not drawing or getattr(drawing, "entity_type", None) != "drawing":
                 raise ValueError("drawing_id not found or invalid")
             data["drawing_id"] = drawing_id
@@ -455,21 +478,7 @@ def update_entity(
                 raise ValueError("specifications must be an object")
             data["specifications"] = specifications
     # Reconstruct entity
-    cls_map = {
-        "drawing": Drawing,
-        "legend": Legend,
-        "legend_item": LegendItem,
-        "schedule": Schedule,
-        "schedule_item": ScheduleItem,
-        "assembly_group": AssemblyGroup,
-        "assembly": Assembly,
-        "note": Note,
-        "scope": Scope,
-        "symbol_definition": SymbolDefinition,
-        "component_definition": ComponentDefinition,
-        "symbol_instance": SymbolInstance,
-        "component_instance": ComponentInstance,
-    }
+    cls_map = ENTITY_CLASSES
     if data["entity_type"] == "scope":
         if name is not None:
             data["name"] = name
@@ -477,13 +486,12 @@ def update_entity(
             data["description"] = description
     cls = cls_map[data["entity_type"]]
     updated = cls(**data)
-    entities[idx] = updated
     # Instances: allow meta updates and optionally recompute drawing containment
     if data["entity_type"] in {"symbol_instance", "component_instance"}:
         # Update linked fields if provided
         if data["entity_type"] == "symbol_instance":
             if symbol_definition_id is not None:
-                sym_def = _get_entity_by_id(entities, symbol_definition_id)
+                sym_def = _get_entity_by_id(index, symbol_definition_id)
                 if not sym_def or getattr(sym_def, "entity_type", None) != "symbol_definition":
                     raise ValueError("symbol_definition_id not found")
                 # Only validate sheet match if instance has a sheet
@@ -497,7 +505,7 @@ def update_entity(
             if definition_item_id is not None or definition_item_type is not None:
                 if definition_item_id and definition_item_type:
                     # Validate definition item exists and matches type
-                    def_item = _get_entity_by_id(entities, definition_item_id)
+                    def_item = _get_entity_by_id(index, definition_item_id)
                     if not def_item:
                         raise ValueError("definition_item_id not found")
                     expected_type = definition_item_type
@@ -515,7 +523,7 @@ def update_entity(
                     raise ValueError("Both definition_item_id and definition_item_type must be provided together or both set to None")
         if data["entity_type"] == "component_instance":
             if component_definition_id is not None:
-                comp_def = _get_entity_by_id(entities, component_definition_id)
+                comp_def = _get_entity_by_id(index, component_definition_id)
                 if not comp_def or getattr(comp_def, "entity_type", None) != "component_definition":
                     raise ValueError("component_definition_id not found")
                 # Only validate sheet match if instance has a sheet
@@ -528,7 +536,7 @@ def update_entity(
         if instantiated_in_id is not _NOT_PROVIDED:
             # Manual drawing link provided - validate and use it
             if instantiated_in_id is not None:
-                drawing = _get_entity_by_id(entities, instantiated_in_id)
+                drawing = _get_entity_by_id(index, instantiated_in_id)
                 if not drawing or getattr(drawing, "entity_type", None) != "drawing":
                     raise ValueError("instantiated_in_id must reference a valid drawing")
                 # Validate same sheet
@@ -541,7 +549,7 @@ def update_entity(
                 # Canvas-based instance: try to find containing drawing
                 temp_cls = cls_map[data["entity_type"]]
                 temp_ent = temp_cls(**data)
-                drawing = _find_containing_drawing(entities, temp_ent)
+                drawing = _find_containing_drawing(index, temp_ent)
                 if drawing:
                     # Found a containing drawing - set the reference
                     data["instantiated_in_id"] = drawing.id
@@ -554,126 +562,234 @@ def update_entity(
         
         # Rebuild updated entity and persist
         updated = cls_map[data["entity_type"]](**data)
-        entities[idx] = updated
 
     # Auto-link or unlink on move/resize or meta update for definitions
     if updated.entity_type in {"symbol_definition", "component_definition"}:  # type: ignore
         parent_type = "legend" if updated.entity_type == "symbol_definition" else "schedule"  # type: ignore
-        parent = _find_intersecting_parent(entities, updated, parent_type=parent_type)
+        parent = _find_intersecting_parent(index, updated, parent_type=parent_type)
         if parent:
             # If intersects, set defined_in_id if not set or differs
             if getattr(updated, "defined_in_id", None) != parent.id:  # type: ignore
                 data2 = updated.dict()
                 data2["defined_in_id"] = parent.id
                 updated = cls_map[updated.entity_type](**data2)
-                entities[idx] = updated
         else:
             # No intersecting parent: keep user-set defined_in_id as-is; do not forcibly clear
             pass
-    save_entities(project_id, entities)
+    with transaction(project_id):
+        commit(project_id, [Change(ENTITIES, entity_id, current, updated)])
+        changed = _recompute_dependents(project_id, index, current, updated)
+    if recomputed is not None:
+        recomputed.extend(changed)
     return updated
 
 
-def delete_entity(project_id: str, entity_id: str) -> bool:
-    entities = load_entities(project_id)
+@locked
+def delete_entity(project_id: str, entity_id: str, recomputed: list | None = None) -> bool:
+    """Delete an entity and its links; see update_entity for `recomputed`."""
+    index = get_index(project_id)
+    target = _get_entity_by_id(index, entity_id)
+    etype = getattr(target, "entity_type", None)
     # Guard: prevent deleting definitions if instances reference them
-    target = _get_entity_by_id(entities, entity_id)
-    if target and getattr(target, "entity_type", None) in {"symbol_definition", "component_definition"}:
-        for e in entities:
-            if getattr(e, "entity_type", None) == "symbol_instance" and getattr(e, "symbol_definition_id", None) == entity_id:
-                raise ValueError("Cannot delete definition with existing instances")
-            if getattr(e, "entity_type", None) == "component_instance" and getattr(e, "component_definition_id", None) == entity_id:
-                raise ValueError("Cannot delete definition with existing instances")
-    
+    if etype == "symbol_definition" and index.referrers("symbol_definition_id", entity_id):
+        raise ValueError("Cannot delete definition with existing instances")
+    if etype == "component_definition" and index.referrers("component_definition_id", entity_id):
+        raise ValueError("Cannot delete definition with existing instances")
+
     # Guard: prevent deleting containers if they have child items
-    if target and getattr(target, "entity_type", None) == "legend":
-        for e in entities:
-            if getattr(e, "entity_type", None) == "legend_item" and getattr(e, "legend_id", None) == entity_id:
-                raise ValueError("Cannot delete legend with existing legend items")
-    if target and getattr(target, "entity_type", None) == "schedule":
-        for e in entities:
-            if getattr(e, "entity_type", None) == "schedule_item" and getattr(e, "schedule_id", None) == entity_id:
-                raise ValueError("Cannot delete schedule with existing schedule items")
-    if target and getattr(target, "entity_type", None) == "assembly_group":
-        for e in entities:
-            if getattr(e, "entity_type", None) == "assembly" and getattr(e, "assembly_group_id", None) == entity_id:
-                raise ValueError("Cannot delete assembly group with existing assemblies")
-    
+    if etype == "legend" and index.referrers("legend_id", entity_id):
+        raise ValueError("Cannot delete legend with existing legend items")
+    if etype == "schedule" and index.referrers("schedule_id", entity_id):
+        raise ValueError("Cannot delete schedule with existing schedule items")
+    if etype == "assembly_group" and index.referrers("assembly_group_id", entity_id):
+        raise ValueError("Cannot delete assembly group with existing assemblies")
+
     # Guard: prevent deleting items if symbol instances reference them
-    if target and getattr(target, "entity_type", None) in {"legend_item", "schedule_item", "assembly"}:
-        for e in entities:
-            if getattr(e, "entity_type", None) == "symbol_instance" and getattr(e, "definition_item_id", None) == entity_id:
-                raise ValueError("Cannot delete definition item with symbol instances referencing it")
-    
-    # CASCADE: Delete any links referencing this entity
-    try:
-        from .links_store import load_links, save_links  # type: ignore
-        links = load_links(project_id)
-        # Filter out links that reference the entity being deleted
-        filtered_links = [
-            l for l in links 
-            if getattr(l, "source_id", None) != entity_id and getattr(l, "target_id", None) != entity_id
-        ]
-        if len(filtered_links) < len(links):
-            # Some links were removed, save the updated list
-            save_links(project_id, filtered_links)
-    except Exception as e:
-        # If links store fails, log but continue with entity deletion
-        print(f"Warning: Failed to cascade delete links for entity {entity_id}: {e}")
-    
-    new_entities = [e for e in entities if getattr(e, "id", None) != entity_id]
-    if len(new_entities) == len(entities):
+    if etype in {"legend_item", "schedule_item", "assembly"} and index.referrers("definition_item_id", entity_id):
+        raise ValueError("Cannot delete definition item with symbol instances referencing it")
+
+    if target is None:
         return False
-    save_entities(project_id, new_entities)
+
+    # One transaction, so the cascade is persisted (and undone) with the delete
+    with transaction(project_id):
+        # CASCADE: Delete any links referencing this entity
+        try:
+            from .links_store import delete_links_for  # type: ignore
+            delete_links_for(project_id, entity_id)
+        except Exception as e:
+            # If links store fails, log but continue with entity deletion
+            print(f"Warning: Failed to cascade delete links for entity {entity_id}: {e}")
+
+        commit(project_id, [Change(ENTITIES, entity_id, target, None)])
+        changed = _recompute_dependents(project_id, index, target, None)
+    if recomputed is not None:
+        recomputed.extend(changed)
     return True
-def _intersects(a: BoundingBox, b: BoundingBox) -> bool:
-    return not (a.x2 <= b.x1 or a.x1 >= b.x2 or a.y2 <= b.y1 or a.y1 >= b.y2)
 
 
-def _find_intersecting_parent(entities: list[EntityUnion], child: EntityUnion, *, parent_type: str) -> EntityUnion | None:
-    for e in entities:
-        if getattr(e, "entity_type", None) != parent_type:
-            continue
-        if getattr(e, "source_sheet_number", None) != getattr(child, "source_sheet_number", None):
-            continue
-        try:
-            if _intersects(e.bounding_box, child.bounding_box):  # type: ignore
-                return e
-        except Exception:
-            continue
-    return None
+class BatchError(ValueError):
+    """A batch operation was rejected; nothing from the batch was persisted."""
 
+    def __init__(self, index: int, message: str):
+        super().__init__(f"operation {index}: {message}")
+        self.index = index
 
-def _get_entity_by_id(entities: list[EntityUnion], entity_id: str) -> EntityUnion | None:
-    for e in entities:
-        if getattr(e, "id", None) == entity_id:
-            return e
-    return None
 
+_create_adapter = TypeAdapter(CreateEntityUnion)
 
-def _contains(a: BoundingBox, b: BoundingBox) -> bool:
-    return (a.x1 <= b.x1) and (a.y1 <= b.y1) and (a.x2 >= b.x2) and (a.y2 >= b.y2)
 
+def _resolve_ref(value, refs: dict[str, str]):
+    if isinstance(value, str) and value.startswith("$"):
+        if value[1:] not in refs:
+            raise ValueError(f"Unknown batch reference '{value}'")
+        return refs[value[1:]]
+    return value
 
-def _find_containing_drawing(entities: list[EntityUnion], inst: EntityUnion) -> Drawing | None:
-    for e in entities:
-        if getattr(e, "entity_type", None) != "drawing":
-            continue
-        if getattr(e, "source_sheet_number", None) != getattr(inst, "source_sheet_number", None):
-            continue
-        try:
-            if _contains(e.bounding_box, getattr(inst, "bounding_box")):  # type: ignore
-                return e  # type: ignore
-        except Exception:
-            continue
-    return None
+
+def _apply_batch_op(project_id: str, op: dict, refs: dict[str, str]) -> dict:
+    kind = op.get("op")
+    data = {
+        k: (_resolve_ref(v, refs) if k.endswith("_id") else v)
+        for k, v in (op.get("data") or {}).items()
+    }
+    if kind == "create":
+        ent = create_entity(project_id, _create_adapter.validate_python(data))
+        if op.get("ref"):
+            refs[op["ref"]] = ent.id
+        return {"op": kind, "id": ent.id, "ref": op.get("ref"), "entity": ent}
+    entity_id = _resolve_ref(op.get("id"), refs)
+    if not entity_id:
+        raise ValueError("id is required")
+    if kind == "update":
+        unknown = set(data) - set(UPDATABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unsupported fields: {', '.join(sorted(unknown))}")
+        recomputed: list = []
+        ent = update_entity(project_id, entity_id, **data, recomputed=recomputed)
+        return {"op": kind, "id": entity_id, "ref": op.get("ref"), "entity": ent, "recomputed": recomputed}
+    if kind == "delete":
+        recomputed = []
+        if not delete_entity(project_id, entity_id, recomputed=recomputed):
+            raise ValueError("Entity not found")
+        return {"op": kind, "id": entity_id, "ref": op.get("ref"), "entity": None, "recomputed": recomputed}
+    raise ValueError("Unsupported op")
+
+
+@locked
+def apply_entity_batch(project_id: str, operations: List[dict]) -> List[dict]:
+    """Apply create/update/delete operations all-or-nothing and persist once.
+
+    Every operation is validated against the project as left by the previous
+    ones, so later operations can reference entities created earlier in the
+    batch via "$<ref>". The first failure raises BatchError and discards the
+    whole batch.
+    """
+    refs: dict[str, str] = {}
+    results: List[dict] = []
+    with transaction(project_id):
+        for i, op in enumerate(operations):
+            try:
+                results.append(_apply_batch_op(project_id, op, refs))
+            except (ValueError, TypeError) as e:
+                # Update data is untyped JSON: a wrongly typed field fails as a TypeError
+                raise BatchError(i, str(e)) from e
+    return results
+
+
+def _box(bb: BoundingBox):
+    return (bb.x1, bb.y1, bb.x2, bb.y2)
+
+
+def _find_intersecting_parent(index: GraphIndex, child: EntityUnion, *, parent_type: str) -> EntityUnion | None:
+    bbox = getattr(child, "bounding_box", None)
+    if bbox is None:
+        return None
+    hits = index.intersecting(getattr(child, "source_sheet_number", None), _box(bbox), parent_type)
+    return hits[0] if hits else None
+
+
+def _get_entity_by_id(index: GraphIndex, entity_id: str) -> EntityUnion | None:
+    return index.entities.get(entity_id)
+
+
+def _find_containing_drawing(index: GraphIndex, inst: EntityUnion) -> Drawing | None:
+    bbox = getattr(inst, "bounding_box", None)
+    if bbox is None:
+        return None
+    hits = index.containing(getattr(inst, "source_sheet_number", None), _box(bbox), "drawing")
+    return hits[0] if hits else None
+
+
+# Container type -> (derived field on its dependents, dependent entity types)
+_DEPENDENTS = {
+    "drawing": ("instantiated_in_id", ("symbol_instance", "component_instance")),
+    "legend": ("defined_in_id", ("symbol_definition",)),
+    "schedule": ("defined_in_id", ("component_definition",)),
+}
+
+
+def _overlaps(a, b) -> bool:
+    """Whether entities `a` and `b` are on one sheet with intersecting boxes."""
+    if a.bounding_box is None or b.bounding_box is None or a.source_sheet_number != b.source_sheet_number:
+        return False
+    ax1, ay1, ax2, ay2 = _box(a.bounding_box)
+    bx1, by1, bx2, by2 = _box(b.bounding_box)
+    return ax1 < bx2 and bx1 < ax2 and ay1 < by2 and by1 < ay2
+
+
+def _recompute_dependents(project_id: str, index: GraphIndex, before, after) -> List[dict]:
+    """Re-resolve derived links after a container moved, resized or was deleted.
+
+    `before` is the drawing, legend or schedule as it was, `after` as it is now
+    (None once deleted). Only its current referrers and the dependents
+    intersecting its new box are looked at. Instances get the same
+    containment rule as on create/update. A definition is re-resolved when it
+    has no parent yet, or its parent was this container and the move took it
+    out from under the definition (or the container is gone). Returns one
+    ``{"id", "field", "before", "after"}`` per changed entity.
+    """
+    spec = _DEPENDENTS.get(before.entity_type)
+    if spec is None:
+        return []
+    if after is not None and (after.bounding_box, after.source_sheet_number) == (before.bounding_box, before.source_sheet_number):
+        return []
+    field, kinds = spec
+    candidates = dict.fromkeys(sorted(index.referrers(field, before.id), key=index.order.__getitem__))
+    if after is not None and after.bounding_box is not None:
+        for kind in kinds:
+            for ent in index.intersecting(after.source_sheet_number, _box(after.bounding_box), kind):
+                candidates[ent.id] = None
+    changes, report = [], []
+    for ent_id in candidates:
+        ent = index.entities[ent_id]
+        current = getattr(ent, field)
+        if field == "instantiated_in_id":
+            drawing = _find_containing_drawing(index, ent)
+            new = drawing.id if drawing else None
+        else:
+            if current and current != before.id and current in index.kinds:
+                continue
+            if current == before.id and after is not None and (_overlaps(after, ent) or not _overlaps(before, ent)):
+                continue
+            parent = _find_intersecting_parent(index, ent, parent_type=before.entity_type)
+            new = parent.id if parent else None
+        if new != current:
+            changes.append(Change(ENTITIES, ent_id, ent, ENTITY_CLASSES[ent.entity_type](**{**ent.dict(), field: new})))
+            report.append({"id": ent_id, "field": field, "before": current, "after": new})
+    commit(project_id, changes)
+    return report
 
 
 __all__ = [
     "load_entities",
+    "query_entities",
     "save_entities",
     "create_entity",
     "update_entity",
     "delete_entity",
+    "apply_entity_batch",
+    "BatchError",
+    "UPDATABLE_FIELDS",
     "entities_path",
 ]
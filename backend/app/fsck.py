@@ -0,0 +1,234 @@
+"""Integrity check and repair across every project in the projects directory.
+
+Each project is checked on its own GraphIndex, so every check is an index
+lookup rather than a scan per reference:
+
+- ``dangling_link``: a link whose source or target does not exist.
+- ``broken_ref``: a reference field (``legend_id``, ``schedule_id``,
+  ``symbol_definition_id``, ``definition_item_id``, ``drawing_id``,
+  ``instantiated_in_id``, ...) naming a record that does not exist.
+- ``stale_instantiated_in``: an instance whose ``instantiated_in_id`` no longer
+  matches the drawings that contain its box. Its value is either empty while a
+  drawing contains the box, or names a drawing that does not.
+- ``orphan_tmp``: ``*.tmp`` files and ``.tmp-*`` directories left by an
+  interrupted write, older than ``tmp_age`` seconds.
+- ``missing_page`` / ``missing_ocr``: a page of a finished ingest without its
+  PNG (when there is no ``original.pdf`` to re-render it from) or OCR file.
+- ``invalid_record``: with ``validate``, everything verify.py reports.
+
+With ``repair``, dangling links are deleted and optional references are
+recomputed or cleared. Required ones (an item's container, an instance's
+definition) cannot be cleared and are only reported. Record fixes are staged
+in one transaction, so each store gets one log append and the repair is a
+single undoable step. Orphan temporary files are removed.
+
+Projects are independent, so :func:`fsck_all` spreads them over a process pool.
+Repairs append to the same logs a running server writes, and only the file
+lock (``TIMBERGEM_LOCK_MODE=file``, used by the server too) excludes another
+process, so repairing is refused in any other lock mode.
+"""
+
+from __future__ import annotations
+
+import os, shutil, time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from . import ingest
+from .graph_index import Change, ENTITIES, LINKS, REF_FIELDS, get_index, transaction
+from .ingest import is_processing, project_dir, read_manifest
+from .locks import lock_mode, read_lock
+from .verify import verify_dir
+
+INSTANCE_TYPES = ("symbol_instance", "component_instance")
+# Reference fields a record cannot be valid without
+REQUIRED_REFS = ("symbol_definition_id", "component_definition_id", "legend_id", "schedule_id", "assembly_group_id")
+# Cleared along with the reference they describe
+PAIRED_FIELDS = {"definition_item_id": "definition_item_type"}
+TMP_AGE = 600
+
+
+def _get(obj, name: str):
+    if obj is None:
+        return None
+    if type(obj) is dict:
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _check_records(idx, problems: List[Dict[str, Any]], fixes: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Reference problems, recording fixes per entity; returns dangling link ids."""
+    entities = idx.records[ENTITIES]
+    for obj_id in list(entities):
+        obj = entities.raw(obj_id)
+        for field in REF_FIELDS:
+            target = _get(obj, field)
+            if target and target not in idx.kinds:
+                fixable = field not in REQUIRED_REFS
+                problems.append({"check": "broken_ref", "store": ENTITIES, "id": obj_id, "field": field, "target": target, "repairable": fixable})
+                if fixable:
+                    fixes.setdefault(obj_id, {})[field] = None
+                    if field in PAIRED_FIELDS:
+                        fixes[obj_id][PAIRED_FIELDS[field]] = None
+        if _get(obj, "entity_type") in INSTANCE_TYPES:
+            bb = _get(obj, "bounding_box")
+            box = None if bb is None else tuple(_get(bb, k) for k in ("x1", "y1", "x2", "y2"))
+            hits = [] if box is None else [h.id for h in idx.containing(_get(obj, "source_sheet_number"), box, "drawing")]
+            current = _get(obj, "instantiated_in_id")
+            expected = hits[0] if hits else None
+            if current == expected or current in hits:
+                continue
+            if current is None or current in idx.kinds:
+                problems.append({"check": "stale_instantiated_in", "store": ENTITIES, "id": obj_id, "target": current, "expected": expected, "repairable": True})
+            # A broken one is recomputed as well, rather than just cleared
+            fixes.setdefault(obj_id, {})["instantiated_in_id"] = expected
+    dangling = []
+    links = idx.records[LINKS]
+    for link_id in list(links):
+        link = links.raw(link_id)
+        missing = [e for e in ("source_id", "target_id") if _get(link, e) not in idx.kinds]
+        if missing:
+            problems.append({"check": "dangling_link", "store": LINKS, "id": link_id, "missing": missing, "repairable": True})
+            dangling.append(link_id)
+    return dangling
+
+
+def _check_files(pdir: str, manifest: Dict[str, Any], tmp_age: float, problems: List[Dict[str, Any]]) -> List[str]:
+    """Asset problems; returns the orphan temporary paths."""
+    orphans = []
+    cutoff = time.time() - tmp_age
+    for root, dirs, files in os.walk(pdir):
+        for name in [d for d in dirs if d.startswith(".tmp-")] + [f for f in files if f.endswith(".tmp")]:
+            path = os.path.join(root, name)
+            if os.path.getmtime(path) <= cutoff:
+                orphans.append(path)
+        dirs[:] = [d for d in dirs if not d.startswith(".tmp-")]
+    for path in orphans:
+        problems.append({"check": "orphan_tmp", "path": os.path.relpath(path, pdir), "repairable": True})
+    if manifest.get("status") == "complete":
+        has_pdf = os.path.exists(os.path.join(pdir, "original.pdf"))
+        for page in range(1, int(manifest.get("num_pages") or 0) + 1):
+            if not has_pdf and not os.path.exists(os.path.join(pdir, "pages", f"page_{page}.png")):
+                problems.append({"check": "missing_page", "page": page, "repairable": False})
+            if not os.path.exists(os.path.join(pdir, "ocr", f"page_{page}.json")):
+                problems.append({"check": "missing_ocr", "page": page, "repairable": False})
+    return orphans
+
+
+def _remove(path: str) -> None:
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def fsck_project(
+    project_id: str, repair: bool = False, validate: bool = False, tmp_age: float = TMP_AGE
+) -> Dict[str, Any]:
+    """Check (and with `repair`, fix) one project; see the module docstring."""
+    manifest = read_manifest(project_id)
+    if manifest is None:
+        raise KeyError(project_id)
+    pdir = os.path.abspath(project_dir(project_id))
+    problems: List[Dict[str, Any]] = []
+    if validate:
+        problems.extend({"check": "invalid_record", **p, "repairable": False} for p in verify_dir(pdir)["problems"])
+    fixes: Dict[str, Dict[str, Any]] = {}
+    repaired = 0
+    idx = get_index(project_id)
+    if repair:
+        with transaction(project_id) as txn:
+            dangling = _check_records(idx, problems, fixes)
+            for link_id in dangling:
+                txn.delete(LINKS, link_id)
+            for obj_id, update in fixes.items():
+                before = idx.records[ENTITIES].get(obj_id)
+                txn.stage(Change(ENTITIES, obj_id, before, {**before.dict(), **update}))
+            repaired += len(dangling) + len(fixes)
+    else:
+        with read_lock(idx.pdir):
+            _check_records(idx, problems, fixes)
+    # Files are left alone while an ingest may still be writing them
+    if not is_processing(manifest):
+        orphans = _check_files(pdir, manifest, tmp_age, problems)
+        if repair:
+            for path in orphans:
+                _remove(path)
+            repaired += len(orphans)
+    return {
+        "project_id": project_id,
+        "records": {store: len(recs) for store, recs in idx.records.items()},
+        "problems": problems,
+        "repaired": repaired,
+    }
+
+
+def _init_worker(base_dir: str) -> None:
+    ingest.BASE_DIR = base_dir
+
+
+def _fsck_one(project_id: str, repair: bool, validate: bool, tmp_age: float) -> Dict[str, Any]:
+    try:
+        return fsck_project(project_id, repair, validate, tmp_age)
+    except Exception as e:
+        return {"project_id": project_id, "error": f"{type(e).__name__}: {e}", "problems": [], "repaired": 0}
+
+
+def list_projects() -> List[str]:
+    base = ingest.BASE_DIR
+    if not os.path.isdir(base):
+        return []
+    return sorted(
+        name for name in os.listdir(base)
+        if not name.startswith(".") and os.path.isfile(os.path.join(base, name, "manifest.json"))
+    )
+
+
+def fsck_all(
+    project_ids: Optional[List[str]] = None,
+    repair: bool = False,
+    validate: bool = False,
+    tmp_age: float = TMP_AGE,
+    jobs: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Check every project (or `project_ids`) in a pool of `jobs` processes.
+
+    Raises ValueError for `repair` outside file lock mode (see the module
+    docstring). Returns a report with one entry per project, in id order, plus totals and
+    the leftover ``.tmp-*`` directories of interrupted imports and clones at
+    the top of the projects directory (removed with `repair`).
+    """
+    if repair and lock_mode() != "file":
+        raise ValueError("repair requires TIMBERGEM_LOCK_MODE=file so it cannot interleave with a running server")
+    base = ingest.BASE_DIR
+    ids = list_projects() if project_ids is None else list(project_ids)
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(ids) or 1))
+    if jobs == 1:
+        reports = [_fsck_one(p, repair, validate, tmp_age) for p in ids]
+    else:
+        with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(base,)) as pool:
+            reports = list(pool.map(_fsck_one, ids, [repair] * len(ids), [validate] * len(ids), [tmp_age] * len(ids)))
+    cutoff = time.time() - tmp_age
+    leftovers = []
+    if os.path.isdir(base):
+        for name in sorted(os.listdir(base)):
+            path = os.path.join(base, name)
+            if name.startswith(".tmp-") and os.path.getmtime(path) <= cutoff:
+                leftovers.append(name)
+                if repair:
+                    _remove(path)
+    return {
+        "projects_dir": os.path.abspath(base),
+        "checked": len(reports),
+        "problems": sum(len(r["problems"]) for r in reports) + len(leftovers),
+        "repaired": sum(r["repaired"] for r in reports) + (len(leftovers) if repair else 0),
+        "errors": sum(1 for r in reports if "error" in r),
+        "leftovers": leftovers,
+        "projects": reports,
+    }
+
+
+__all__ = ["fsck_project", "fsck_all", "list_projects", "TMP_AGE"]
@@ -0,0 +1,926 @@
+"""In-memory index shared by the entity, concept and link stores.
+
+Each project's three stores are loaded once and kept in memory, keyed by id,
+together with an ``id -> (store, kind)`` map. Records stay raw dicts until
+first read (see hydrate.py), and the indexes are built from those dicts.
+Existence and kind checks become dict lookups instead of list scans, whichever
+store the id lives in.
+
+- Entities are grouped by sheet and type. Those with a bounding box are also
+  registered in a per-sheet, per-type spatial grid (see spatial.py) for
+  containment, intersection and viewport queries.
+- Reverse references (definition -> instances, container -> items, item ->
+  symbol instances) are kept so delete guards only touch the affected records.
+- Links get adjacency indexes: out-edges by source, in-edges by target,
+  per-rel_type sets and a (rel_type, source, target) uniqueness map. Filtered
+  link queries, duplicate checks and delete cascades therefore cost O(result
+  size).
+- The JSON encoding of each store's full list is cached per store generation
+  (and per record), so unchanged list reads are served as pre-encoded bytes.
+- Instance counts are kept per definition, definition item, sheet, drawing and
+  ``LOCATED_IN`` space, each broken down by sheet (see :meth:`GraphIndex.quantity`).
+  They are adjusted as records are indexed and unindexed, so a quantity
+  lookup is O(1) and never scans the project.
+- Needs Attention issues (see issues.py) are re-evaluated for the touched
+  record and its direct dependents on every put and remove.
+
+All writes go through a :func:`transaction` (or the one-shot :func:`commit`).
+Changes are applied to the in-memory records and indexes as they are staged,
+so later validation in the same transaction sees them. On success they are
+appended to the store logs (see oplog.py) with one write per store and
+recorded in the project's change feed (see changes.py). On failure they are
+rolled back in memory without touching disk. Transactions hold the project
+lock, and nested ones join the outer transaction.
+
+A cached project is checked against disk on every access (see get_index), so
+writes made outside this process (cleanup scripts, another worker) are picked
+up: appended log lines are applied incrementally, a replaced snapshot reloads
+the store.
+"""
+
+from __future__ import annotations
+
+import hashlib, json, logging, os, threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from . import oplog, changes, history
+from .ingest import project_dir
+from .locks import dir_lock, read_lock
+from .entities_models import ENTITY_CLASSES
+from .concepts_models import CONCEPT_CLASSES, Relationship
+from .spatial import GridIndex, Box
+from .issues import IssueSet, codes_for
+from .hydrate import check, field_names, hydrate, trusted_load
+
+logger = logging.getLogger(__name__)
+
+ENTITIES = "entities"
+CONCEPTS = "concepts"
+LINKS = "links"
+STORE_FILENAMES = {
+    ENTITIES: "entities.json",
+    CONCEPTS: "concepts.json",
+    LINKS: "links.json",
+}
+
+# Entity fields that point at another entity; indexed in reverse (target -> referrers)
+REF_FIELDS = (
+    "symbol_definition_id",
+    "component_definition_id",
+    "legend_id",
+    "schedule_id",
+    "assembly_group_id",
+    "definition_item_id",
+    "drawing_id",
+    "instantiated_in_id",
+    "defined_in_id",
+)
+
+INSTANCE_TYPES = ("symbol_instance", "component_instance")
+# Quantity dimension -> what an instance is counted under
+QUANTITY_DIMENSIONS = ("definition", "item", "sheet", "drawing", "space")
+
+MAX_CACHED_PROJECTS = int(os.environ.get("TIMBERGEM_INDEX_CACHE_SIZE", "32"))
+
+
+class Change(NamedTuple):
+    """One record-level mutation. `before` is None for creates, `after` for deletes."""
+
+    store: str
+    id: str
+    before: Any
+    after: Any
+
+
+def model_class(store: str, item: Any):
+    """Model class for a raw record of `store`, or None for an unknown type."""
+    if not isinstance(item, dict):
+        return None
+    if store == ENTITIES:
+        return ENTITY_CLASSES.get(item.get("entity_type"))
+    if store == CONCEPTS:
+        return CONCEPT_CLASSES.get(item.get("kind"))
+    return Relationship
+
+
+def _field(obj, name: str):
+    # Records are raw dicts until first read (see LazyRecords), models after
+    if type(obj) is dict:
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _box_of(obj) -> Optional[Box]:
+    bb = _field(obj, "bounding_box")
+    if bb is None or _field(obj, "source_sheet_number") is None:
+        return None
+    if type(bb) is dict:
+        return (bb["x1"], bb["y1"], bb["x2"], bb["y2"])
+    return (bb.x1, bb.y1, bb.x2, bb.y2)
+
+
+def _kind(store: str, obj) -> str:
+    if store == ENTITIES:
+        return _field(obj, "entity_type")
+    if store == CONCEPTS:
+        return _field(obj, "kind")
+    return _field(obj, "rel_type")
+
+
+# Compact, UTF-8 output like model_dump_json, for records still in raw form
+_raw_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+_ref_fields_cache: Dict[type, Tuple[str, ...]] = {}
+
+
+def _refs_of(obj) -> List[Tuple[str, str]]:
+    """(field, target id) for each REF_FIELDS reference the record holds."""
+    if type(obj) is dict:
+        return [(f, obj[f]) for f in REF_FIELDS if obj.get(f)]
+    cls = type(obj)
+    fields = _ref_fields_cache.get(cls)
+    if fields is None:
+        fields = _ref_fields_cache[cls] = tuple(f for f in REF_FIELDS if f in cls.model_fields)
+    return [(f, getattr(obj, f)) for f in fields if getattr(obj, f)]
+
+
+class LazyRecords:
+    """id -> record mapping that turns raw on-disk dicts into models on first read.
+
+    Loads store the dicts as-is (see hydrate.py); reads hydrate and memoize.
+    `raw` peeks without hydrating, for the indexing and encoding paths.
+    """
+
+    __slots__ = ("store", "_data", "_problems")
+
+    def __init__(self, store: str, problems: List[Dict[str, Any]]):
+        self.store = store
+        self._data: Dict[str, Any] = {}
+        self._problems = problems
+
+    def _model(self, obj_id: str, obj):
+        if type(obj) is not dict:
+            return obj
+        model, reason = hydrate(model_class(self.store, obj), obj)
+        if reason:
+            self._problems.append({"id": obj_id, "reason": reason})
+            logger.warning("Invalid %s record %s in store: %s", self.store, obj_id, reason)
+        self._data[obj_id] = model
+        return model
+
+    def raw(self, obj_id: str, default=None):
+        return self._data.get(obj_id, default)
+
+    def raw_items(self):
+        return self._data.items()
+
+    def get(self, obj_id: str, default=None):
+        obj = self._data.get(obj_id)
+        return default if obj is None else self._model(obj_id, obj)
+
+    def __getitem__(self, obj_id: str):
+        return self._model(obj_id, self._data[obj_id])
+
+    def __setitem__(self, obj_id: str, obj) -> None:
+        self._data[obj_id] = obj
+
+    def pop(self, obj_id: str, default=None):
+        return self._data.pop(obj_id, default)
+
+    def __contains__(self, obj_id) -> bool:
+        return obj_id in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(list(self._data))
+
+    def keys(self):
+        return list(self._data)
+
+    def values(self) -> List[Any]:
+        return [self._model(k, v) for k, v in list(self._data.items())]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(k, self._model(k, v)) for k, v in list(self._data.items())]
+
+
+_EMPTY: Set[str] = frozenset()  # type: ignore[assignment]
+
+
+def _add(index: Dict[str, Set[str]], key: str, value: str) -> None:
+    bucket = index.get(key)
+    if bucket is None:
+        bucket = index[key] = set()
+    bucket.add(value)
+
+
+def _discard(index: Dict[str, Set[str]], key: str, value: str) -> None:
+    bucket = index.get(key)
+    if bucket is not None:
+        bucket.discard(value)
+        if not bucket:
+            del index[key]
+
+
+class GraphIndex:
+    """Records of one project plus the lookup indexes derived from them."""
+
+    def __init__(self, pdir: str):
+        self.pdir = pdir
+        # store -> records that failed loading or validation: {"id", "reason"[, "index"]}
+        self.problems: Dict[str, List[Dict[str, Any]]] = {ENTITIES: [], CONCEPTS: [], LINKS: []}
+        self.records: Dict[str, LazyRecords] = {st: LazyRecords(st, self.problems[st]) for st in STORE_FILENAMES}
+        # id -> (store, kind); the record itself is records[store][id]
+        self.kinds: Dict[str, Tuple[str, str]] = {}
+        # id -> creation sequence; stable across updates so query results keep list order
+        self.order: Dict[str, int] = {}
+        self._next_order = 0
+        # sheet (None for sheetless items) -> entity_type -> entity ids
+        self.by_sheet: Dict[Optional[int], Dict[str, Set[str]]] = {}
+        # sheet -> entity_type -> grid over that sheet's boxes of that type
+        self.spatial: Dict[int, Dict[str, GridIndex]] = {}
+        # field -> target id -> ids of entities whose `field` equals target id
+        self.refs: Dict[str, Dict[str, Set[str]]] = {f: {} for f in REF_FIELDS}
+        # Link adjacency: source id -> link ids, target id -> link ids, rel_type -> link ids
+        self.out_edges: Dict[str, Set[str]] = {}
+        self.in_edges: Dict[str, Set[str]] = {}
+        self.by_rel: Dict[str, Set[str]] = {}
+        # (rel_type, source_id, target_id) -> link id
+        self.link_keys: Dict[Tuple[str, str, str], str] = {}
+        # dimension -> key -> [instance count, {sheet: count}]
+        self.quantities: Dict[str, Dict[Any, List[Any]]] = {d: {} for d in QUANTITY_DIMENSIONS}
+        # Needs Attention rule -> ids of the records breaking it (see issues.py)
+        self.issues = IssueSet()
+        self.signatures: Dict[str, Any] = {}
+        # Bumped on every put/remove; keys the encoded list cache below
+        self.generation: Dict[str, int] = {ENTITIES: 0, CONCEPTS: 0, LINKS: 0}
+        # store -> (generation, etag, JSON bytes of the whole list)
+        self._encoded: Dict[str, Tuple[int, str, bytes]] = {}
+        # id -> (record, its JSON bytes); reused while the record object is unchanged
+        self._record_json: Dict[str, Tuple[Any, bytes]] = {}
+
+    @property
+    def entities(self) -> Dict[str, Any]:
+        return self.records[ENTITIES]
+
+    @property
+    def concepts(self) -> Dict[str, Any]:
+        return self.records[CONCEPTS]
+
+    @property
+    def links(self) -> Dict[str, Any]:
+        return self.records[LINKS]
+
+    def get(self, obj_id: str):
+        hit = self.kinds.get(obj_id)
+        if hit is None:
+            return None
+        return self.records[hit[0]].get(obj_id)
+
+    def kind_of(self, obj_id: str) -> Optional[Tuple[str, str]]:
+        return self.kinds.get(obj_id)
+
+    def containing(self, sheet: int | None, box: Box, entity_type: str) -> List[Any]:
+        """Entities of `entity_type` on `sheet` whose bbox contains `box`, oldest first."""
+        grid = self.spatial.get(sheet, {}).get(entity_type) if sheet is not None else None
+        if grid is None:
+            return []
+        return [self.entities[i] for i in grid.containing(box)]
+
+    def intersecting(self, sheet: int | None, box: Box, entity_type: str) -> List[Any]:
+        """Entities of `entity_type` on `sheet` whose bbox overlaps `box`, oldest first."""
+        grid = self.spatial.get(sheet, {}).get(entity_type) if sheet is not None else None
+        if grid is None:
+            return []
+        return [self.entities[i] for i in grid.intersecting(box)]
+
+    def query_entities(
+        self,
+        sheets: Optional[List[int]] = None,
+        entity_types: Optional[List[str]] = None,
+        viewport: Optional[Box] = None,
+    ) -> List[Any]:
+        """Entities on any of `sheets` with any of `entity_types`, oldest first.
+
+        None means "any" for either filter. With a `viewport` only entities that
+        have a box overlapping it are returned, looked up in the spatial grids.
+        """
+        sheet_keys = list(self.by_sheet) if sheets is None else sheets
+        ids: Set[str] = set()
+        for sheet in sheet_keys:
+            if viewport is not None:
+                by_type = self.spatial.get(sheet, {})
+                types = by_type.keys() if entity_types is None else entity_types
+                for t in types:
+                    grid = by_type.get(t)
+                    if grid is not None:
+                        ids.update(grid.intersecting(viewport))
+            else:
+                by_type = self.by_sheet.get(sheet, {})
+                types = by_type.keys() if entity_types is None else entity_types
+                for t in types:
+                    ids.update(by_type.get(t, ()))
+        return [self.entities[i] for i in sorted(ids, key=self.order.__getitem__)]
+
+    def referrers(self, field: str, target_id: str) -> Set[str]:
+        """Ids of entities whose `field` references `target_id` (do not mutate)."""
+        return self.refs[field].get(target_id, _EMPTY)
+
+    def incident_links(self, node_id: str) -> Set[str]:
+        """Ids of links that have `node_id` as source or target."""
+        return self.out_edges.get(node_id, _EMPTY) | self.in_edges.get(node_id, _EMPTY)
+
+    def find_link(self, rel_type: str, source_id: str, target_id: str):
+        link_id = self.link_keys.get((rel_type, source_id, target_id))
+        return self.links.get(link_id) if link_id else None
+
+    def query_links(
+        self,
+        source_ids: Optional[List[str]] = None,
+        target_ids: Optional[List[str]] = None,
+        rel_types: Optional[List[str]] = None,
+    ) -> List[Any]:
+        """Links matching every given filter (each filter is an any-of list), oldest first.
+
+        Starts from the most selective adjacency index and checks the remaining
+        filters per candidate, so the cost follows the result size rather than
+        the number of links in the project.
+        """
+        filters = []
+        if source_ids is not None:
+            filters.append((self.out_edges, source_ids))
+        if target_ids is not None:
+            filters.append((self.in_edges, target_ids))
+        if rel_types is not None:
+            filters.append((self.by_rel, rel_types))
+        if filters:
+            table, keys = min(filters, key=lambda f: sum(len(f[0].get(k, ())) for k in f[1]))
+            candidates: Set[str] = set()
+            for k in keys:
+                candidates.update(table.get(k, ()))
+        else:
+            candidates = set(self.links)
+        sources = set(source_ids) if source_ids is not None else None
+        targets = set(target_ids) if target_ids is not None else None
+        rels = set(rel_types) if rel_types is not None else None
+        matched = []
+        for link_id in candidates:
+            l = self.links.raw(link_id)
+            if sources is not None and _field(l, "source_id") not in sources:
+                continue
+            if targets is not None and _field(l, "target_id") not in targets:
+                continue
+            if rels is not None and _field(l, "rel_type") not in rels:
+                continue
+            matched.append(link_id)
+        matched.sort(key=self.order.__getitem__)
+        return [self.links[i] for i in matched]
+
+    def quantity(self, dimension: str, key) -> Dict[str, Any]:
+        """Instances counted under `key` of `dimension`, in total and per sheet.
+
+        Sheetless (conceptual) instances are counted under sheet None.
+        """
+        entry = self.quantities[dimension].get(key)
+        if entry is None:
+            return {"count": 0, "sheets": []}
+        sheets = sorted(entry[1].items(), key=lambda kv: (kv[0] is None, kv[0] or 0))
+        return {"count": entry[0], "sheets": [{"sheet": sh, "count": n} for sh, n in sheets]}
+
+    def _bump(self, dimension: str, key, sheet: Optional[int], delta: int) -> None:
+        by_key = self.quantities[dimension]
+        entry = by_key.get(key)
+        if entry is None:
+            entry = by_key[key] = [0, {}]
+        entry[0] += delta
+        n = entry[1].get(sheet, 0) + delta
+        if n:
+            entry[1][sheet] = n
+        else:
+            entry[1].pop(sheet, None)
+        if not entry[0]:
+            del by_key[key]
+
+    def _count_instance(self, obj, delta: int) -> None:
+        sheet = _field(obj, "source_sheet_number")
+        definition = _field(obj, "symbol_definition_id") or _field(obj, "component_definition_id")
+        if definition:
+            self._bump("definition", definition, sheet, delta)
+        for dimension, field in (("item", "definition_item_id"), ("drawing", "instantiated_in_id")):
+            key = _field(obj, field)
+            if key:
+                self._bump(dimension, key, sheet, delta)
+        if sheet is not None:
+            self._bump("sheet", sheet, sheet, delta)
+        # Space counts pair an instance with its links: whichever of the two is
+        # indexed second adds the pair, whichever is unindexed first removes it
+        for link_id in self.out_edges.get(_field(obj, "id"), _EMPTY):
+            link = self.links.raw(link_id)
+            if _field(link, "rel_type") == "LOCATED_IN":
+                self._bump("space", _field(link, "target_id"), sheet, delta)
+
+    def _count_located_in(self, link, delta: int) -> None:
+        src = _field(link, "source_id")
+        kind = self.kinds.get(src)
+        if kind is not None and kind[0] == ENTITIES and kind[1] in INSTANCE_TYPES:
+            sheet = _field(self.entities.raw(src), "source_sheet_number")
+            self._bump("space", _field(link, "target_id"), sheet, delta)
+
+    def encoded(self, store: str) -> Tuple[str, bytes]:
+        """(etag, JSON array bytes) of a store's records in list order.
+
+        Rebuilt only after the store changed, and then only records that were
+        replaced get re-serialized. Records still in their raw on-disk form are
+        dumped as-is when they carry every model field (they were written from
+        the model), so a cold list read builds no models. The etag is a digest
+        of the bytes, so it is stable across processes and restarts.
+        """
+        gen = self.generation[store]
+        hit = self._encoded.get(store)
+        if hit is not None and hit[0] == gen:
+            return hit[1], hit[2]
+        records = self.records[store]
+        parts = []
+        for obj_id, obj in list(records.raw_items()):
+            cached = self._record_json.get(obj_id)
+            if cached is None or cached[0] is not obj:
+                if type(obj) is dict and field_names(model_class(store, obj)) <= obj.keys():
+                    data = _raw_encoder.encode(obj).encode()
+                else:
+                    obj = records[obj_id]
+                    data = obj.model_dump_json().encode()
+                cached = self._record_json[obj_id] = (obj, data)
+            parts.append(cached[1])
+        body = b"[" + b",".join(parts) + b"]"
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self._encoded[store] = (gen, etag, body)
+        return etag, body
+
+    def put(self, store: str, obj, order: Optional[int] = None) -> None:
+        """Insert or replace a record (a model, or a raw dict from disk)."""
+        obj_id = _field(obj, "id")
+        old = self.records[store].raw(obj_id)
+        if old is not None:
+            self._unindex(store, old)
+        elif order is not None:
+            self.order[obj_id] = order
+        elif obj_id not in self.order:
+            self.order[obj_id] = self._next_order
+            self._next_order += 1
+        self.records[store][obj_id] = obj
+        self.generation[store] += 1
+        self._index(store, obj)
+        self.issues.touch(self, store, old, obj)
+
+    def remove(self, store: str, obj_id: str) -> None:
+        old = self.records[store].pop(obj_id, None)
+        if old is not None:
+            self._unindex(store, old)
+            self.issues.touch(self, store, old, None)
+            self.order.pop(obj_id, None)
+            self._record_json.pop(obj_id, None)
+            self.generation[store] += 1
+
+    def _admit(self, store: str, item, trusted: bool) -> Tuple[Any, Optional[str]]:
+        """(record to put, None), or (item, reason) when it cannot be loaded."""
+        cls = model_class(store, item)
+        if cls is None:
+            kind = _kind(store, item) if isinstance(item, dict) else None
+            return item, f"unknown type {kind!r}" if isinstance(item, dict) else "record is not an object"
+        if trusted:
+            return item, check(cls, item)
+        return hydrate(cls, item)
+
+    def load_store(self, store: str, raw: List[Dict[str, Any]]) -> None:
+        for obj_id in list(self.records[store]):
+            self.remove(store, obj_id)
+        trusted = trusted_load()
+        problems = self.problems[store]
+        del problems[:]
+        for i, item in enumerate(raw):
+            item, reason = self._admit(store, item, trusted)
+            if reason is None:
+                self.put(store, item)
+            else:
+                rec_id = item.get("id") if isinstance(item, dict) else _field(item, "id")
+                problems.append({"index": i, "id": rec_id, "reason": reason})
+        if problems:
+            logger.warning(
+                "Skipped %d unreadable %s record(s) in %s (first: %s); run verify_project.py for details",
+                len(problems), store, self.pdir, problems[0]["reason"],
+            )
+
+    def apply_ops(self, store: str, ops: List[Dict[str, Any]]) -> None:
+        """Apply log operations appended by another writer (see oplog.read_tail)."""
+        trusted = trusted_load()
+        for op in ops:
+            if op["op"] == "delete":
+                self.remove(store, op["id"])
+                continue
+            item, reason = self._admit(store, op.get("data"), trusted)
+            if reason is None:
+                self.put(store, item)
+            else:
+                # Same outcome as a full replay: the record is unreadable, so it is absent
+                self.remove(store, op["id"])
+                self.problems[store].append({"id": op["id"], "reason": reason})
+                logger.warning("Skipped unreadable %s record %s in %s: %s", store, op["id"], self.pdir, reason)
+
+    def _index(self, store: str, obj) -> None:
+        obj_id = _field(obj, "id")
+        self.kinds[obj_id] = (store, _kind(store, obj))
+        if store == ENTITIES:
+            etype = _field(obj, "entity_type")
+            sheet = _field(obj, "source_sheet_number")
+            _add(self.by_sheet.setdefault(sheet, {}), etype, obj_id)
+            box = _box_of(obj)
+            if box is not None:
+                by_type = self.spatial.setdefault(sheet, {})
+                grid = by_type.get(etype)
+                if grid is None:
+                    grid = by_type[etype] = GridIndex()
+                grid.insert(obj_id, box, self.order[obj_id])
+            for field, target in _refs_of(obj):
+                _add(self.refs[field], target, obj_id)
+            if etype in INSTANCE_TYPES:
+                self._count_instance(obj, 1)
+        elif store == LINKS:
+            rel, src, tgt = _field(obj, "rel_type"), _field(obj, "source_id"), _field(obj, "target_id")
+            _add(self.out_edges, src, obj_id)
+            _add(self.in_edges, tgt, obj_id)
+            _add(self.by_rel, rel, obj_id)
+            self.link_keys[(rel, src, tgt)] = obj_id
+            if rel == "LOCATED_IN":
+                self._count_located_in(obj, 1)
+
+    def _unindex(self, store: str, obj) -> None:
+        obj_id = _field(obj, "id")
+        if store == LINKS and _field(obj, "rel_type") == "LOCATED_IN":
+            self._count_located_in(obj, -1)
+        if self.kinds.get(obj_id, (None,))[0] == store:
+            del self.kinds[obj_id]
+        if store == ENTITIES:
+            etype = _field(obj, "entity_type")
+            if etype in INSTANCE_TYPES:
+                self._count_instance(obj, -1)
+            sheet = _field(obj, "source_sheet_number")
+            if _box_of(obj) is not None:
+                grid = self.spatial.get(sheet, {}).get(etype)
+                if grid is not None:
+                    grid.remove(obj_id)
+            sheet_types = self.by_sheet.get(sheet)
+            if sheet_types is not None:
+                _discard(sheet_types, etype, obj_id)
+                if not sheet_types:
+                    del self.by_sheet[sheet]
+            for field, target in _refs_of(obj):
+                _discard(self.refs[field], target, obj_id)
+        elif store == LINKS:
+            rel, src, tgt = _field(obj, "rel_type"), _field(obj, "source_id"), _field(obj, "target_id")
+            _discard(self.out_edges, src, obj_id)
+            _discard(self.in_edges, tgt, obj_id)
+            _discard(self.by_rel, rel, obj_id)
+            key = (rel, src, tgt)
+            if self.link_keys.get(key) == obj_id:
+                del self.link_keys[key]
+
+
+_cache: "OrderedDict[str, GraphIndex]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def store_path(pdir: str, store: str) -> str:
+    return os.path.join(pdir, STORE_FILENAMES[store])
+
+
+def _snapshot_signature(path: str):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _refresh(idx: GraphIndex, store: str, repair: bool) -> None:
+    """Bring one store of `idx` up to date with disk.
+
+    While the snapshot is unchanged only the log lines appended since the last
+    refresh are read and applied. Anything else (snapshot replaced, log
+    compacted or rewritten) reloads the store. A reload re-checks the snapshot
+    afterwards and retries, so a compaction racing with the read cannot leave
+    the index built from an old snapshot with the new (empty) log.
+    """
+    path = store_path(idx.pdir, store)
+    snap = _snapshot_signature(path)
+    state = idx.signatures.get(store)
+    if state is not None and state[0] == snap:
+        tail = oplog.read_tail(path, state[1], repair)
+        if tail is not None:
+            idx.apply_ops(store, tail[0])
+            idx.signatures[store] = (snap, tail[1])
+            return
+    while True:
+        records, pos = oplog.replay(path, repair)
+        after = _snapshot_signature(path)
+        if after == snap:
+            break
+        snap = after
+    idx.load_store(store, records)
+    idx.signatures[store] = (snap, pos)
+
+
+def get_index(project_id: str) -> GraphIndex:
+    """Return the up-to-date index for a project, catching up with disk first.
+
+    Only the in-process lock is taken (see locks.read_lock), so in file lock
+    mode every worker keeps its own index and refreshes it from whatever the
+    others appended, without serializing reads across processes.
+    """
+    pdir = os.path.abspath(project_dir(project_id))
+    with read_lock(pdir) as writer:
+        with _cache_lock:
+            idx = _cache.get(pdir)
+            if idx is None:
+                idx = _cache[pdir] = GraphIndex(pdir)
+                while len(_cache) > MAX_CACHED_PROJECTS:
+                    _cache.popitem(last=False)
+            else:
+                _cache.move_to_end(pdir)
+        for store in STORE_FILENAMES:
+            _refresh(idx, store, writer)
+        return idx
+
+
+class Transaction:
+    """Changes staged against a live index; see the module docstring."""
+
+    def __init__(self, project_id: str, index: GraphIndex):
+        self.project_id = project_id
+        self.index = index
+        self.changes: List[Change] = []
+        self._orders: List[Optional[int]] = []
+        # How the history log records this transaction: a new step, or undo/redo of one
+        self.history_op = history.DO
+
+    def stage(self, change: Change) -> None:
+        self._orders.append(self.index.order.get(change.id))
+        if change.after is None:
+            self.index.remove(change.store, change.id)
+        else:
+            self.index.put(change.store, change.after)
+        self.changes.append(change)
+
+    def put(self, store: str, obj) -> None:
+        self.stage(Change(store, obj.id, self.index.records[store].get(obj.id), obj))
+
+    def delete(self, store: str, obj_id: str) -> None:
+        before = self.index.records[store].get(obj_id)
+        if before is not None:
+            self.stage(Change(store, obj_id, before, None))
+
+    def rollback(self) -> None:
+        for change, order in zip(reversed(self.changes), reversed(self._orders)):
+            if change.before is None:
+                self.index.remove(change.store, change.id)
+            else:
+                self.index.put(change.store, change.before, order=order)
+        self.changes, self._orders = [], []
+
+    def _persist(self) -> None:
+        by_store: Dict[str, List[Dict[str, Any]]] = {}
+        for ch in self.changes:
+            if ch.after is None:
+                op = oplog.delete_op(ch.id)
+            elif ch.before is None:
+                op = oplog.create_op(_plain(ch.after))
+            else:
+                op = oplog.update_op(_plain(ch.after))
+            by_store.setdefault(ch.store, []).append(op)
+        os.makedirs(self.index.pdir, exist_ok=True)
+        for store, ops in by_store.items():
+            path = store_path(self.index.pdir, store)
+            oplog.append_ops(path, ops)
+            # The index already holds these ops; skip past them on the next refresh
+            self.index.signatures[store] = (_snapshot_signature(path), oplog.position(path))
+        changes.get_feed(self.index.pdir).record(
+            [(ch.store, ch.id, changes.DELETE if ch.after is None else changes.UPSERT) for ch in self.changes]
+        )
+        if self.history_op != history.DO:
+            history.get_history(self.index.pdir).record(self.history_op)
+        elif self.changes:
+            step = [
+                {"store": ch.store, "id": ch.id, "before": _plain(ch.before), "after": _plain(ch.after)}
+                for ch in self.changes
+            ]
+            history.get_history(self.index.pdir).record(history.DO, step)
+
+
+def _plain(obj) -> Optional[Dict[str, Any]]:
+    if obj is None or type(obj) is dict:
+        return obj
+    return obj.dict()
+
+
+_active = threading.local()
+
+
+@contextmanager
+def transaction(project_id: str) -> Iterator[Transaction]:
+    """Group store changes so they are validated together and persisted once.
+
+    Nested calls for the same project join the outermost transaction, so store
+    functions can be composed (e.g. by the batch endpoint) without extra writes.
+    """
+    pdir = os.path.abspath(project_dir(project_id))
+    with dir_lock(pdir):
+        active: Dict[str, Transaction] = getattr(_active, "txns", None) or {}
+        _active.txns = active
+        outer = active.get(pdir)
+        if outer is not None:
+            yield outer
+            return
+        txn = active[pdir] = Transaction(project_id, get_index(project_id))
+        try:
+            yield txn
+        except BaseException:
+            txn.rollback()
+            raise
+        finally:
+            del active[pdir]
+        try:
+            txn._persist()
+        except BaseException:
+            # Disk may hold part of the batch; forget signatures so the next
+            # access reloads the stores from what was actually written.
+            txn.rollback()
+            txn.index.signatures.clear()
+            raise
+
+
+def commit(project_id: str, staged: List[Change]) -> None:
+    """Stage changes and persist them (or join the active transaction)."""
+    if not staged:
+        return
+    with transaction(project_id) as txn:
+        for ch in staged:
+            txn.stage(ch)
+
+
+def replace_store(project_id: str, store: str, records: List[Dict[str, Any]]) -> None:
+    """Rewrite a whole store as a fresh snapshot (drops its log).
+
+    Per-record history is lost, so the change feed gets a reset marker and
+    clients behind it reload in full, and undo history is cleared.
+    """
+    pdir = os.path.abspath(project_dir(project_id))
+    with dir_lock(pdir):
+        os.makedirs(pdir, exist_ok=True)
+        oplog.write_snapshot(store_path(pdir, store), records)
+        changes.get_feed(pdir).record_reset()
+        history.get_history(pdir).record(history.CLEAR)
+
+
+def _as_record(store: str, data: Optional[Dict[str, Any]]):
+    if data is None:
+        return None
+    cls = model_class(store, data)
+    if cls is None:
+        raise ValueError(f"History holds an unknown {store} record {data.get('id')!r}")
+    return hydrate(cls, data)[0]
+
+
+def step_history(project_id: str, op: str) -> Optional[List[Change]]:
+    """Undo (op="undo") or redo (op="redo") one history step in a single transaction.
+
+    Returns the changes applied, or None when there is nothing to undo/redo.
+    Raises ValueError when a record touched by the step no longer matches the
+    step (it was changed by something that bypassed the history); nothing is
+    applied then.
+    """
+    pdir = os.path.abspath(project_dir(project_id))
+    with dir_lock(pdir):
+        step = history.get_history(pdir).peek(op)
+        if step is None:
+            return None
+        src, dst = ("after", "before") if op == history.UNDO else ("before", "after")
+        with transaction(project_id) as txn:
+            txn.history_op = op
+            for ch in reversed(step) if op == history.UNDO else step:
+                current = txn.index.records[ch["store"]].get(ch["id"])
+                if json.loads(json.dumps(_plain(current))) != ch[src]:
+                    raise ValueError(f"Cannot {op}: {ch['store']} record {ch['id']} was changed outside the history")
+                txn.stage(Change(ch["store"], ch["id"], current, _as_record(ch["store"], ch[dst])))
+            return list(txn.changes)
+
+
+def history_depth(project_id: str) -> Dict[str, int]:
+    return history.get_history(project_dir(project_id)).depth()
+
+
+def encoded_store(project_id: str, store: str) -> Tuple[str, bytes]:
+    """Cached (etag, JSON bytes) for the full list of a store; see GraphIndex.encoded."""
+    pdir = os.path.abspath(project_dir(project_id))
+    with read_lock(pdir):
+        return get_index(project_id).encoded(store)
+
+
+def quantities(project_id: str, dimension: Optional[str] = None, key: Optional[str] = None) -> Dict[str, Any]:
+    """Instance counts from the maintained aggregates (see GraphIndex.quantity).
+
+    With `key`, the single entry for it (O(1)); otherwise every entry of
+    `dimension`, or of all dimensions. Sheet keys are given as strings, like
+    every other id in the API. Raises ValueError for an unknown dimension.
+    """
+    dims = QUANTITY_DIMENSIONS if dimension is None else (dimension,)
+    unknown = [d for d in dims if d not in QUANTITY_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown quantity dimension: {unknown[0]}")
+    if key is not None and dimension is None:
+        raise ValueError("key requires a dimension")
+    idx = get_index(project_id)
+    with read_lock(idx.pdir):
+        if key is not None:
+            lookup = int(key) if dimension == "sheet" and key.isdigit() else key
+            return {"dimension": dimension, "key": key, **idx.quantity(dimension, lookup)}
+        return {d: {str(k): idx.quantity(d, k) for k in list(idx.quantities[d])} for d in dims}
+
+
+def needs_attention(
+    project_id: str,
+    codes: Optional[List[str]] = None,
+    categories: Optional[List[str]] = None,
+    offset: int = 0,
+    limit: int = 100,
+) -> Dict[str, Any]:
+    """One page of the records the Needs Attention rules flag, oldest first.
+
+    Filtered to the records breaking any of `codes` or any rule in
+    `categories` (both None: every rule). ``counts`` is always per rule over
+    the whole project. Raises ValueError for an unknown code or category.
+    """
+    selected = codes_for(codes, categories)
+    idx = get_index(project_id)
+    with read_lock(idx.pdir):
+        return idx.issues.page(idx, selected, offset, limit)
+
+
+def current_revision(project_id: str) -> int:
+    return changes.get_feed(project_dir(project_id)).current()
+
+
+def changes_since(
+    project_id: str, rev: Optional[int], stores: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Upserted records and deleted ids per store since revision `rev`.
+
+    ``reset`` is True when the feed cannot answer for `rev` (no `rev` given,
+    history trimmed or replaced, or `rev` from the future); the client must
+    then reload in full and continue from the returned revision.
+    """
+    index = get_index(project_id)
+    feed = changes.get_feed(index.pdir)
+    wanted = list(STORE_FILENAMES) if stores is None else [s for s in STORE_FILENAMES if s in stores]
+    upserts: Dict[str, List[Any]] = {s: [] for s in wanted}
+    deletes: Dict[str, List[str]] = {s: [] for s in wanted}
+    with read_lock(index.pdir):
+        if rev is None:
+            current, reset, entries = feed.current(), True, []
+        else:
+            current, reset, entries = feed.since(rev)
+        for e in entries:
+            if e.store not in upserts:
+                continue
+            obj = index.records[e.store].get(e.id) if e.op == changes.UPSERT else None
+            if obj is not None:
+                upserts[e.store].append(obj)
+            else:
+                deletes[e.store].append(e.id)
+    return {"revision": current, "reset": reset, "upserts": upserts, "deletes": deletes}
+
+
+__all__ = [
+    "GraphIndex",
+    "Change",
+    "model_class",
+    "Transaction",
+    "get_index",
+    "transaction",
+    "commit",
+    "replace_store",
+    "step_history",
+    "history_depth",
+    "changes_since",
+    "current_revision",
+    "encoded_store",
+    "quantities",
+    "needs_attention",
+    "QUANTITY_DIMENSIONS",
+    "REF_FIELDS",
+    "ENTITIES",
+    "CONCEPTS",
+    "LINKS",
+]
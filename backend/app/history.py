@@ -0,0 +1,104 @@
+"""Per-project undo/redo history built on the store transactions.
+
+Every committed transaction appends one step to
+``projects/{id}/history.log.jsonl`` holding, for each changed record, its full
+state before and after::
+
+    {"op": "do", "changes": [{"store": "entities", "id": "...", "before": {...} | null, "after": {...} | null}]}
+
+Everything a request changes commits in one transaction, including what the
+server derives on its own: recomputed ``instantiated_in_id``, cascaded link
+deletes. Each request is therefore one step, and a step is its own inverse
+(swap ``before`` and ``after``). Undo applies the inverse of the latest step
+as a new transaction and appends ``{"op": "undo"}``; redo re-applies the step
+most recently undone and appends ``{"op": "redo"}``. Records come back with
+their original ids, and nothing is copied beyond the changed records. A new
+edit after an undo drops the redo steps, and ``{"op": "clear"}`` (a whole
+store replaced by ``save_*``) drops all history, since the steps before it
+can no longer be inverted.
+
+The file is tail-read like the change feed (see changes.py), so every worker
+sees the same history. Only the last ``TIMBERGEM_HISTORY_MAX`` steps are kept.
+"""
+
+from __future__ import annotations
+
+import os, threading
+from typing import Any, Dict, List, Optional
+
+from .changes import TailedLog
+
+HISTORY_FILENAME = "history.log.jsonl"
+DO = "do"
+UNDO = "undo"
+REDO = "redo"
+CLEAR = "clear"
+
+MAX_STEPS = int(os.environ.get("TIMBERGEM_HISTORY_MAX", "200"))
+
+Step = List[Dict[str, Any]]
+
+
+class History(TailedLog):
+    """Undo and redo stacks of one project, mirrored from its history log."""
+
+    def _reset_state(self) -> None:
+        self.done: List[Step] = []
+        self.undone: List[Step] = []  # last item is the next redo
+
+    def _apply(self, rec: Dict[str, Any]) -> None:
+        op = rec["op"]
+        if op == DO:
+            self.done.append(rec["changes"])
+            self.undone = []
+        elif op == UNDO and self.done:
+            self.undone.append(self.done.pop())
+        elif op == REDO and self.undone:
+            self.done.append(self.undone.pop())
+        elif op == CLEAR:
+            self._reset_state()
+
+    def record(self, op: str, changes: Optional[Step] = None) -> None:
+        """Append one history line; callers hold the project lock."""
+        with self.lock:
+            self.refresh()
+            self._append([{"op": op, "changes": changes} if op == DO else {"op": op}])
+            self.refresh()
+            if len(self.done) + len(self.undone) > MAX_STEPS:
+                self._trim()
+
+    def peek(self, op: str) -> Optional[Step]:
+        """The step the next `op` (undo or redo) would revert or re-apply."""
+        with self.lock:
+            self.refresh()
+            stack = self.done if op == UNDO else self.undone
+            return stack[-1] if stack else None
+
+    def depth(self) -> Dict[str, int]:
+        with self.lock:
+            self.refresh()
+            return {"undo": len(self.done), "redo": len(self.undone)}
+
+    def _trim(self) -> None:
+        keep = MAX_STEPS // 2
+        undone = self.undone[-keep:]
+        done = self.done[-(keep - len(undone)):] if keep > len(undone) else []
+        # Replaying these lines rebuilds exactly the kept stacks
+        steps = done + list(reversed(undone))
+        self._rewrite([{"op": DO, "changes": s} for s in steps] + [{"op": UNDO}] * len(undone))
+
+
+_histories: Dict[str, History] = {}
+_histories_lock = threading.Lock()
+
+
+def get_history(pdir: str) -> History:
+    pdir = os.path.abspath(pdir)
+    with _histories_lock:
+        hist = _histories.get(pdir)
+        if hist is None:
+            hist = _histories[pdir] = History(os.path.join(pdir, HISTORY_FILENAME))
+        return hist
+
+
+__all__ = ["History", "get_history", "HISTORY_FILENAME", "DO", "UNDO", "REDO", "CLEAR"]
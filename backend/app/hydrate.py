@@ -0,0 +1,99 @@
+"""Building store models from on-disk records.
+
+Everything in the stores was validated by Pydantic when it was written, so the
+load path trusts it: a load only runs a cheap structural check (the record is
+an object of a known type carrying every required field) and keeps the raw
+dict. The graph index is built straight from those dicts, and a record becomes
+a model only when something reads it (see ``LazyRecords`` in graph_index.py).
+Full-list reads are encoded from the raw dicts too. A large project therefore
+loads without building a single model.
+
+Hydration on access runs normal validation. A record that fails is still built
+(with ``model_construct``, so it stays visible and editable) and is reported
+rather than silently dropped. Set ``TIMBERGEM_TRUSTED_LOAD=0`` to hydrate and
+validate everything eagerly on load. The verify command (verify.py) validates a
+whole project explicitly.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, FrozenSet, Optional, Tuple, Type, get_args
+
+from pydantic import BaseModel
+
+
+def trusted_load() -> bool:
+    return os.environ.get("TIMBERGEM_TRUSTED_LOAD", "1") != "0"
+
+
+_nested_cache: Dict[type, Dict[str, type]] = {}
+_required_cache: Dict[type, Tuple[str, ...]] = {}
+_names_cache: Dict[type, FrozenSet[str]] = {}
+
+
+def _model_in(annotation) -> Optional[type]:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in get_args(annotation):
+        found = _model_in(arg)
+        if found is not None:
+            return found
+    return None
+
+
+def _nested(cls: Type[BaseModel]) -> Dict[str, type]:
+    hit = _nested_cache.get(cls)
+    if hit is None:
+        hit = {}
+        for name, field in cls.model_fields.items():
+            sub = _model_in(field.annotation)
+            if sub is not None:
+                hit[name] = sub
+        _nested_cache[cls] = hit
+    return hit
+
+
+def _required(cls: Type[BaseModel]) -> Tuple[str, ...]:
+    hit = _required_cache.get(cls)
+    if hit is None:
+        hit = _required_cache[cls] = tuple(n for n, f in cls.model_fields.items() if f.is_required())
+    return hit
+
+
+def field_names(cls: Type[BaseModel]) -> FrozenSet[str]:
+    hit = _names_cache.get(cls)
+    if hit is None:
+        hit = _names_cache[cls] = frozenset(cls.model_fields)
+    return hit
+
+
+def check(cls: Type[BaseModel], item: Dict[str, Any]) -> Optional[str]:
+    """Cheap structural check for trusted loads; returns a reason or None."""
+    missing = [n for n in _required(cls) if n not in item]
+    if missing:
+        return "missing required field(s): " + ", ".join(missing)
+    return None
+
+
+def construct(cls: Type[BaseModel], data: Dict[str, Any]) -> BaseModel:
+    """Build `cls` from trusted data without validation, recursing into nested models."""
+    values = dict(data)
+    for name, sub in _nested(cls).items():
+        v = values.get(name)
+        if isinstance(v, dict):
+            values[name] = construct(sub, v)
+        elif isinstance(v, list):
+            values[name] = [construct(sub, x) if isinstance(x, dict) else x for x in v]
+    return cls.model_construct(**values)
+
+
+def hydrate(cls: Type[BaseModel], item: Dict[str, Any]) -> Tuple[BaseModel, Optional[str]]:
+    """(model, None), or (unvalidated model, reason) when validation fails."""
+    try:
+        return cls.model_validate(item), None
+    except Exception as e:
+        return construct(cls, item), " ".join(str(e).split()) or type(e).__name__
+
+
+__all__ = ["check", "construct", "hydrate", "field_names", "trusted_load"]
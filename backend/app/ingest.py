@@ -1,8 +1,12 @@
-import os, json, time, traceback
+import os, json, threading, time, traceback
 import fitz  # PyMuPDF
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+
+from . import codec
 
 BASE_DIR = os.environ.get("TIMBERGEM_PROJECTS_DIR", "projects")
+# Statuses during which ingest is still writing pages/OCR into the project
+PROCESSING_STATUSES = ("queued", "render", "ocr")
 
 # ---------- Manifest Utilities ----------
 
@@ -15,19 +19,64 @@ def manifest_path(project_id: str) -> str:
     return os.path.join(project_dir(project_id), "manifest.json")
 
 
+# Manifest registry: path -> (file signature, parsed manifest). Keyed by path,
+# so a different BASE_DIR never sees another's entries. Writes below refresh
+# their entry; a file replaced by anything else (import, restore, another
+# process) has a new signature and is parsed again on the next read.
+_manifests: Dict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]] = {}
+# Pairs a write with the signature it produced
+_manifests_lock = threading.Lock()
+
+
+def _copy(value):
+    # Manifests are plain JSON values; much cheaper than copy.deepcopy
+    if type(value) is dict:
+        return {k: _copy(v) for k, v in value.items()}
+    if type(value) is list:
+        return [_copy(v) for v in value]
+    return value
+
+
+def _signature(path: str) -> Tuple[int, int, int]:
+    st = os.stat(path)
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
 def read_manifest(project_id: str) -> Optional[Dict[str, Any]]:
+    path = manifest_path(project_id)
     try:
-        with open(manifest_path(project_id), "r") as f:
-            return json.load(f)
+        sig = _signature(path)
+        cached = _manifests.get(path)
+        if cached is None or cached[0] != sig:
+            cached = (sig, codec.read_file(path))
+            _manifests[path] = cached
     except FileNotFoundError:
+        _manifests.pop(path, None)
         return None
+    # Callers update the manifest they get in place
+    return _copy(cached[1])
+
+
+def project_known(project_id: str) -> bool:
+    """Whether the project's manifest is in the registry and still on disk.
+
+    A dict lookup plus one ``stat``, which evicts projects deleted since. False
+    only means "not seen yet"; :func:`read_manifest` settles it.
+    """
+    path = manifest_path(project_id)
+    if path not in _manifests:
+        return False
+    if not os.path.exists(path):
+        _manifests.pop(path, None)
+        return False
+    return True
 
 
 def atomic_write(path: str, data: Dict[str, Any]):
-    tmp = path + ".tmp"
-    with open(tmp, "w") as f:
-        json.dump(data, f, indent=2)
-    os.replace(tmp, path)
+    # Manifests are small and rewritten on every progress tick: always plain compact JSON
+    with _manifests_lock:
+        codec.write_file(path, data, "json")
+        _manifests[path] = (_signature(path), _copy(data))
 
 
 def write_manifest(project_id: str, data: Dict[str, Any]):
@@ -62,9 +111,48 @@ def patch_manifest(project_id: str, **updates):
     write_manifest(project_id, m)
 
 
+def is_processing(m: Dict[str, Any]) -> bool:
+    return m.get("status") in PROCESSING_STATUSES
+
+
 # ---------- Ingestion Logic ----------
 
 
+def page_path(project_id: str, page_num: int) -> str:
+    return os.path.join(project_dir(project_id), "pages", f"page_{page_num}.png")
+
+
+def _save_page(doc, index: int, path: str, matrix) -> None:
+    pix = doc.load_page(index).get_pixmap(matrix=matrix, alpha=False)
+    # Written aside and renamed so a concurrent reader never serves half a PNG
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    pix.save(tmp, output="png")
+    os.replace(tmp, path)
+
+
+def render_page(project_id: str, page_num: int, dpi: int = 300) -> Optional[str]:
+    """Render one page from original.pdf if its PNG is missing.
+
+    Projects imported without rasters re-render lazily through this. Returns the
+    PNG path, or None when the page does not exist.
+    """
+    path = page_path(project_id, page_num)
+    if os.path.exists(path):
+        return path
+    pdf_path = os.path.join(project_dir(project_id), "original.pdf")
+    if not os.path.exists(pdf_path):
+        return None
+    doc = fitz.open(pdf_path)
+    try:
+        if not 1 <= page_num <= doc.page_count:
+            return None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _save_page(doc, page_num - 1, path, fitz.Matrix(dpi / 72, dpi / 72))
+    finally:
+        doc.close()
+    return path
+
+
 def ingest_pdf(project_id: str, pdf_path: str, dpi: int = 300):
     try:
         patch_manifest(project_id, status="render")
@@ -88,9 +176,7 @@ def ingest_pdf(project_id: str, pdf_path: str, dpi: int = 300):
 
         # Render stage
         for i in range(num_pages):
-            page = doc.load_page(i)
-            pix = page.get_pixmap(matrix=render_matrix, alpha=False)
-            pix.save(os.path.join(pages_dir, f"page_{i+1}.png"))
+            _save_page(doc, i, os.path.join(pages_dir, f"page_{i+1}.png"), render_matrix)
             # update render progress
             m = read_manifest(project_id)
             if m:
@@ -144,6 +230,7 @@ __all__ = [
     "ingest_pdf",
     "init_manifest",
     "read_manifest",
+    "project_known",
     "manifest_path",
     "project_dir",
 ]
@@ -0,0 +1,191 @@
+"""Needs Attention rules, kept up to date as records are indexed.
+
+Each rule flags one kind of gap on one record:
+
+- ``untitled``: a drawing, legend or schedule without a title, or a note
+  without text.
+- ``scope_incomplete``: a scope entity without both name and description.
+- ``unnamed_definition``: a symbol/component definition without a name.
+- ``definition_not_placed``: a definition with no ``defined_in_id``.
+- ``missing_definition``: an instance whose definition does not exist.
+- ``instance_outside_drawing``: an instance on the canvas that is not
+  ``instantiated_in`` any drawing.
+- ``instance_without_scope``: an instance no scope is ``JUSTIFIED_BY``.
+- ``scope_without_evidence``: a scope with no ``JUSTIFIED_BY`` evidence.
+- ``orphaned_item``: a schedule item, assembly or legend item whose container
+  was deleted.
+
+Every rule has a category (``drawing``, ``definition`` or ``scope``), the same
+as the ``validation.missing`` flags the client derives for the Needs Attention
+filter. A rule reads only the record, the existence of records it references,
+and whether it has a ``JUSTIFIED_BY`` link. So when a record or link changes,
+only that record and its direct dependents are re-evaluated: items of a
+container, instances of a definition, or both ends of a ``JUSTIFIED_BY``
+link. The GraphIndex calls :meth:`IssueSet.touch` from ``put`` and ``remove``,
+which every write path goes through: transactions and their rollback, undo,
+log replays and other workers' log tails.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+ENTITIES = "entities"
+CONCEPTS = "concepts"
+LINKS = "links"
+INSTANCE_TYPES = ("symbol_instance", "component_instance")
+DEFINITION_TYPES = ("symbol_definition", "component_definition")
+CONTAINER_FIELDS = {"schedule_item": "schedule_id", "assembly": "assembly_group_id", "legend_item": "legend_id"}
+# Fields whose target's existence some rule depends on
+DEPENDENT_FIELDS = ("schedule_id", "assembly_group_id", "legend_id", "symbol_definition_id", "component_definition_id")
+
+
+def _get(obj, name: str):
+    if type(obj) is dict:
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _blank(value) -> bool:
+    return not (isinstance(value, str) and value.strip())
+
+
+def _justified(idx, node: str, outgoing: bool) -> bool:
+    edges = idx.out_edges if outgoing else idx.in_edges
+    links = idx.records[LINKS]
+    return any(_get(links.raw(l), "rel_type") == "JUSTIFIED_BY" for l in tuple(edges.get(node, ())))
+
+
+def _untitled(idx, obj) -> bool:
+    return _blank(_get(obj, "text" if _get(obj, "entity_type") == "note" else "title"))
+
+
+def _missing_definition(idx, obj) -> bool:
+    target = _get(obj, "symbol_definition_id") or _get(obj, "component_definition_id")
+    return not target or target not in idx.kinds
+
+
+def _orphaned(idx, obj) -> bool:
+    parent = _get(obj, CONTAINER_FIELDS[_get(obj, "entity_type")])
+    return not parent or parent not in idx.kinds
+
+
+Check = Callable[[Any, Any], bool]
+# code -> (category, store, kinds it applies to, check)
+RULES: Dict[str, Tuple[str, str, Tuple[str, ...], Check]] = {
+    "untitled": ("drawing", ENTITIES, ("drawing", "legend", "schedule", "note"), _untitled),
+    "scope_incomplete": (
+        "scope", ENTITIES, ("scope",), lambda idx, o: _blank(_get(o, "name")) or _blank(_get(o, "description"))
+    ),
+    "unnamed_definition": ("definition", ENTITIES, DEFINITION_TYPES, lambda idx, o: _blank(_get(o, "name"))),
+    "definition_not_placed": ("definition", ENTITIES, DEFINITION_TYPES, lambda idx, o: not _get(o, "defined_in_id")),
+    "missing_definition": ("definition", ENTITIES, INSTANCE_TYPES, _missing_definition),
+    "instance_outside_drawing": (
+        "drawing", ENTITIES, INSTANCE_TYPES,
+        lambda idx, o: _get(o, "bounding_box") is not None and not _get(o, "instantiated_in_id"),
+    ),
+    "instance_without_scope": ("scope", ENTITIES, INSTANCE_TYPES, lambda idx, o: not _justified(idx, _get(o, "id"), False)),
+    "scope_without_evidence": ("scope", "*", ("scope",), lambda idx, o: not _justified(idx, _get(o, "id"), True)),
+    "orphaned_item": ("definition", ENTITIES, tuple(CONTAINER_FIELDS), _orphaned),
+}
+CATEGORIES = ("drawing", "definition", "scope")
+
+# (store, kind) -> codes of the rules that apply
+_RULES_FOR: Dict[Tuple[str, str], List[str]] = {}
+for _code, (_cat, _store, _kinds, _check) in RULES.items():
+    for _st in ((ENTITIES, CONCEPTS) if _store == "*" else (_store,)):
+        for _kind in _kinds:
+            _RULES_FOR.setdefault((_st, _kind), []).append(_code)
+
+
+class IssueSet:
+    """Which records currently break which rules."""
+
+    def __init__(self):
+        self.by_code: Dict[str, Set[str]] = {code: set() for code in RULES}
+        self.by_id: Dict[str, Tuple[str, ...]] = {}
+        # Bumped whenever membership changes; keys the sorted listing cache
+        self.generation = 0
+        self._sorted: Tuple[int, List[str]] = (-1, [])
+
+    def recheck(self, idx, obj_id: str) -> None:
+        hit = idx.kinds.get(obj_id)
+        found: Tuple[str, ...] = ()
+        if hit is not None:
+            codes = _RULES_FOR.get(hit)
+            if codes:
+                obj = idx.records[hit[0]].raw(obj_id)
+                found = tuple(c for c in codes if RULES[c][3](idx, obj))
+        old = self.by_id.get(obj_id, ())
+        if found == old:
+            return
+        for code in old:
+            self.by_code[code].discard(obj_id)
+        for code in found:
+            self.by_code[code].add(obj_id)
+        if found:
+            self.by_id[obj_id] = found
+        else:
+            self.by_id.pop(obj_id, None)
+        self.generation += 1
+
+    def touch(self, idx, store: str, before, after) -> None:
+        """Re-evaluate what replacing `before` with `after` can affect (None: absent)."""
+        if store == LINKS:
+            for link in (before, after):
+                if link is not None and _get(link, "rel_type") == "JUSTIFIED_BY":
+                    self.recheck(idx, _get(link, "source_id"))
+                    self.recheck(idx, _get(link, "target_id"))
+            return
+        obj_id = _get(after if after is not None else before, "id")
+        self.recheck(idx, obj_id)
+        if before is None or after is None:
+            # Dependents only care whether the record exists
+            for field in DEPENDENT_FIELDS:
+                for dependent in tuple(idx.referrers(field, obj_id)):
+                    self.recheck(idx, dependent)
+
+    def page(
+        self, idx, codes: Optional[List[str]] = None, offset: int = 0, limit: int = 100
+    ) -> Dict[str, Any]:
+        """Flagged records in creation order, optionally only those with `codes`."""
+        gen, ordered = self._sorted
+        if gen != self.generation:
+            ordered = sorted(self.by_id, key=lambda i: idx.order.get(i, 0))
+            self._sorted = (self.generation, ordered)
+        if codes is not None:
+            wanted = set(codes)
+            ordered = [i for i in ordered if wanted.intersection(self.by_id[i])]
+        items = []
+        for obj_id in ordered[offset : offset + limit]:
+            store, kind = idx.kinds[obj_id]
+            obj = idx.records[store].raw(obj_id)
+            items.append({
+                "id": obj_id,
+                "kind": kind,
+                "sheet": _get(obj, "source_sheet_number"),
+                "issues": [{"code": c, "category": RULES[c][0]} for c in self.by_id[obj_id]],
+            })
+        return {
+            "total": len(ordered),
+            "counts": {code: len(ids) for code, ids in self.by_code.items()},
+            "items": items,
+        }
+
+
+def codes_for(codes: Optional[List[str]], categories: Optional[List[str]]) -> Optional[List[str]]:
+    """Rule codes selected by explicit codes and/or categories (None: all)."""
+    if codes is None and categories is None:
+        return None
+    for code in codes or ():
+        if code not in RULES:
+            raise ValueError(f"Unknown issue code: {code}")
+    for cat in categories or ():
+        if cat not in CATEGORIES:
+            raise ValueError(f"Unknown issue category: {cat}")
+    selected = set(codes or ())
+    selected |= {c for c, rule in RULES.items() if categories and rule[0] in categories}
+    return sorted(selected)
+
+
+__all__ = ["IssueSet", "RULES", "CATEGORIES", "codes_for"]
@@ -2,16 +2,17 @@
 
 Stores JSON array under projects/{project_id}/links.json
 Each link is stored as its dict representation (already validated by Pydantic).
+Mutations are appended to links.log.jsonl (see oplog.py).
 """
 
 from __future__ import annotations
 
-import os, json, uuid
+import os, uuid
 from typing import List, Tuple, Set
 from .ingest import project_dir
+from .locks import locked, read_lock
 from .concepts_models import Relationship, CreateRelationship
-from .entities_store import load_entities
-from .concepts_store import load_concepts
+from .graph_index import GraphIndex, get_index, commit, Change, LINKS, ENTITIES, CONCEPTS, replace_store
 
 
 LINKS_FILENAME = "links.json"
@@ -33,52 +34,46 @@ def links_path(project_id: str) -> str:
 
 
 def load_links(project_id: str) -> List[Relationship]:
-    path = links_path(project_id)
-    if not os.path.exists(path):
-        return []
-    with open(path) as f:
-        raw = json.load(f)
-    links: List[Relationship] = []
-    for item in raw:
-        try:
-            links.append(Relationship(**item))
-        except Exception:
-            continue
-    return links
-
-
-def _atomic_write(path: str, data):
-    tmp = path + ".tmp"
-    with open(tmp, "w") as f:
-        json.dump(data, f, indent=2)
-    os.replace(tmp, path)
+    idx = get_index(project_id)
+    with read_lock(idx.pdir):
+        return list(idx.links.values())
 
 
+@locked
 def save_links(project_id: str, links: List[Relationship]):
-    os.makedirs(project_dir(project_id), exist_ok=True)
-    path = links_path(project_id)
-    serializable = [l.dict() for l in links]
-    _atomic_write(path, serializable)
+    """Rewrite the whole store (snapshot) and drop its log."""
+    replace_store(project_id, LINKS, [l.dict() for l in links])
 
 
-def _id_kind(project_id: str, obj_id: str) -> str | None:
+def _kind_in(index: GraphIndex, obj_id: str) -> str | None:
     # Return an abstract kind string for validation, or None if id not found.
-    ents = load_entities(project_id)
-    for e in ents:
-        if getattr(e, "id", None) == obj_id:
-            return getattr(e, "entity_type", None)
-    cons = load_concepts(project_id)
-    for c in cons:
-        if getattr(c, "id", None) == obj_id:
-            return getattr(c, "kind", None)
-    return None
+    hit = index.kind_of(obj_id)
+    if hit is None or hit[0] not in (ENTITIES, CONCEPTS):
+        return None
+    return hit[1]
 
 
-def create_link(project_id: str, payload: CreateRelationship) -> Relationship:
-    links = load_links(project_id)
-    # Existence and kind validation
-    sk = _id_kind(project_id, payload.source_id)
-    tk = _id_kind(project_id, payload.target_id)
+def _id_kind(project_id: str, obj_id: str) -> str | None:
+    return _kind_in(get_index(project_id), obj_id)
+
+
+def query_links(
+    project_id: str,
+    *,
+    source_ids: List[str] | None = None,
+    target_ids: List[str] | None = None,
+    rel_types: List[str] | None = None,
+) -> List[Relationship]:
+    """Links matching all given filters; each filter accepts several values (any-of)."""
+    idx = get_index(project_id)
+    with read_lock(idx.pdir):
+        return idx.query_links(source_ids, target_ids, rel_types)
+
+
+def _validate_new_link(index: GraphIndex, payload: CreateRelationship) -> None:
+    # Existence and kind validation against the id index (no store scans)
+    sk = _kind_in(index, payload.source_id)
+    tk = _kind_in(index, payload.target_id)
     if sk is None:
         raise ValueError("source_id not found")
     if tk is None:
@@ -91,30 +86,90 @@ def create_link(project_id: str, payload: CreateRelationship) -> Relationship:
         raise ValueError(f"Invalid source kind '{sk}' for {payload.rel_type}")
     if tk not in allowed_targets:
         raise ValueError(f"Invalid target kind '{tk}' for {payload.rel_type}")
+
+
+def _new_link(payload: CreateRelationship) -> Relationship:
+    return Relationship(id=uuid.uuid4().hex, rel_type=payload.rel_type, source_id=payload.source_id, target_id=payload.target_id)
+
+
+@locked
+def create_link(project_id: str, payload: CreateRelationship) -> Relationship:
+    index = get_index(project_id)
+    _validate_new_link(index, payload)
     # Prevent duplicates
-    for l in links:
-        if l.rel_type == payload.rel_type and l.source_id == payload.source_id and l.target_id == payload.target_id:
-            raise ValueError("Duplicate link")
-    new = Relationship(id=uuid.uuid4().hex, rel_type=payload.rel_type, source_id=payload.source_id, target_id=payload.target_id)
-    links.append(new)
-    save_links(project_id, links)
+    if index.find_link(payload.rel_type, payload.source_id, payload.target_id):
+        raise ValueError("Duplicate link")
+    new = _new_link(payload)
+    commit(project_id, [Change(LINKS, new.id, None, new)])
     return new
 
 
+@locked
+def apply_link_batch(
+    project_id: str,
+    create: List[CreateRelationship],
+    delete: List[str],
+) -> Tuple[List[Relationship], List[str]]:
+    """Delete and create many links in one validated, single-write step.
+
+    Deletes run first so a batch can replace a link with the same endpoints.
+    Any unknown link id, invalid pair or duplicate (against the store or within
+    the batch) rejects the whole batch with a ValueError naming the entry.
+    """
+    index = get_index(project_id)
+    changes: List[Change] = []
+    doomed: Set[str] = set()
+    for i, link_id in enumerate(delete):
+        current = index.links.get(link_id)
+        if current is None or link_id in doomed:
+            raise ValueError(f"delete {i}: Link not found")
+        doomed.add(link_id)
+        changes.append(Change(LINKS, link_id, current, None))
+    seen: Set[Tuple[str, str, str]] = set()
+    created: List[Relationship] = []
+    for i, payload in enumerate(create):
+        key = (payload.rel_type, payload.source_id, payload.target_id)
+        try:
+            _validate_new_link(index, payload)
+            existing = index.find_link(*key)
+            if key in seen or (existing is not None and existing.id not in doomed):
+                raise ValueError("Duplicate link")
+        except ValueError as e:
+            raise ValueError(f"create {i}: {e}") from e
+        seen.add(key)
+        new = _new_link(payload)
+        created.append(new)
+        changes.append(Change(LINKS, new.id, None, new))
+    commit(project_id, changes)
+    return created, list(delete)
+
+
+@locked
 def delete_link(project_id: str, link_id: str) -> bool:
-    links = load_links(project_id)
-    new_links = [l for l in links if getattr(l, "id", None) != link_id]
-    if len(new_links) == len(links):
+    current = get_index(project_id).links.get(link_id)
+    if current is None:
         return False
-    save_links(project_id, new_links)
+    commit(project_id, [Change(LINKS, link_id, current, None)])
     return True
 
 
+@locked
+def delete_links_for(project_id: str, node_id: str) -> int:
+    """Cascade: delete every link that has `node_id` as source or target."""
+    index = get_index(project_id)
+    doomed = [index.links[lid] for lid in list(index.incident_links(node_id))]
+    commit(project_id, [Change(LINKS, l.id, l, None) for l in doomed])
+    return len(doomed)
+
+
 __all__ = [
     "load_links",
+    "query_links",
     "save_links",
     "create_link",
+    "apply_link_batch",
     "delete_link",
+    "delete_links_for",
     "links_path",
     "ALLOWED",
 ]
@@ -0,0 +1,121 @@
+"""Per-project locking for read-modify-write store operations.
+
+Every project directory gets its own re-entrant lock, so writers on different
+projects never contend and nested store calls (e.g. an entity delete that
+cascades into the links store) can re-acquire the lock they already hold. The
+registry that hands those locks out is striped so that lock lookup itself is
+not a global bottleneck.
+
+With ``TIMBERGEM_LOCK_MODE=file`` the lock additionally takes an exclusive
+``flock`` on ``projects/{id}/.lock`` so that several uvicorn workers sharing the
+same projects directory serialize their writes too. Readers only need
+:func:`read_lock`, which never touches the file lock: workers serve reads in
+parallel and catch up with each other's writes by tailing the store logs (see
+``get_index`` in graph_index.py).
+
+Locks are plain thread locks. Async endpoints run locked store calls through
+the thread pool, so a request waiting for a busy project never blocks the event
+loop.
+"""
+
+from __future__ import annotations
+
+import os, threading, functools, zlib
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms only get thread locks
+    fcntl = None  # type: ignore
+
+from .ingest import project_dir
+
+LOCK_FILENAME = ".lock"
+NUM_STRIPES = 64
+
+
+class _DirLock:
+    __slots__ = ("rlock", "depth", "fd")
+
+    def __init__(self):
+        self.rlock = threading.RLock()
+        self.depth = 0
+        self.fd: int | None = None
+
+
+_stripes = [threading.Lock() for _ in range(NUM_STRIPES)]
+_registry: Dict[str, _DirLock] = {}
+
+
+def lock_mode() -> str:
+    mode = os.environ.get("TIMBERGEM_LOCK_MODE", "thread")
+    if mode == "file" and fcntl is None:
+        return "thread"
+    return mode
+
+
+def _get(key: str) -> _DirLock:
+    with _stripes[zlib.crc32(key.encode()) % NUM_STRIPES]:
+        lk = _registry.get(key)
+        if lk is None:
+            lk = _registry[key] = _DirLock()
+        return lk
+
+
+@contextmanager
+def dir_lock(path: str) -> Iterator[None]:
+    """Hold the writer lock for a project directory."""
+    key = os.path.abspath(path)
+    lk = _get(key)
+    with lk.rlock:
+        lk.depth += 1
+        try:
+            if lk.depth == 1 and lock_mode() == "file":
+                os.makedirs(key, exist_ok=True)
+                fd = os.open(os.path.join(key, LOCK_FILENAME), os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(fd, fcntl.LOCK_EX)  # type: ignore[union-attr]
+                lk.fd = fd
+            yield
+        finally:
+            lk.depth -= 1
+            if lk.depth == 0 and lk.fd is not None:
+                fd, lk.fd = lk.fd, None
+                fcntl.flock(fd, fcntl.LOCK_UN)  # type: ignore[union-attr]
+                os.close(fd)
+
+
+@contextmanager
+def read_lock(path: str) -> Iterator[bool]:
+    """Hold the in-process lock for refreshing cached state of a project directory.
+
+    Yields whether the caller also holds the writer lock, which is always the
+    case outside file mode. Only writers may repair files (e.g. cut a torn log
+    tail): for anyone else that tail may be another worker's append in progress.
+    """
+    if lock_mode() != "file":
+        with dir_lock(path):
+            yield True
+        return
+    lk = _get(os.path.abspath(path))
+    with lk.rlock:
+        # depth only changes under rlock, so a non-zero depth here is our own
+        yield lk.depth > 0
+
+
+def project_lock(project_id: str):
+    return dir_lock(project_dir(project_id))
+
+
+def locked(fn):
+    """Run a store function `fn(project_id, ...)` while holding the project lock."""
+
+    @functools.wraps(fn)
+    def wrapper(project_id: str, *args, **kwargs):
+        with project_lock(project_id):
+            return fn(project_id, *args, **kwargs)
+
+    return wrapper
+
+
+__all__ = ["project_lock", "dir_lock", "read_lock", "locked", "lock_mode"]
@@ -1,32 +1,74 @@
 import uuid, os
-from fastapi import FastAPI, UploadFile, BackgroundTasks, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, BackgroundTasks, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+import anyio
 from pydantic import BaseModel
-from .ingest import init_manifest, ingest_pdf, read_manifest, project_dir
-from .entities_models import CreateEntityUnion, EntityUnion
-from .entities_store import load_entities, create_entity, update_entity, delete_entity
+from .ingest import init_manifest, ingest_pdf, read_manifest, patch_manifest, project_dir, project_known, page_path, render_page
+from .blocking import run_blocking
+from .entities_models import CreateEntityUnion, EntityUnion, EntityBatchRequest, EntityBatchResponse
+from .entities_store import (
+    query_entities,
+    create_entity,
+    update_entity,
+    delete_entity,
+    apply_entity_batch,
+    BatchError,
+    UPDATABLE_FIELDS,
+)
 from .concepts_models import (
     CreateConceptUnion,
     ConceptUnion,
     CreateRelationship,
     Relationship,
+    LinkBatchRequest,
+    LinkBatchResponse,
+    TraversalRequest,
 )
 from .concepts_store import (
-    load_concepts,
     create_concept,
     update_concept,
     delete_concept,
 )
 from .links_store import (
-    load_links,
+    query_links,
     create_link,
+    apply_link_batch,
     delete_link,
 )
-from fastapi import Body
+from .graph_index import (
+    changes_since,
+    current_revision,
+    encoded_store,
+    history_depth,
+    needs_attention,
+    quantities,
+    step_history,
+    ENTITIES,
+    CONCEPTS,
+    LINKS,
+)
+from .snapshots import (
+    create_snapshot,
+    list_snapshots,
+    delete_snapshot,
+    restore_snapshot,
+    clone_project,
+)
+from .archive import export_archive, import_archive
+from .reports import takeoff_report, MEDIA_TYPES
+from .traversal import traverse
+from fastapi import Body, Query
 
 app = FastAPI(title="Timbergem Backend", version="0.1.0")
 
 
+async def _require_project(project_id: str) -> None:
+    """404 unless the project exists: a registry lookup once its manifest has been read."""
+    if not project_known(project_id) and not await run_blocking(read_manifest, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+
 class ProjectStatus(BaseModel):
     project_id: str
     status: str
@@ -44,18 +86,23 @@ async def create_project(file: UploadFile, background: BackgroundTasks):
         raise HTTPException(status_code=400, detail="File must be a PDF")
     project_id = uuid.uuid4().hex
     pdir = project_dir(project_id)
-    os.makedirs(pdir, exist_ok=True)
-    init_manifest(project_id)
     pdf_path = os.path.join(pdir, "original.pdf")
-    with open(pdf_path, "wb") as f:
-        f.write(await file.read())
+    data = await file.read()
+
+    def _save() -> None:
+        os.makedirs(pdir, exist_ok=True)
+        init_manifest(project_id)
+        with open(pdf_path, "wb") as f:
+            f.write(data)
+
+    await run_blocking(_save)
     background.add_task(ingest_pdf, project_id, pdf_path)
     return {"project_id": project_id, "status": "queued"}
 
 
 @app.get("/api/projects/{project_id}/status", response_model=ProjectStatus)
 async def get_status(project_id: str):
-    m = read_manifest(project_id)
+    m = await run_blocking(read_manifest, project_id)
     if not m:
         raise HTTPException(status_code=404, detail="Not found")
     return m
@@ -63,8 +110,11 @@ async def get_status(project_id: str):
 
 @app.get("/api/projects/{project_id}/pages/{page_num}.png")
 async def get_page(project_id: str, page_num: int):
-    path = os.path.join(project_dir(project_id), "pages", f"page_{page_num}.png")
+    path = page_path(project_id, page_num)
     if not os.path.exists(path):
+        # Imported without rasters: render from original.pdf on first view
+        path = await run_blocking(render_page, project_id, page_num)
+    if path is None:
         raise HTTPException(status_code=404, detail="Page not found")
     return FileResponse(path, media_type="image/png")
 
@@ -76,8 +126,11 @@ async def get_ocr(project_id: str, page_num: int):
         raise HTTPException(status_code=404, detail="OCR not found")
     import json
 
-    with open(path) as f:
-        return json.load(f)
+    def _load():
+        with open(path) as f:
+            return json.load(f)
+
+    return await run_blocking(_load)
 
 
 @app.get("/api/projects/{project_id}/original.pdf")
@@ -99,9 +152,7 @@ class PageTitleUpdate(BaseModel):
 @app.patch("/api/projects/{project_id}/page-titles")
 async def update_page_title(project_id: str, body: PageTitleUpdate):
     """Update a single page title in the manifest."""
-    from .ingest import patch_manifest
-    
-    m = read_manifest(project_id)
+    m = await run_blocking(read_manifest, project_id)
     if not m:
         raise HTTPException(status_code=404, detail="Project not found")
     
@@ -114,7 +165,7 @@ async def update_page_title(project_id: str, body: PageTitleUpdate):
     page_titles[str(body.page_index)] = body.text
     
     # Patch manifest with updated page_titles
-    patch_manifest(project_id, page_titles=page_titles)
+    await run_blocking(patch_manifest, project_id, page_titles=page_titles)
     
     return {"success": True, "page_index": body.page_index, "text": body.text}
 
@@ -122,20 +173,81 @@ async def update_page_title(project_id: str, body: PageTitleUpdate):
 # --------- Entities Endpoints ---------
 
 
+def _encoded(content, revision: int | None = None) -> Response:
+    # Called on the worker thread: for an async endpoint FastAPI would validate
+    # and encode a large return value on the event loop.
+    headers = {"X-Revision": str(revision)} if revision is not None else None
+    return JSONResponse(jsonable_encoder(content), headers=headers)
+
+
+def _query_with_revision(project_id: str, query, **filters) -> Response:
+    # Read before the records: a change landing in between is re-sent by the
+    # next /changes call, which is harmless since upserts are idempotent.
+    revision = current_revision(project_id)
+    return _encoded(query(project_id, **filters), revision)
+
+
+def _cached_list(request: Request, project_id: str, store: str) -> Response:
+    # Full-list reads are served from JSON bytes cached on the index until the
+    # store changes, skipping model validation and serialization entirely.
+    revision = current_revision(project_id)
+    etag, body = encoded_store(project_id, store)
+    headers = {"ETag": etag, "X-Revision": str(revision)}
+    match = request.headers.get("if-none-match", "")
+    if etag in (t.strip().removeprefix("W/") for t in match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _id_list(values: list[str] | None) -> list[str] | None:
+    # Accept repeated params (?source_id=a&source_id=b) and comma lists (?source_id=a,b)
+    if not values:
+        return None
+    ids = [v for raw in values for v in raw.split(",") if v]
+    return ids or None
+
+
+def _viewport(raw: str | None) -> tuple[float, float, float, float] | None:
+    if raw is None:
+        return None
+    try:
+        x1, y1, x2, y2 = (float(v) for v in raw.split(","))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="bbox must be x1,y1,x2,y2")
+    if x2 <= x1 or y2 <= y1:
+        raise HTTPException(status_code=422, detail="bbox must satisfy x2>x1 and y2>y1")
+    return (x1, y1, x2, y2)
+
+
 @app.get("/api/projects/{project_id}/entities", response_model=list[EntityUnion])
-async def list_entities(project_id: str):
+async def list_entities(
+    project_id: str,
+    request: Request,
+    sheet: list[str] | None = Query(None),
+    entity_type: list[str] | None = Query(None),
+    bbox: str | None = Query(None, description="PDF-space viewport x1,y1,x2,y2"),
+):
     # Ensure project exists (manifest presence)
-    if not read_manifest(project_id):
-        raise HTTPException(status_code=404, detail="Project not found")
-    return load_entities(project_id)
+    await _require_project(project_id)
+    sheets = _id_list(sheet)
+    entity_types = _id_list(entity_type)
+    viewport = _viewport(bbox)
+    if sheets is None and entity_types is None and viewport is None:
+        return await run_blocking(_cached_list, request, project_id, ENTITIES)
+    try:
+        sheet_numbers = [int(s) for s in sheets] if sheets is not None else None
+    except ValueError:
+        raise HTTPException(status_code=422, detail="sheet must be an integer")
+    return await run_blocking(
+        _query_with_revision, project_id, query_entities, sheets=sheet_numbers, entity_types=entity_types, viewport=viewport
+    )
 
 
 @app.post(
     "/api/projects/{project_id}/entities", response_model=EntityUnion, status_code=201
 )
 async def create_entity_endpoint(project_id: str, body: CreateEntityUnion):
-    if not read_manifest(project_id):
-        raise HTTPException(status_code=404, detail="Project not found")
+    await _require_project(project_id)
     # Validate bounding_box basic structure if present (conceptual scopes may not have bbox)
     if hasattr(body, 'bounding_box') and body.bounding_box is not None:
         if len(body.bounding_box) != 4:
@@ -147,125 +259,305 @@ async def create_entity_endpoint(project_id: str, body: CreateEntityUnion):
                 status_code=422, detail="bounding_box values must be numeric"
             )
     try:
-        ent = create_entity(project_id, body)
+        ent = await run_blocking(create_entity, project_id, body)
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     return ent
 
 
-@app.patch(
-    "/api/projects/{project_id}/entities/{entity_id}", response_model=EntityUnion
-)
+@app.patch("/api/projects/{project_id}/entities/{entity_id}")
 async def patch_entity_endpoint(
     project_id: str,
     entity_id: str,
     body: dict = Body(...),
 ):
-    if not read_manifest(project_id):
-        raise HTTPException(status_code=404, detail="Project not found")
+    await _require_project(project_id)
     
     # Build kwargs only for fields that are present in the request
     # This allows explicit null values to be passed through
-    kwargs: dict = {}
-    
-    if "bounding_box" in body:
-        kwargs["bounding_box"] = body["bounding_box"]
-    if "source_sheet_number" in body:
-        kwargs["source_sheet_number"] = body["source_sheet_number"]
-    if "title" in body:
-        kwargs["title"] = body["title"]
-    if "text" in body:
-        kwargs["text"] = body["text"]
-    if "name" in body:
-        kwargs["name"] = body["name"]
-    if "description" in body:
-        kwargs["description"] = body["description"]
-    if "visual_pattern_description" in body:
-        kwargs["visual_pattern_description"] = body["visual_pattern_description"]
-    if "scope" in body:
-        kwargs["scope"] = body["scope"]
-    if "defined_in_id" in body:
-        kwargs["defined_in_id"] = body["defined_in_id"]
-    if "specifications" in body:
-        kwargs["specifications"] = body["specifications"]
-    if "symbol_definition_id" in body:
-        kwargs["symbol_definition_id"] = body["symbol_definition_id"]
-    if "component_definition_id" in body:
-        kwargs["component_definition_id"] = body["component_definition_id"]
-    if "recognized_text" in body:
-        kwargs["recognized_text"] = body["recognized_text"]
-    if "instantiated_in_id" in body:
-        kwargs["instantiated_in_id"] = body["instantiated_in_id"]
-    if "status" in body:
-        kwargs["status"] = body["status"]
-    if "validation" in body:
-        kwargs["validation"] = body["validation"]
-    # New fields for container/item types
-    if "notes" in body:
-        kwargs["notes"] = body["notes"]
-    if "schedule_type" in body:
-        kwargs["schedule_type"] = body["schedule_type"]
-    if "legend_id" in body:
-        kwargs["legend_id"] = body["legend_id"]
-    if "schedule_id" in body:
-        kwargs["schedule_id"] = body["schedule_id"]
-    if "assembly_group_id" in body:
-        kwargs["assembly_group_id"] = body["assembly_group_id"]
-    if "symbol_text" in body:
-        kwargs["symbol_text"] = body["symbol_text"]
-    if "mark" in body:
-        kwargs["mark"] = body["mark"]
-    if "code" in body:
-        kwargs["code"] = body["code"]
-    if "drawing_id" in body:
-        kwargs["drawing_id"] = body["drawing_id"]
-    if "definition_item_id" in body:
-        kwargs["definition_item_id"] = body["definition_item_id"]
-    if "definition_item_type" in body:
-        kwargs["definition_item_type"] = body["definition_item_type"]
-    
+    kwargs: dict = {k: body[k] for k in UPDATABLE_FIELDS if k in body}
+
+    def _update() -> Response:
+        # Moving a drawing, legend or schedule re-resolves the links of what it contains
+        recomputed: list = []
+        ent = update_entity(project_id, entity_id, **kwargs, recomputed=recomputed)
+        return _encoded({**ent.dict(), "recomputed": recomputed})
+
     try:
-        ent = update_entity(
-            project_id,
-            entity_id,
-            **kwargs
-        )
-    except ValueError as e:
+        return await run_blocking(_update)
+    except (ValueError, TypeError) as e:
         raise HTTPException(status_code=422, detail=str(e))
-    return ent
 
 
 @app.delete("/api/projects/{project_id}/entities/{entity_id}")
 async def delete_entity_endpoint(project_id: str, entity_id: str):
-    if not read_manifest(project_id):
-        raise HTTPException(status_code=404, detail="Project not found")
+    await _require_project(project_id)
+
+    def _delete() -> Response | None:
+        recomputed: list = []
+        if not delete_entity(project_id, entity_id, recomputed=recomputed):
+            return None
+        return _encoded({"deleted": True, "recomputed": recomputed})
+
     try:
-        ok = delete_entity(project_id, entity_id)
+        response = await run_blocking(_delete)
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
-    if not ok:
+    if response is None:
         raise HTTPException(status_code=404, detail="Entity not found")
+    return response
+
+
+@app.post(
+    "/api/projects/{project_id}/entities:batch", response_model=EntityBatchResponse
+)
+async def batch_entities_endpoint(project_id: str, body: EntityBatchRequest):
+    """Apply many create/update/delete operations atomically with a single write."""
+    await _require_project(project_id)
+    ops = [op.dict() for op in body.operations]
+    try:
+        results = await run_blocking(apply_entity_batch, project_id, ops)
+    except BatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return await run_blocking(_encoded, {"results": results})
+
+
+@app.get("/api/projects/{project_id}/changes")
+async def list_changes(
+    project_id: str,
+    since: int | None = Query(None, ge=0),
+    store: list[str] | None = Query(None),
+):
+    """Records upserted and ids deleted since revision `since`.
+
+    List endpoints report the revision they reflect in the X-Revision header.
+    When `reset` is true the client must reload the stores in full.
+    """
+    await _require_project(project_id)
+    changes = await run_blocking(changes_since, project_id, since, _id_list(store))
+    return await run_blocking(_encoded, changes)
+
+
+# --------- History (Undo/Redo) Endpoints ---------
+
+
+@app.get("/api/projects/{project_id}/history")
+async def get_history_endpoint(project_id: str):
+    """Number of steps available to undo and redo."""
+    await _require_project(project_id)
+    return await run_blocking(history_depth, project_id)
+
+
+async def _step_history(project_id: str, op: str):
+    await _require_project(project_id)
+    try:
+        applied = await run_blocking(step_history, project_id, op)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if applied is None:
+        raise HTTPException(status_code=409, detail=f"Nothing to {op}")
+    return {
+        "changes": [
+            {"store": ch.store, "id": ch.id, "op": "delete" if ch.after is None else "upsert"}
+            for ch in applied
+        ],
+        "revision": await run_blocking(current_revision, project_id),
+        **await run_blocking(history_depth, project_id),
+    }
+
+
+@app.post("/api/projects/{project_id}/undo")
+async def undo_endpoint(project_id: str):
+    """Revert the latest change (with everything it cascaded to) in one write."""
+    return await _step_history(project_id, "undo")
+
+
+@app.post("/api/projects/{project_id}/redo")
+async def redo_endpoint(project_id: str):
+    """Re-apply the change most recently undone."""
+    return await _step_history(project_id, "redo")
+
+
+# --------- Snapshots & Clones Endpoints ---------
+
+
+class SnapshotCreate(BaseModel):
+    label: str | None = None
+
+
+class CloneRequest(BaseModel):
+    snapshot_id: str | None = None
+
+
+@app.get("/api/projects/{project_id}/snapshots")
+async def list_snapshots_endpoint(project_id: str):
+    await _require_project(project_id)
+    return await run_blocking(list_snapshots, project_id)
+
+
+@app.post("/api/projects/{project_id}/snapshots", status_code=201)
+async def create_snapshot_endpoint(project_id: str, payload: SnapshotCreate = Body(default=SnapshotCreate())):
+    """Snapshot the project; page renders, OCR and the PDF are hardlinked, not copied."""
+    await _require_project(project_id)
+    try:
+        return await run_blocking(create_snapshot, project_id, payload.label)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.post("/api/projects/{project_id}/snapshots/{snapshot_id}/restore")
+async def restore_snapshot_endpoint(project_id: str, snapshot_id: str):
+    """Roll the project's data back to a snapshot (clears undo history)."""
+    await _require_project(project_id)
+    try:
+        return await run_blocking(restore_snapshot, project_id, snapshot_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.delete("/api/projects/{project_id}/snapshots/{snapshot_id}")
+async def delete_snapshot_endpoint(project_id: str, snapshot_id: str):
+    await _require_project(project_id)
+    if not await run_blocking(delete_snapshot, project_id, snapshot_id):
+        raise HTTPException(status_code=404, detail="Snapshot not found")
     return {"deleted": True}
 
 
+@app.post("/api/projects/{project_id}/clone", status_code=201)
+async def clone_project_endpoint(project_id: str, payload: CloneRequest = Body(default=CloneRequest())):
+    """Fork the project, or one of its snapshots, into a new project id."""
+    await _require_project(project_id)
+    try:
+        return await run_blocking(clone_project, project_id, payload.snapshot_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+# --------- Export / Import Endpoints ---------
+
+
+@app.get("/api/projects/{project_id}/export")
+async def export_project(project_id: str, rasters: bool = True, compress: bool = False):
+    """Stream the project as a tar archive; `rasters=false` leaves pages to re-render."""
+    await _require_project(project_id)
+    try:
+        stream = await run_blocking(export_archive, project_id, rasters=rasters, compress=compress)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    filename = f"{project_id}.tar.gz" if compress else f"{project_id}.tar"
+    return StreamingResponse(
+        stream,
+        media_type="application/gzip" if compress else "application/x-tar",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@app.post("/api/projects/import", status_code=201)
+async def import_project(request: Request):
+    """Create a project from an exported archive sent as the raw request body."""
+    body = request.stream()
+
+    def next_chunk() -> bytes:
+        # Runs in the worker thread: pull the body one chunk at a time from the loop
+        try:
+            return anyio.from_thread.run(body.__anext__)
+        except StopAsyncIteration:
+            return b""
+
+    try:
+        return await run_blocking(import_archive, next_chunk)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+# --------- Reports Endpoints ---------
+
+
+@app.get("/api/projects/{project_id}/reports/takeoff")
+async def takeoff_report_endpoint(
+    project_id: str,
+    format: str = Query("csv", description="csv or xlsx"),
+    definition_id: list[str] | None = Query(None),
+    mark: list[str] | None = Query(None, description="Schedule mark / assembly code / legend symbol"),
+    sheet: list[str] | None = Query(None),
+    instance_type: list[str] | None = Query(None),
+):
+    """Stream one row per instance with its definition, item, drawing, sheet and spaces."""
+    await _require_project(project_id)
+    sheets = _id_list(sheet)
+    try:
+        sheet_numbers = [int(s) for s in sheets] if sheets is not None else None
+    except ValueError:
+        raise HTTPException(status_code=422, detail="sheet must be an integer")
+    try:
+        stream = await run_blocking(
+            takeoff_report,
+            project_id,
+            format,
+            _id_list(definition_id),
+            _id_list(mark),
+            sheet_numbers,
+            _id_list(instance_type),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return StreamingResponse(
+        stream,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="takeoff.{format}"'},
+    )
+
+
+@app.get("/api/projects/{project_id}/quantities")
+async def quantities_endpoint(
+    project_id: str,
+    by: str | None = Query(None, description="definition, item, sheet, drawing or space"),
+    key: str | None = Query(None, description="Id (or sheet number) to count under `by`"),
+):
+    """Instance counts, in total and per sheet, from incrementally kept aggregates."""
+    await _require_project(project_id)
+    try:
+        return await run_blocking(quantities, project_id, by, key)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.get("/api/projects/{project_id}/issues")
+async def list_issues(
+    project_id: str,
+    code: list[str] | None = Query(None, description="Rule code, e.g. scope_without_evidence"),
+    category: list[str] | None = Query(None, description="drawing, definition or scope"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Records flagged by the server-side Needs Attention rules, paginated."""
+    await _require_project(project_id)
+    try:
+        return await run_blocking(needs_attention, project_id, code, category, offset, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
 # --------- Concepts Endpoints ---------
 
 
 @app.get("/api/projects/{project_id}/concepts", response_model=list[ConceptUnion])
-async def list_concepts(project_id: str):
-    if not read_manifest(project_id):
-        raise HTTPException(status_code=404, detail="Project not found")
-    return load_concepts(project_id)
+async def list_concepts(project_id: str, request: Request):
+    await _require_project(project_id)
+    return await run_blocking(_cached_list, request, project_id, CONCEPTS)
 
 
 @app.post(
     "/api/projects/{project_id}/concepts", response_model=ConceptUnion, status_code=201
 )
 async def create_concept_endpoint(project_id: str, body: CreateConceptUnion):
-    if not read_manifest(project_id):
-        raise HTTPException(status_code=404, detail="Project not found")
+    await _require_project(project_id)
     try:
-        c = create_concept(project_id, body)
+        c = await run_blocking(create_concept, project_id, body)
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     return c
@@ -273,13 +565,14 @@ async def create_concept_endpoint(project_id: str, body: CreateConceptUnion):
 
 @app.patch("/api/projects/{project_id}/concepts/{concept_id}", response_model=ConceptUnion)
 async def patch_concept_endpoint(project_id: str, concept_id: str, body: dict = Body(...)):
-    if not read_manifest(project_id):
-        raise HTTPException(status_code=404, detail="Project not found")
+    await _require_project(project_id)
     name = body.get("name")
     description = body.get("description")
     category = body.get("category")
     try:
-        c = update_concept(project_id, concept_id, name=name, description=description, category=category)
+        c = await run_blocking(
+            update_concept, project_id, concept_id, name=name, description=description, category=category
+        )
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     return c
@@ -287,10 +580,9 @@ async def patch_concept_endpoint(project_id: str, concept_id: str, body: dict =
 
 @app.delete("/api/projects/{project_id}/concepts/{concept_id}")
 async def delete_concept_endpoint(project_id: str, concept_id: str):
-    if not read_manifest(project_id):
-        raise HTTPException(status_code=404, detail="Project not found")
+    await _require_project(project_id)
     try:
-        ok = delete_concept(project_id, concept_id)
+        ok = await run_blocking(delete_concept, project_id, concept_id)
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     if not ok:
@@ -302,40 +594,75 @@ async def delete_concept_endpoint(project_id: str, concept_id: str):
 
 
 @app.get("/api/projects/{project_id}/links", response_model=list[Relationship])
-async def list_links(project_id: str, source_id: str | None = None, target_id: str | None = None, rel_type: str | None = None):
-    if not read_manifest(project_id):
-        raise HTTPException(status_code=404, detail="Project not found")
-    all_links = load_links(project_id)
-    result = []
-    for l in all_links:
-        if source_id and l.source_id != source_id:
-            continue
-        if target_id and l.target_id != target_id:
-            continue
-        if rel_type and l.rel_type != rel_type:
-            continue
-        result.append(l)
-    return result
+async def list_links(
+    project_id: str,
+    request: Request,
+    source_id: list[str] | None = Query(None),
+    target_id: list[str] | None = Query(None),
+    rel_type: list[str] | None = Query(None),
+):
+    await _require_project(project_id)
+    source_ids, target_ids, rel_types = _id_list(source_id), _id_list(target_id), _id_list(rel_type)
+    if source_ids is None and target_ids is None and rel_types is None:
+        return await run_blocking(_cached_list, request, project_id, LINKS)
+    return await run_blocking(
+        _query_with_revision,
+        project_id,
+        query_links,
+        source_ids=source_ids,
+        target_ids=target_ids,
+        rel_types=rel_types,
+    )
 
 
 @app.post(
     "/api/projects/{project_id}/links", response_model=Relationship, status_code=201
 )
 async def create_link_endpoint(project_id: str, body: CreateRelationship):
-    if not read_manifest(project_id):
-        raise HTTPException(status_code=404, detail="Project not found")
+    await _require_project(project_id)
     try:
-        link = create_link(project_id, body)
+        link = await run_blocking(create_link, project_id, body)
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     return link
 
 
+@app.post("/api/projects/{project_id}/links:batch", response_model=LinkBatchResponse)
+async def batch_links_endpoint(project_id: str, body: LinkBatchRequest):
+    """Create and delete many links atomically with a single write."""
+    await _require_project(project_id)
+    try:
+        created, deleted = await run_blocking(apply_link_batch, project_id, body.create, body.delete)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return await run_blocking(_encoded, {"created": created, "deleted": deleted})
+
+
 @app.delete("/api/projects/{project_id}/links/{link_id}")
 async def delete_link_endpoint(project_id: str, link_id: str):
-    if not read_manifest(project_id):
-        raise HTTPException(status_code=404, detail="Project not found")
-    ok = delete_link(project_id, link_id)
+    await _require_project(project_id)
+    ok = await run_blocking(delete_link, project_id, link_id)
     if not ok:
         raise HTTPException(status_code=404, detail="Link not found")
     return {"deleted": True}
+
+
+# --------- Graph Traversal Endpoints ---------
+
+
+@app.post("/api/projects/{project_id}/traverse")
+async def traverse_endpoint(project_id: str, body: TraversalRequest):
+    """Walk links and references from `start` in one request (see traversal.py)."""
+    await _require_project(project_id)
+    steps = [s.dict() for s in body.steps] if body.steps is not None else None
+
+    def _walk() -> Response:
+        # Up to max_nodes nodes and their edges: encoded here rather than on the loop
+        return _encoded(traverse(project_id, body.start, steps, body.max_depth, body.max_fanout, body.max_nodes))
+
+    try:
+        return await run_blocking(_walk)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Node not found: {e.args[0]}")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
@@ -0,0 +1,359 @@
+"""Append-only operation log for the JSON stores.
+
+Every store keeps a snapshot file (``entities.json``, ``links.json``,
+``concepts.json``; a JSON array of records, encoded as described in codec.py) plus a sibling JSONL log
+(``entities.log.jsonl``, ...). A mutation appends one line per record:
+
+    {"op": "create" | "update" | "delete", "id": "<record id>", "data": {...}}
+
+``create``/``update`` lines carry the full record, so replaying a line is
+idempotent and a log that was already folded into the snapshot can be replayed
+again safely. Reads replay the snapshot and then the log. Once the log grows
+past the compaction threshold a background thread folds it into a new
+snapshot and truncates it.
+
+A crash mid-append leaves a torn final line (no trailing newline or invalid
+JSON). It is reported and ignored on load, and truncated away under the log
+lock before anything else is written.
+"""
+
+from __future__ import annotations
+
+import os, json, logging, threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from . import codec
+
+logger = logging.getLogger(__name__)
+
+LOG_SUFFIX = ".log.jsonl"
+OPS = ("create", "update", "delete")
+
+# Compact once the log is at least this large *and* larger than the snapshot, so
+# replay never costs more than roughly twice a plain snapshot read.
+COMPACT_MIN_BYTES = int(os.environ.get("TIMBERGEM_LOG_COMPACT_BYTES", str(1 << 20)))
+
+class LogPosition(NamedTuple):
+    """How far into a store log a reader has applied (inode None: no log yet)."""
+
+    inode: Optional[int]
+    offset: int
+
+
+_path_locks: Dict[str, threading.Lock] = {}
+_path_locks_guard = threading.Lock()
+_compacting: set[str] = set()
+
+
+def log_path(snapshot_path: str) -> str:
+    base, ext = os.path.splitext(snapshot_path)
+    return (base if ext == ".json" else snapshot_path) + LOG_SUFFIX
+
+
+def _lock_for(snapshot_path: str) -> threading.Lock:
+    key = os.path.abspath(snapshot_path)
+    with _path_locks_guard:
+        lock = _path_locks.get(key)
+        if lock is None:
+            lock = _path_locks[key] = threading.Lock()
+        return lock
+
+
+def create_op(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {"op": "create", "id": record["id"], "data": record}
+
+
+def update_op(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {"op": "update", "id": record["id"], "data": record}
+
+
+def delete_op(record_id: str) -> Dict[str, Any]:
+    return {"op": "delete", "id": record_id}
+
+
+# ---------- Reading ----------
+
+
+def _read_snapshot(snapshot_path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(snapshot_path):
+        return []
+    return codec.read_file(snapshot_path)
+
+
+def _scan_log(
+    path: str, skipped: Optional[List[Tuple[int, str]]] = None
+) -> Tuple[List[Dict[str, Any]], int, bool]:
+    """Parse a log file.
+
+    Returns ``(ops, good_offset, torn)`` where ``good_offset`` is the byte offset
+    just past the last complete record. Skipped lines are appended to `skipped`
+    as ``(offset, reason)`` when given.
+    """
+    if not os.path.exists(path):
+        return [], 0, False
+    with open(path, "rb") as f:
+        raw = f.read()
+    return _parse_log(raw, path, 0, skipped)
+
+
+def _parse_log(
+    raw: bytes, path: str, base: int, skipped: Optional[List[Tuple[int, str]]] = None
+) -> Tuple[List[Dict[str, Any]], int, bool]:
+    # `raw` is the log from byte `base` on; offsets returned are absolute
+    ops: List[Dict[str, Any]] = []
+    offset = 0
+    good = 0
+    torn = False
+    while offset < len(raw):
+        nl = raw.find(b"\n", offset)
+        if nl == -1:
+            torn = True  # final record never got its newline
+            break
+        line = raw[offset:nl]
+        offset = nl + 1
+        if not line.strip():
+            good = offset
+            continue
+        try:
+            op = json.loads(line)
+        except ValueError:
+            if offset >= len(raw):
+                torn = True
+                break
+            logger.warning("Skipping corrupt record at byte %d of %s", base + good, path)
+            if skipped is not None:
+                skipped.append((base + good, "corrupt JSON"))
+            good = offset
+            continue
+        if not isinstance(op, dict) or op.get("op") not in OPS or not op.get("id"):
+            logger.warning("Skipping malformed record at byte %d of %s", base + good, path)
+            if skipped is not None:
+                skipped.append((base + good, "malformed operation"))
+        else:
+            ops.append(op)
+        good = offset
+    return ops, base + good, torn
+
+
+def apply_ops(records: Dict[str, Dict[str, Any]], ops: Iterable[Dict[str, Any]]) -> None:
+    for op in ops:
+        if op["op"] == "delete":
+            records.pop(op["id"], None)
+        else:
+            records[op["id"]] = op["data"]
+
+
+def _merged(snapshot_path: str) -> Tuple[Dict[str, Dict[str, Any]], int, bool]:
+    records: Dict[str, Dict[str, Any]] = {}
+    for item in _read_snapshot(snapshot_path):
+        rid = item.get("id") if isinstance(item, dict) else None
+        if rid:
+            records[rid] = item
+    ops, good, torn = _scan_log(log_path(snapshot_path))
+    apply_ops(records, ops)
+    return records, good, torn
+
+
+def _discard_torn(lpath: str, good: int) -> None:
+    logger.warning("Discarding torn final record in %s", lpath)
+    with open(lpath, "r+b") as f:
+        f.truncate(good)
+
+
+def replay(snapshot_path: str, repair: bool = True) -> Tuple[List[Dict[str, Any]], LogPosition]:
+    """Replay snapshot + log: ``(records in insertion order, position read up to)``.
+
+    A torn final log record is skipped, and truncated away when `repair` is
+    set. Only callers holding the writer lock may repair: without it the
+    "torn" tail may be another worker's append in progress.
+    """
+    with _lock_for(snapshot_path):
+        records: Dict[str, Dict[str, Any]] = {}
+        for item in _read_snapshot(snapshot_path):
+            rid = item.get("id") if isinstance(item, dict) else None
+            if rid:
+                records[rid] = item
+        lpath = log_path(snapshot_path)
+        try:
+            with open(lpath, "rb") as f:
+                ino = os.fstat(f.fileno()).st_ino
+                raw = f.read()
+        except FileNotFoundError:
+            return list(records.values()), LogPosition(None, 0)
+        ops, good, torn = _parse_log(raw, lpath, 0)
+        apply_ops(records, ops)
+        if torn and repair:
+            _discard_torn(lpath, good)
+    return list(records.values()), LogPosition(ino, good)
+
+
+def read_records(snapshot_path: str) -> List[Dict[str, Any]]:
+    """Replay snapshot + log and return the current records in insertion order."""
+    return replay(snapshot_path)[0]
+
+
+def read_tail(
+    snapshot_path: str, pos: LogPosition, repair: bool = True
+) -> Optional[Tuple[List[Dict[str, Any]], LogPosition]]:
+    """Operations appended to the log since `pos` (as returned by :func:`replay`).
+
+    Returns None when the log is no longer the file `pos` refers to (it was
+    compacted, removed or rewritten), in which case the caller must replay in
+    full. Only complete records are consumed; see :func:`replay` for `repair`.
+    """
+    lpath = log_path(snapshot_path)
+    with _lock_for(snapshot_path):
+        try:
+            f = open(lpath, "rb")
+        except FileNotFoundError:
+            return ([], pos) if pos.inode is None else None
+        with f:
+            st = os.fstat(f.fileno())
+            if st.st_ino != pos.inode or st.st_size < pos.offset:
+                return None
+            if st.st_size == pos.offset:
+                return [], pos
+            f.seek(pos.offset)
+            raw = f.read()
+        ops, good, torn = _parse_log(raw, lpath, pos.offset)
+        if torn and repair:
+            _discard_torn(lpath, good)
+    return ops, LogPosition(pos.inode, good)
+
+
+def position(snapshot_path: str) -> LogPosition:
+    """Current end of the log; used by writers right after their own append."""
+    try:
+        st = os.stat(log_path(snapshot_path))
+    except FileNotFoundError:
+        return LogPosition(None, 0)
+    return LogPosition(st.st_ino, st.st_size)
+
+
+def inspect(snapshot_path: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Read-only replay for verification: ``(records, problems found on the way)``.
+
+    Unlike :func:`read_records` nothing is repaired, and everything the normal
+    load path skips (unreadable snapshot, id-less records, corrupt or torn log
+    lines) is reported.
+    """
+    name = os.path.basename(snapshot_path)
+    problems: List[str] = []
+    records: Dict[str, Dict[str, Any]] = {}
+    try:
+        snapshot = _read_snapshot(snapshot_path)
+    except ValueError as e:
+        problems.append(f"{name}: unreadable snapshot ({e})")
+        snapshot = []
+    if not isinstance(snapshot, list):
+        problems.append(f"{name}: snapshot is not a JSON array")
+        snapshot = []
+    for i, item in enumerate(snapshot):
+        rid = item.get("id") if isinstance(item, dict) else None
+        if rid:
+            records[rid] = item
+        else:
+            problems.append(f"{name}[{i}]: record without id")
+    lpath = log_path(snapshot_path)
+    skipped: List[Tuple[int, str]] = []
+    ops, good, torn = _scan_log(lpath, skipped)
+    problems.extend(f"{os.path.basename(lpath)} byte {off}: {reason}" for off, reason in skipped)
+    if torn:
+        problems.append(f"{os.path.basename(lpath)} byte {good}: torn final record")
+    apply_ops(records, ops)
+    return list(records.values()), problems
+
+
+# ---------- Writing ----------
+
+
+def _atomic_write(path: str, data):
+    codec.write_file(path, data)
+
+
+def write_snapshot(snapshot_path: str, records: List[Dict[str, Any]]) -> None:
+    """Replace the whole store: write a fresh snapshot and drop the log."""
+    with _lock_for(snapshot_path):
+        _atomic_write(snapshot_path, records)
+        lpath = log_path(snapshot_path)
+        if os.path.exists(lpath):
+            os.remove(lpath)
+
+
+def append_ops(snapshot_path: str, ops: List[Dict[str, Any]]) -> None:
+    """Append operations to the store log (one write, one line per op)."""
+    if not ops:
+        return
+    payload = "".join(json.dumps(op, separators=(",", ":")) + "\n" for op in ops).encode()
+    lpath = log_path(snapshot_path)
+    with _lock_for(snapshot_path):
+        with open(lpath, "ab+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    # Torn tail from an interrupted append: cut back to the last full record
+                    _, good, _ = _scan_log(lpath)
+                    f.truncate(good)
+                    f.seek(good)
+            f.write(payload)
+            f.flush()
+            size = f.tell()
+    if size >= COMPACT_MIN_BYTES:
+        snap_size = os.path.getsize(snapshot_path) if os.path.exists(snapshot_path) else 0
+        if size >= snap_size:
+            schedule_compaction(snapshot_path)
+
+
+def compact(snapshot_path: str) -> bool:
+    """Fold the log into a new snapshot. Returns False if there was nothing to fold."""
+    lpath = log_path(snapshot_path)
+    with _lock_for(snapshot_path):
+        if not os.path.exists(lpath):
+            return False
+        merged, _, _ = _merged(snapshot_path)
+        _atomic_write(snapshot_path, list(merged.values()))
+        os.remove(lpath)
+    return True
+
+
+def schedule_compaction(snapshot_path: str) -> None:
+    key = os.path.abspath(snapshot_path)
+    with _path_locks_guard:
+        if key in _compacting:
+            return
+        _compacting.add(key)
+
+    def _run():
+        from .locks import dir_lock
+
+        try:
+            with dir_lock(os.path.dirname(snapshot_path)):
+                compact(snapshot_path)
+        except FileNotFoundError:
+            pass  # project removed underneath us
+        except Exception:
+            logger.exception("Log compaction failed for %s", snapshot_path)
+        finally:
+            with _path_locks_guard:
+                _compacting.discard(key)
+
+    threading.Thread(target=_run, name="timbergem-compactor", daemon=True).start()
+
+
+__all__ = [
+    "log_path",
+    "read_records",
+    "replay",
+    "read_tail",
+    "position",
+    "LogPosition",
+    "inspect",
+    "append_ops",
+    "write_snapshot",
+    "compact",
+    "schedule_compaction",
+    "create_op",
+    "update_op",
+    "delete_op",
+]
@@ -0,0 +1,224 @@
+"""Project snapshots and clones that share the heavy assets.
+
+A project is mostly immutable once ingested: page renders, OCR JSON and the
+original PDF are written once and never touched again. Only the stores
+(snapshot + operation log per store) and the manifest change. A snapshot or
+clone therefore hardlinks every immutable file and copies just the mutable
+ones, so its cost depends on the number of pages (one link each) rather than
+their size. Where hardlinks are not possible (e.g. another filesystem) files
+are copied instead.
+
+Mutable files are always copied, never linked. Store logs are appended in
+place, so a shared inode would let later edits leak into the snapshot.
+
+Snapshots live in ``projects/{id}/snapshots/{snapshot_id}/`` with a
+``snapshot.json`` describing them, and are deleted with the project.
+Restoring swaps the copied stores and manifest back in under the project lock,
+resets the change feed (clients reload) and clears the undo history. Clones
+get a new project id and start with a fresh change feed and history.
+"""
+
+from __future__ import annotations
+
+import os, shutil, time, uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import changes, codec, history, oplog
+from .ingest import is_processing, project_dir, read_manifest, write_manifest
+from .graph_index import STORE_FILENAMES, store_path
+from .locks import dir_lock
+
+SNAPSHOTS_DIRNAME = "snapshots"
+SNAPSHOT_META = "snapshot.json"
+# Per-project bookkeeping that describes this project's own timeline, not its data
+_NOT_COPIED = {
+    SNAPSHOTS_DIRNAME,
+    changes.CHANGES_FILENAME,
+    history.HISTORY_FILENAME,
+    ".lock",
+}
+
+
+def _mutable_names() -> set:
+    names = {"manifest.json"}
+    for filename in STORE_FILENAMES.values():
+        names.add(filename)
+        names.add(os.path.basename(oplog.log_path(filename)))
+    return names
+
+
+def _atomic_copy(src: str, dst: str) -> None:
+    tmp = dst + ".tmp"
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def _link_or_copy(src: str, dst: str) -> bool:
+    """Hardlink `src` to `dst`, falling back to a copy. True when linked."""
+    try:
+        os.link(src, dst)
+        return True
+    except OSError:
+        shutil.copy2(src, dst)
+        return False
+
+
+def _replicate(src_dir: str, dst_dir: str) -> Dict[str, int]:
+    """Populate the empty `dst_dir` from a project tree (links assets, copies stores)."""
+    mutable = _mutable_names()
+    stats = {"files": 0, "linked": 0, "copied_bytes": 0}
+    for root, dirs, files in os.walk(src_dir):
+        rel = os.path.relpath(root, src_dir)
+        if rel == ".":
+            dirs[:] = [d for d in dirs if d not in _NOT_COPIED]
+        target = dst_dir if rel == "." else os.path.join(dst_dir, rel)
+        os.makedirs(target, exist_ok=True)
+        for name in files:
+            if name.endswith(".tmp") or (rel == "." and (name in _NOT_COPIED or name == SNAPSHOT_META)):
+                continue
+            src = os.path.join(root, name)
+            dst = os.path.join(target, name)
+            stats["files"] += 1
+            if rel == "." and name in mutable:
+                shutil.copyfile(src, dst)
+                stats["copied_bytes"] += os.path.getsize(dst)
+            elif _link_or_copy(src, dst):
+                stats["linked"] += 1
+            else:
+                stats["copied_bytes"] += os.path.getsize(dst)
+    return stats
+
+
+def _require_settled(project_id: str) -> Dict[str, Any]:
+    m = read_manifest(project_id)
+    if m is None:
+        raise FileNotFoundError(project_id)
+    if is_processing(m):
+        raise ValueError("Project is still being processed")
+    return m
+
+
+def _snapshots_dir(project_id: str) -> str:
+    return os.path.join(os.path.abspath(project_dir(project_id)), SNAPSHOTS_DIRNAME)
+
+
+def _snapshot_dir(project_id: str, snapshot_id: str) -> str:
+    # Ids are generated hex strings; anything else cannot name one of ours
+    if not snapshot_id or not snapshot_id.isalnum():
+        raise KeyError(snapshot_id)
+    return os.path.join(_snapshots_dir(project_id), snapshot_id)
+
+
+def create_snapshot(project_id: str, label: Optional[str] = None) -> Dict[str, Any]:
+    _require_settled(project_id)
+    pdir = os.path.abspath(project_dir(project_id))
+    snapshot_id = uuid.uuid4().hex
+    final = _snapshot_dir(project_id, snapshot_id)
+    tmp = os.path.join(_snapshots_dir(project_id), f".tmp-{snapshot_id}")
+    started = time.perf_counter()
+    try:
+        # The writer lock keeps every store and its log consistent with each other
+        with dir_lock(pdir):
+            stats = _replicate(pdir, tmp)
+            revision = changes.get_feed(pdir).current()
+        meta = {
+            "id": snapshot_id,
+            "label": label,
+            "created_at": time.time(),
+            "revision": revision,
+            **stats,
+            "seconds": round(time.perf_counter() - started, 4),
+        }
+        codec.write_file(os.path.join(tmp, SNAPSHOT_META), meta, "json")
+        os.replace(tmp, final)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return meta
+
+
+def list_snapshots(project_id: str) -> List[Dict[str, Any]]:
+    root = _snapshots_dir(project_id)
+    if not os.path.isdir(root):
+        return []
+    out = []
+    for name in os.listdir(root):
+        meta_path = os.path.join(root, name, SNAPSHOT_META)
+        if not name.startswith(".") and os.path.exists(meta_path):
+            out.append(codec.read_file(meta_path))
+    return sorted(out, key=lambda m: m["created_at"])
+
+
+def _read_meta(project_id: str, snapshot_id: str) -> Tuple[str, Dict[str, Any]]:
+    sdir = _snapshot_dir(project_id, snapshot_id)
+    meta_path = os.path.join(sdir, SNAPSHOT_META)
+    if not os.path.exists(meta_path):
+        raise KeyError(snapshot_id)
+    return sdir, codec.read_file(meta_path)
+
+
+def delete_snapshot(project_id: str, snapshot_id: str) -> bool:
+    try:
+        sdir, _ = _read_meta(project_id, snapshot_id)
+    except KeyError:
+        return False
+    shutil.rmtree(sdir)
+    return True
+
+
+def restore_snapshot(project_id: str, snapshot_id: str) -> Dict[str, Any]:
+    """Put the project's stores and manifest back to the snapshot's state.
+
+    Assets are immutable and shared, so only the copied files move. Each store
+    file is swapped in atomically; a store the snapshot did not have is
+    removed. Raises KeyError for an unknown snapshot.
+    """
+    _require_settled(project_id)
+    sdir, meta = _read_meta(project_id, snapshot_id)
+    pdir = os.path.abspath(project_dir(project_id))
+    with dir_lock(pdir):
+        for store in STORE_FILENAMES:
+            for path in (store_path(pdir, store), oplog.log_path(store_path(pdir, store))):
+                src = os.path.join(sdir, os.path.basename(path))
+                if os.path.exists(src):
+                    _atomic_copy(src, path)
+                elif os.path.exists(path):
+                    os.remove(path)
+        write_manifest(project_id, codec.read_file(os.path.join(sdir, "manifest.json")))
+        revision = changes.get_feed(pdir).record_reset()
+        history.get_history(pdir).record(history.CLEAR)
+    return {**meta, "restored_revision": revision}
+
+
+def clone_project(project_id: str, snapshot_id: Optional[str] = None) -> Dict[str, Any]:
+    """Fork the project (or one of its snapshots) into a new project."""
+    _require_settled(project_id)
+    pdir = os.path.abspath(project_dir(project_id))
+    src = _read_meta(project_id, snapshot_id)[0] if snapshot_id else pdir
+    new_id = uuid.uuid4().hex
+    final = os.path.abspath(project_dir(new_id))
+    tmp = os.path.join(os.path.dirname(final), f".tmp-{new_id}")
+    started = time.perf_counter()
+    try:
+        if snapshot_id:
+            stats = _replicate(src, tmp)
+        else:
+            with dir_lock(pdir):
+                stats = _replicate(src, tmp)
+        os.replace(tmp, final)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    m = read_manifest(new_id) or {}
+    m.update(project_id=new_id, cloned_from={"project_id": project_id, "snapshot_id": snapshot_id})
+    write_manifest(new_id, m)
+    return {"project_id": new_id, **stats, "seconds": round(time.perf_counter() - started, 4)}
+
+
+__all__ = [
+    "create_snapshot",
+    "list_snapshots",
+    "delete_snapshot",
+    "restore_snapshot",
+    "clone_project",
+]
@@ -0,0 +1,126 @@
+"""Bucketed grid index over PDF-point bounding boxes.
+
+One grid covers one sheet (and, in the graph index, one entity type). Each box
+is registered in every fixed-size cell it overlaps, so a query only looks at
+the few boxes sharing a cell with it instead of scanning the whole sheet:
+
+- containing(box): any box that contains `box` must cover its top-left corner,
+  so a single cell is enough.
+- intersecting(box): the union of the cells `box` overlaps, clipped to the
+  cells that have ever held a box. A query still covering more cells than the
+  grid holds boxes (a client's huge viewport) scans the boxes instead.
+
+Entity boxes are not bounded by the page, and registering a box costs one
+bucket entry per cell it covers. Boxes spanning more than ``MAX_CELLS`` cells
+(or with non-finite coordinates) are therefore kept in a side list that every
+query scans, so one oversized box cannot stall or exhaust the process.
+
+Results come back in insertion order (the `order` key given to `insert`) so
+callers that used to take "the first match in the entity list" keep doing so.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+Box = Tuple[float, float, float, float]
+
+DEFAULT_CELL_PTS = 256.0
+# A full 256-pt grid over an A0 sheet is under 200 cells
+MAX_CELLS = 1024
+
+
+def intersects(a: Box, b: Box) -> bool:
+    return not (a[2] <= b[0] or a[0] >= b[2] or a[3] <= b[1] or a[1] >= b[3])
+
+
+def contains(a: Box, b: Box) -> bool:
+    return a[0] <= b[0] and a[1] <= b[1] and a[2] >= b[2] and a[3] >= b[3]
+
+
+class GridIndex:
+    def __init__(self, cell: float = DEFAULT_CELL_PTS):
+        self.cell = cell
+        self.buckets: Dict[Tuple[int, int], Set[str]] = {}
+        self.boxes: Dict[str, Box] = {}
+        self.order: Dict[str, int] = {}
+        # Boxes too large (or malformed) to register cell by cell
+        self.large: Set[str] = set()
+        # Cell range that has held a box; only grows, which keeps it a bound
+        self.bounds: Optional[Tuple[int, int, int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def _span(self, box: Box) -> Optional[Tuple[int, int, int, int]]:
+        """The cell range `box` covers, or None when it cannot be bucketed."""
+        if not all(math.isfinite(v) for v in box):
+            return None
+        c = self.cell
+        return (math.floor(box[0] / c), math.floor(box[1] / c), math.floor(box[2] / c), math.floor(box[3] / c))
+
+    @staticmethod
+    def _count(span: Tuple[int, int, int, int]) -> int:
+        return (span[2] - span[0] + 1) * (span[3] - span[1] + 1)
+
+    def _cells(self, span: Tuple[int, int, int, int]) -> Iterable[Tuple[int, int]]:
+        for cx in range(span[0], span[2] + 1):
+            for cy in range(span[1], span[3] + 1):
+                yield cx, cy
+
+    def insert(self, item_id: str, box: Box, order: int = 0) -> None:
+        if item_id in self.boxes:
+            self.remove(item_id)
+        self.boxes[item_id] = box
+        self.order[item_id] = order
+        span = self._span(box)
+        if span is None or self._count(span) > MAX_CELLS:
+            self.large.add(item_id)
+            return
+        for key in self._cells(span):
+            self.buckets.setdefault(key, set()).add(item_id)
+        b = self.bounds or span
+        self.bounds = (min(b[0], span[0]), min(b[1], span[1]), max(b[2], span[2]), max(b[3], span[3]))
+
+    def remove(self, item_id: str) -> None:
+        box = self.boxes.pop(item_id, None)
+        if box is None:
+            return
+        self.order.pop(item_id, None)
+        if item_id in self.large:
+            self.large.discard(item_id)
+            return
+        for key in self._cells(self._span(box)):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def _sorted(self, ids: Iterable[str]) -> List[str]:
+        return sorted(ids, key=lambda i: self.order[i])
+
+    def containing(self, box: Box) -> List[str]:
+        span = self._span(box)
+        bucket = self.buckets.get((span[0], span[1]), ()) if span is not None else ()
+        return self._sorted(i for i in (*bucket, *self.large) if contains(self.boxes[i], box))
+
+    def intersecting(self, box: Box) -> List[str]:
+        seen: Set[str] = set(self.large)
+        span, b = self._span(box), self.bounds
+        if span is None:
+            seen.update(self.boxes)
+        elif b is not None:
+            span = (max(span[0], b[0]), max(span[1], b[1]), min(span[2], b[2]), min(span[3], b[3]))
+            # Empty when the query lies outside every box ever bucketed
+            if span[0] <= span[2] and span[1] <= span[3]:
+                if self._count(span) > len(self.boxes):
+                    seen.update(self.boxes)
+                else:
+                    for key in self._cells(span):
+                        seen.update(self.buckets.get(key, ()))
+        return self._sorted(i for i in seen if intersects(self.boxes[i], box))
+
+
+__all__ = ["GridIndex", "intersects", "contains", "DEFAULT_CELL_PTS", "MAX_CELLS"]
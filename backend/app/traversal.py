@@ -0,0 +1,187 @@
+"""Server-side graph traversal over links and reference fields.
+
+The knowledge graph has two kinds of edges: links (``JUSTIFIED_BY``,
+``LOCATED_IN``, ``DEPICTS``) and the reference fields entities hold
+(``symbol_definition_id``, ``definition_item_id``, ``instantiated_in_id``, ...).
+A traversal starts from one or more nodes and follows a pattern of steps, each
+naming an edge and a direction, for example::
+
+    scope -JUSTIFIED_BY-> instances -item-> definition item
+                                    -instantiated_in-> drawing
+
+Every hop is an index lookup: link adjacency (``out_edges``/``in_edges``) for
+links, the field itself (out) or the ``refs`` reverse index (in) for
+references, and the id map for the node. The cost is bounded by the reached
+subgraph, never the project. Without a pattern, all edges are followed in both
+directions for up to ``max_depth`` hops.
+
+Three limits cap the work. ``max_depth`` bounds the number of hops.
+``max_fanout`` bounds the neighbours taken per node per step, oldest first.
+``max_nodes`` bounds the size of the result. Hitting any of them sets
+``truncated`` and records where in ``truncations``.
+
+Edges come back oriented as stored: a link from its source to its target, a
+reference from the record holding the field to the record it names. This holds
+whichever direction the step walked.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .graph_index import GraphIndex, REF_FIELDS, get_index, LINKS
+from .locks import read_lock
+
+LINK_TYPES = ("JUSTIFIED_BY", "LOCATED_IN", "DEPICTS")
+EDGE_ALIASES = {
+    "definition": ("symbol_definition_id", "component_definition_id"),
+    "item": ("definition_item_id",),
+    "instantiated_in": ("instantiated_in_id",),
+    "defined_in": ("defined_in_id",),
+    "drawing": ("drawing_id",),
+    "parent": ("legend_id", "schedule_id", "assembly_group_id"),
+}
+
+Edge = Tuple[str, str, str, Optional[str]]  # (type, source_id, target_id, link id)
+
+
+def _fields_of(edge: str) -> Optional[Tuple[str, ...]]:
+    if edge in EDGE_ALIASES:
+        return EDGE_ALIASES[edge]
+    if edge in REF_FIELDS:
+        return (edge,)
+    return None
+
+
+def _check_steps(steps: List[Dict[str, Any]], depth: int, max_depth: int) -> None:
+    for step in steps:
+        if step["edge"] not in LINK_TYPES and _fields_of(step["edge"]) is None:
+            raise ValueError(f"Unknown edge {step['edge']!r}: use a link type, a reference field or an alias")
+        if depth > max_depth:
+            raise ValueError(f"Pattern is deeper than max_depth ({max_depth})")
+        _check_steps(step.get("then") or [], depth + 1, max_depth)
+
+
+def _neighbours(idx: GraphIndex, node: str, edge: Optional[str], direction: str) -> List[Tuple[str, Edge]]:
+    """(neighbour id, edge) pairs of `node` along `edge` (None: every edge)."""
+    out: List[Tuple[str, Edge]] = []
+    if edge is None or edge in LINK_TYPES:
+        links = idx.records[LINKS]
+        if direction in ("out", "any"):
+            for link_id in tuple(idx.out_edges.get(node, ())):
+                link = links.get(link_id)
+                if link is not None and (edge is None or link.rel_type == edge):
+                    out.append((link.target_id, (link.rel_type, link.source_id, link.target_id, link_id)))
+        if direction in ("in", "any"):
+            for link_id in tuple(idx.in_edges.get(node, ())):
+                link = links.get(link_id)
+                if link is not None and (edge is None or link.rel_type == edge):
+                    out.append((link.source_id, (link.rel_type, link.source_id, link.target_id, link_id)))
+    fields = REF_FIELDS if edge is None else _fields_of(edge) or ()
+    if fields:
+        if direction in ("out", "any"):
+            rec = idx.get(node)
+            for field in fields:
+                target = getattr(rec, field, None) if rec is not None else None
+                if target:
+                    out.append((target, (field, node, target, None)))
+        if direction in ("in", "any"):
+            for field in fields:
+                for referrer in tuple(idx.referrers(field, node)):
+                    out.append((referrer, (field, referrer, node, None)))
+    # Oldest first, so fan-out truncation is deterministic
+    out = [(n, e) for n, e in out if n in idx.kinds]
+    out.sort(key=lambda ne: idx.order.get(ne[0], 0))
+    return out
+
+
+class _Walk:
+    def __init__(self, idx: GraphIndex, max_fanout: int, max_nodes: int):
+        self.idx = idx
+        self.max_fanout = max_fanout
+        self.max_nodes = max_nodes
+        self.nodes: List[str] = []
+        self.seen: Set[str] = set()
+        self.edges: Dict[Edge, None] = {}
+        self.truncations: List[Dict[str, Any]] = []
+
+    def visit(self, node: str) -> bool:
+        if node in self.seen:
+            return True
+        if len(self.nodes) >= self.max_nodes:
+            return False
+        self.seen.add(node)
+        self.nodes.append(node)
+        return True
+
+    def hop(self, frontier: List[str], edge: Optional[str], direction: str, kinds: Optional[List[str]]) -> List[str]:
+        reached: Dict[str, None] = {}
+        for node in frontier:
+            found = _neighbours(self.idx, node, edge, direction)
+            if kinds:
+                found = [(n, e) for n, e in found if self.idx.kinds[n][1] in kinds]
+            if len(found) > self.max_fanout:
+                self.truncations.append({"node": node, "edge": edge, "reason": "max_fanout", "dropped": len(found) - self.max_fanout})
+                found = found[: self.max_fanout]
+            for nb, e in found:
+                if not self.visit(nb):
+                    self.truncations.append({"node": node, "edge": edge, "reason": "max_nodes"})
+                    return list(reached)
+                self.edges[e] = None
+                reached[nb] = None
+        return list(reached)
+
+    def follow(self, frontier: List[str], steps: List[Dict[str, Any]]) -> None:
+        for step in steps:
+            reached = self.hop(frontier, step["edge"], step["direction"], step.get("kinds"))
+            if reached and step.get("then"):
+                self.follow(reached, step["then"])
+
+
+def traverse(
+    project_id: str,
+    start: List[str],
+    steps: Optional[List[Dict[str, Any]]] = None,
+    max_depth: int = 3,
+    max_fanout: int = 200,
+    max_nodes: int = 5000,
+) -> Dict[str, Any]:
+    """Walk the graph from `start` and return the reached nodes and edges.
+
+    `steps` are TraversalStep dicts. Raises ValueError for a bad pattern and
+    KeyError for a start id that does not exist.
+    """
+    if steps is not None:
+        _check_steps(steps, 1, max_depth)
+    idx = get_index(project_id)
+    with read_lock(idx.pdir):
+        missing = [s for s in start if s not in idx.kinds]
+        if missing:
+            raise KeyError(missing[0])
+        walk = _Walk(idx, max_fanout, max_nodes)
+        for node in start:
+            walk.visit(node)
+        frontier = list(dict.fromkeys(start))
+        if steps is not None:
+            walk.follow(frontier, steps)
+        else:
+            for _ in range(max_depth):
+                known = set(walk.seen)
+                frontier = [n for n in walk.hop(frontier, None, "any", None) if n not in known]
+                if not frontier:
+                    break
+            else:
+                if any(nb not in walk.seen for n in frontier for nb, _ in _neighbours(idx, n, None, "any")):
+                    walk.truncations.append({"node": None, "edge": None, "reason": "max_depth"})
+        return {
+            "nodes": [idx.get(n) for n in walk.nodes],
+            "edges": [
+                {"type": t, "source_id": s, "target_id": d, **({"link_id": l} if l else {})}
+                for t, s, d, l in walk.edges
+            ],
+            "truncated": bool(walk.truncations),
+            "truncations": walk.truncations,
+        }
+
+
+__all__ = ["traverse", "EDGE_ALIASES", "LINK_TYPES"]
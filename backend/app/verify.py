@@ -0,0 +1,61 @@
+"""Full validation of a project's stores.
+
+The load path trusts on-disk records (see hydrate.py); this is the explicit
+check that runs every record through its Pydantic model, plus the file-level
+problems the loader works around (torn or corrupt log lines, id-less records)
+and ids that appear in more than one store.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List
+
+from . import oplog
+from .ingest import project_dir
+from .graph_index import STORE_FILENAMES, model_class, store_path
+
+
+def verify_dir(pdir: str) -> Dict[str, Any]:
+    """Validate every store under one project directory.
+
+    Returns ``{"records": {store: count}, "problems": [...]}`` where each problem
+    is ``{"store", "id", "reason"}`` (``id`` is None for file-level problems).
+    """
+    counts: Dict[str, int] = {}
+    problems: List[Dict[str, Any]] = []
+    seen: Dict[str, str] = {}
+    for store in STORE_FILENAMES:
+        path = store_path(pdir, store)
+        try:
+            records, file_problems = oplog.inspect(path)
+        except OSError as e:
+            problems.append({"store": store, "id": None, "reason": f"unreadable: {e}"})
+            continue
+        problems.extend({"store": store, "id": None, "reason": r} for r in file_problems)
+        counts[store] = len(records)
+        for item in records:
+            rec_id = item.get("id")
+            cls = model_class(store, item)
+            if cls is None:
+                problems.append({"store": store, "id": rec_id, "reason": "unknown type"})
+                continue
+            try:
+                cls(**item)
+            except Exception as e:
+                problems.append({"store": store, "id": rec_id, "reason": " ".join(str(e).split())})
+            other = seen.get(rec_id)
+            if other is not None:
+                problems.append({"store": store, "id": rec_id, "reason": f"id also used in {other}"})
+            else:
+                seen[rec_id] = store
+    return {"records": counts, "problems": problems}
+
+
+def verify_project(project_id: str) -> Dict[str, Any]:
+    report = verify_dir(os.path.abspath(project_dir(project_id)))
+    report["project_id"] = project_id
+    return report
+
+
+__all__ = ["verify_dir", "verify_project"]
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark request latency while a large write is in flight.
+
+Runs the app in-process, so a handler that blocks shows up as a stalled event
+loop. One client posts a large entities batch to project A while:
+- another reads project A's entities, waiting for the write to finish
+- a third polls project B's status every few milliseconds
+
+The polls on B should not wait for A's write. The script prints how long the
+write took and the latency of B's polls during it.
+
+Usage:
+    python bench_io_latency.py [batch_size]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ["TIMBERGEM_PROJECTS_DIR"] = tempfile.mkdtemp(prefix="timbergem-bench-")
+
+# Add app directory to path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+import httpx
+
+from app import ingest
+from app.main import app
+
+
+def _project(pid: str) -> None:
+    os.makedirs(ingest.project_dir(pid), exist_ok=True)
+    ingest.write_manifest(pid, {"project_id": pid, "status": "complete", "num_pages": 1, "stages": {}})
+
+
+async def main(batch_size: int) -> None:
+    _project("a")
+    _project("b")
+    ops = [{"op": "create", "data": {"entity_type": "drawing", "source_sheet_number": 1, "bounding_box": [0, 0, 5000, 5000]}}]
+    ops += [
+        {"op": "create", "data": {"entity_type": "note", "source_sheet_number": 1, "bounding_box": [i % 400 * 10, i // 400 * 10, i % 400 * 10 + 5, i // 400 * 10 + 5], "text": f"n{i}"}}
+        for i in range(batch_size)
+    ]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/api/projects/a/entities")  # warm the index
+        done = asyncio.Event()
+        latencies = []
+
+        async def write():
+            t = time.perf_counter()
+            r = await client.post("/api/projects/a/entities:batch", json={"operations": ops})
+            r.raise_for_status()
+            done.set()
+            return time.perf_counter() - t
+
+        async def read_same_project():
+            await asyncio.sleep(0.05)
+            t = time.perf_counter()
+            (await client.get("/api/projects/a/entities", params={"sheet": "1"})).raise_for_status()
+            return time.perf_counter() - t
+
+        async def poll_other_project():
+            # Each poll is timed from when it was due, so a stalled loop counts
+            while not done.is_set():
+                t = time.perf_counter()
+                await asyncio.sleep(0.005)
+                (await client.get("/api/projects/b/status")).raise_for_status()
+                latencies.append(time.perf_counter() - t - 0.005)
+
+        write_s, read_s, _ = await asyncio.gather(write(), read_same_project(), poll_other_project())
+
+    ms = sorted(x * 1000 for x in latencies)
+    print(f"batch of {batch_size + 1} creates on project a: {write_s:.2f} s")
+    print(f"entities read on project a (waits for the write): {read_s:.2f} s")
+    if ms:
+        p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+        print(
+            f"status polls on project b during the write: {len(ms)} requests, "
+            f"p50 {statistics.median(ms):.1f} ms, p99 {p99:.1f} ms, max {ms[-1]:.1f} ms"
+        )
+    else:
+        print("status polls on project b during the write: none completed")
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark the on-disk store formats (see app/codec.py).
+
+Writes and reads a synthetic entities snapshot in every format and prints the
+file size and the time per save and per load.
+
+Usage:
+    python bench_store_format.py [num_records]
+"""
+
+import sys
+import os
+import tempfile
+import time
+
+# Add app directory to path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+from app import codec
+
+
+def _records(n: int) -> list:
+    out = []
+    for i in range(n):
+        x, y = (i % 50) * 40.0, (i // 50 % 50) * 40.0
+        out.append({
+            "id": f"{i:032x}",
+            "entity_type": ("drawing", "symbol_instance", "component_instance")[i % 3],
+            "source_sheet_number": i % 40 + 1,
+            "bounding_box": [x, y, x + 30.5, y + 30.25],
+            "created_at": 1718000000.0 + i,
+            "status": "incomplete",
+            "validation": None,
+            "title": f"Detail {i}",
+            "description": "Typical wall section – see general notes",
+            "instantiated_in_id": None,
+            "definition_id": None,
+        })
+    return out
+
+
+def _best(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    records = _records(n)
+    print(f"[Bench] {n} records")
+    print(f"{'format':<8} {'bytes':>12} {'save ms':>9} {'load ms':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "entities.json")
+        for fmt in ("pretty",) + tuple(f for f in codec.FORMATS if f != "pretty"):
+            size = codec.write_file(path, records, fmt)
+            save = _best(lambda: codec.write_file(path, records, fmt))
+            load = _best(lambda: codec.read_file(path))
+            print(f"{fmt:<8} {size:>12,} {save * 1000:>9.1f} {load * 1000:>9.1f}")
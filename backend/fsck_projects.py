@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Check every project in TIMBERGEM_PROJECTS_DIR for integrity problems.
+
+Looks for dangling links, references to missing records, stale
+instantiated_in_id values, orphan temporary files and missing page assets
+(see app/fsck.py). Projects are checked in parallel, one process each, and
+the report is printed as JSON. With --repair, dangling links are deleted,
+optional references are recomputed or cleared, and temporary files are
+removed. Each project's fixes are written as one transaction.
+
+--repair always runs with TIMBERGEM_LOCK_MODE=file, taking each project's
+flock while it writes. That only excludes a server that also runs with
+TIMBERGEM_LOCK_MODE=file; stop the server otherwise.
+
+Usage:
+    python fsck_projects.py [--repair] [--validate] [--jobs N] [--tmp-age SECONDS] [project_id ...]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Add app directory to path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+from app.fsck import fsck_all, TMP_AGE
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check (and repair) all projects")
+    parser.add_argument("project_ids", nargs="*", help="Only these projects (default: all)")
+    parser.add_argument(
+        "--repair", action="store_true",
+        help="Fix what can be fixed. Takes the file lock (TIMBERGEM_LOCK_MODE=file); a running server must use it too, or be stopped",
+    )
+    parser.add_argument("--validate", action="store_true", help="Also run the full record validation of verify_project.py")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--tmp-age", type=float, default=TMP_AGE, help="Only report temporary files older than this (seconds)")
+    parser.add_argument("--output", help="Write the report to this file instead of stdout")
+    args = parser.parse_args()
+    if args.repair:
+        # Thread locks only exclude this process; worker processes inherit the setting
+        os.environ["TIMBERGEM_LOCK_MODE"] = "file"
+
+    report = fsck_all(args.project_ids or None, args.repair, args.validate, args.tmp_age, args.jobs)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    unresolved = report['errors'] + sum(
+        1 for p in report['projects'] for problem in p['problems']
+        if not (args.repair and problem['repairable'])
+    )
+    if not args.repair:
+        unresolved += len(report['leftovers'])
+    sys.exit(1 if unresolved else 0)
@@ -0,0 +1,105 @@
+import io, os, tarfile
+import fitz
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app import archive
+from backend.app import ingest as ingest_mod
+
+
+client = TestClient(app)
+
+
+def _create_project(tmp_path, monkeypatch):
+    monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
+    pid = "proj_archive"
+    pdir = os.path.join(str(tmp_path), pid)
+    os.makedirs(os.path.join(pdir, "pages"), exist_ok=True)
+    os.makedirs(os.path.join(pdir, "ocr"), exist_ok=True)
+    doc = fitz.open()
+    for _ in range(2):
+        doc.new_page(width=200, height=100)
+    doc.save(os.path.join(pdir, "original.pdf"))
+    for i in (1, 2):
+        with open(os.path.join(pdir, "pages", f"page_{i}.png"), "wb") as f:
+            f.write(b"\x89PNG" + os.urandom(2048))
+        with open(os.path.join(pdir, "ocr", f"page_{i}.json"), "w") as f:
+            f.write('{"blocks": []}')
+    with open(os.path.join(pdir, "manifest.json"), "w") as f:
+        f.write(
+            """
+{"project_id":"proj_archive","status":"complete","num_pages":2,"stages":{"render":{"done":2,"total":2},"ocr":{"done":2,"total":2}},"started_at":0,"completed_at":0,"error":null}
+""".strip()
+        )
+    return pid, pdir
+
+
+def _chunks(data, size=1000):
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+def test_export_import_round_trip(tmp_path, monkeypatch):
+    pid, pdir = _create_project(tmp_path, monkeypatch)
+    d = client.post(f"/api/projects/{pid}/entities", json={"entity_type": "drawing", "source_sheet_number": 1, "bounding_box": [0, 0, 100, 100]}).json()
+    client.post(f"/api/projects/{pid}/concepts", json={"kind": "space", "name": "Kitchen"})
+
+    for compress in (False, True):
+        r = client.get(f"/api/projects/{pid}/export", params={"compress": compress})
+        assert r.status_code == 200
+        names = tarfile.open(fileobj=io.BytesIO(r.content), mode="r:*").getnames()
+        assert names[0] == "manifest.json" and "pages/page_2.png" in names
+
+        r = client.post("/api/projects/import", content=_chunks(r.content))
+        assert r.status_code == 201, r.text
+        new = r.json()["project_id"]
+        status = client.get(f"/api/projects/{new}/status").json()
+        assert status["project_id"] == new and status["num_pages"] == 2
+        assert client.get(f"/api/projects/{new}/entities").json() == [d]
+        assert client.get(f"/api/projects/{new}/concepts").json()[0]["name"] == "Kitchen"
+        assert client.get(f"/api/projects/{new}/pages/1.png").content == client.get(f"/api/projects/{pid}/pages/1.png").content
+
+
+def test_export_without_rasters_renders_pages_lazily(tmp_path, monkeypatch):
+    pid, pdir = _create_project(tmp_path, monkeypatch)
+    r = client.get(f"/api/projects/{pid}/export", params={"rasters": False})
+    assert not any(n.startswith("pages/") for n in tarfile.open(fileobj=io.BytesIO(r.content)).getnames())
+    new = client.post("/api/projects/import", content=r.content).json()["project_id"]
+    assert not os.path.exists(os.path.join(str(tmp_path), new, "pages", "page_2.png"))
+
+    r = client.get(f"/api/projects/{new}/pages/2.png")
+    assert r.status_code == 200 and r.content.startswith(b"\x89PNG")
+    assert os.path.exists(os.path.join(str(tmp_path), new, "pages", "page_2.png"))
+    assert client.get(f"/api/projects/{new}/pages/3.png").status_code == 404
+
+
+def test_export_streams_large_assets_in_chunks(tmp_path, monkeypatch):
+    pid, pdir = _create_project(tmp_path, monkeypatch)
+    monkeypatch.setattr(archive, "CHUNK_SIZE", 4096)
+    with open(os.path.join(pdir, "pages", "page_1.png"), "wb") as f:
+        f.write(os.urandom(100_000))
+    with open(os.path.join(pdir, "pages", "page_2.png"), "wb") as f:
+        f.write(os.urandom(8192))  # block-aligned: no padding after it
+    chunks = list(archive.export_archive(pid))
+    assert max(len(c) for c in chunks) <= 4096 + 2048  # one header plus at most one chunk
+    assert all(chunks)  # an empty chunk would read as the end of the stream
+    tar = tarfile.open(fileobj=io.BytesIO(b"".join(chunks)))
+    assert tar.getmember("pages/page_1.png").size == 100_000 and tar.getmember("pages/page_2.png").size == 8192
+
+
+def test_import_rejects_foreign_members(tmp_path, monkeypatch):
+    _create_project(tmp_path, monkeypatch)
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        info = tarfile.TarInfo("../escape.txt")
+        info.size = 1
+        tar.addfile(info, io.BytesIO(b"x"))
+    r = client.post("/api/projects/import", content=buf.getvalue())
+    assert r.status_code == 422 and "Unexpected archive member" in r.json()["detail"]
+    assert client.post("/api/projects/import", content=b"not a tar").status_code == 422
+    # A well-formed tar cut off at a member boundary is still refused
+    first = next(iter(archive.export_archive("proj_archive")))
+    r = client.post("/api/projects/import", content=first + b"\0" * 1024)
+    assert r.status_code == 422 and "incomplete" in r.json()["detail"]
+    assert sorted(os.listdir(str(tmp_path))) == ["proj_archive"]
+    assert not os.path.exists(os.path.join(str(tmp_path), "..", "escape.txt"))
@@ -0,0 +1,83 @@
+import os
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app import ingest as ingest_mod
+from backend.app import changes as changes_mod
+from backend.app.entities_store import load_entities, save_entities
+
+
+client = TestClient(app)
+
+
+def _create_project(tmp_path, monkeypatch):
+    monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
+    pid = "proj_changes"
+    pdir = os.path.join(str(tmp_path), pid)
+    os.makedirs(os.path.join(pdir, "pages"), exist_ok=True)
+    with open(os.path.join(pdir, "manifest.json"), "w") as f:
+        f.write(
+            """
+{"project_id":"proj_changes","status":"complete","num_pages":1,"stages":{"render":{"done":1,"total":1},"ocr":{"done":1,"total":1}},"started_at":0,"completed_at":0,"error":null}
+""".strip()
+        )
+    return pid
+
+
+def _drawing(pid, x=0):
+    r = client.post(
+        f"/api/projects/{pid}/entities",
+        json={"entity_type": "drawing", "source_sheet_number": 1, "bounding_box": [x, x, x + 100, x + 100]},
+    )
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def _changes(pid, **params):
+    r = client.get(f"/api/projects/{pid}/changes", params=params)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_changes_since_revision(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    d1 = _drawing(pid)
+    r = client.get(f"/api/projects/{pid}/entities")
+    rev = int(r.headers["X-Revision"])
+    assert rev == 1
+
+    d2 = _drawing(pid, 200)
+    client.patch(f"/api/projects/{pid}/entities/{d1['id']}", json={"title": "Plan"})
+    space = client.post(f"/api/projects/{pid}/concepts", json={"kind": "space", "name": "Kitchen"}).json()
+    client.delete(f"/api/projects/{pid}/entities/{d2['id']}")
+
+    cs = _changes(pid, since=rev)
+    assert cs["reset"] is False and cs["revision"] == 5
+    assert [e["id"] for e in cs["upserts"]["entities"]] == [d1["id"]]
+    assert cs["upserts"]["entities"][0]["title"] == "Plan"
+    assert cs["deletes"]["entities"] == [d2["id"]]
+    assert [c["id"] for c in cs["upserts"]["concepts"]] == [space["id"]]
+
+    only = _changes(pid, since=rev, store="concepts")
+    assert set(only["upserts"]) == {"concepts"}
+    assert _changes(pid, since=5)["upserts"]["entities"] == []
+    # No `since`: just the current revision; a future revision forces a reload
+    assert _changes(pid)["reset"] is True and _changes(pid)["revision"] == 5
+    assert _changes(pid, since=99)["reset"] is True
+
+
+def test_store_rewrite_and_trim_force_reset(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    _drawing(pid)
+    save_entities(pid, load_entities(pid))
+    cs = _changes(pid, since=1)
+    assert cs["reset"] is True and cs["revision"] == 2
+    assert _changes(pid, since=2)["reset"] is False
+
+    monkeypatch.setattr(changes_mod, "MAX_ENTRIES", 4)
+    for i in range(5):
+        _drawing(pid, 200 + i * 10)
+    head = _changes(pid)["revision"]
+    assert head == 7
+    assert _changes(pid, since=2)["reset"] is True
+    assert len(_changes(pid, since=head - 2)["upserts"]["entities"]) == 2
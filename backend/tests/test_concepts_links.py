@@ -109,3 +109,58 @@ def test_delete_guards_for_linked_entities_and_concepts(tmp_path, monkeypatch):
     assert r.status_code == 200
 
 
+
+
+def test_links_filter_by_multiple_ids(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    sym_def = client.post(f"/api/projects/{pid}/entities", json={"entity_type": "symbol_definition", "source_sheet_number": 1, "bounding_box": [20, 20, 60, 60], "name": "SYM", "scope": "project"}).json()
+    insts = [
+        client.post(f"/api/projects/{pid}/entities", json={"entity_type": "symbol_instance", "source_sheet_number": 1, "bounding_box": [100 + i * 30, 200, 120 + i * 30, 220], "symbol_definition_id": sym_def["id"]}).json()
+        for i in range(3)
+    ]
+    scopes = [client.post(f"/api/projects/{pid}/concepts", json={"kind": "scope", "description": f"S{i}"}).json() for i in range(2)]
+    space = client.post(f"/api/projects/{pid}/concepts", json={"kind": "space", "name": "Kitchen"}).json()
+    for scope in scopes:
+        for inst in insts:
+            r = client.post(f"/api/projects/{pid}/links", json={"rel_type": "JUSTIFIED_BY", "source_id": scope["id"], "target_id": inst["id"]})
+            assert r.status_code == 201
+    client.post(f"/api/projects/{pid}/links", json={"rel_type": "LOCATED_IN", "source_id": insts[0]["id"], "target_id": space["id"]})
+
+    r = client.get(f"/api/projects/{pid}/links", params=[("target_id", insts[0]["id"]), ("target_id", insts[1]["id"])])
+    assert r.status_code == 200 and len(r.json()) == 4
+    r = client.get(f"/api/projects/{pid}/links", params={"source_id": f"{scopes[0]['id']},{insts[0]['id']}"})
+    assert len(r.json()) == 4
+    r = client.get(f"/api/projects/{pid}/links", params={"source_id": insts[0]["id"], "rel_type": "JUSTIFIED_BY"})
+    assert r.json() == []
+    r = client.get(f"/api/projects/{pid}/links", params={"target_id": insts[2]["id"], "source_id": scopes[1]["id"]})
+    assert [l["source_id"] for l in r.json()] == [scopes[1]["id"]]
+
+
+def test_links_batch_create_and_delete(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    scope = client.post(f"/api/projects/{pid}/concepts", json={"kind": "scope", "description": "Paint"}).json()
+    notes = []
+    for i in range(5):
+        r = client.post(f"/api/projects/{pid}/entities", json={"entity_type": "note", "source_sheet_number": 1, "bounding_box": [i * 50, 0, i * 50 + 40, 40], "text": f"n{i}"})
+        assert r.status_code == 201, r.text
+        notes.append(r.json())
+    creates = [{"rel_type": "JUSTIFIED_BY", "source_id": scope["id"], "target_id": n["id"]} for n in notes]
+    r = client.post(f"/api/projects/{pid}/links:batch", json={"create": creates})
+    assert r.status_code == 200, r.text
+    created = r.json()["created"]
+    assert [l["target_id"] for l in created] == [n["id"] for n in notes]
+
+    # Invalid entry rejects the whole batch, including the valid delete before it
+    bad = {"rel_type": "DEPICTS", "source_id": notes[0]["id"], "target_id": scope["id"]}
+    r = client.post(f"/api/projects/{pid}/links:batch", json={"delete": [created[0]["id"]], "create": [bad]})
+    assert r.status_code == 422 and r.json()["detail"].startswith("create 0:")
+    # Duplicates within a batch and against the store are both rejected
+    r = client.post(f"/api/projects/{pid}/links:batch", json={"create": [creates[0]]})
+    assert r.status_code == 422
+    assert len(client.get(f"/api/projects/{pid}/links").json()) == 5
+
+    # Replacing a link (delete + re-create the same triple) is allowed in one batch
+    r = client.post(f"/api/projects/{pid}/links:batch", json={"delete": [created[0]["id"], created[1]["id"]], "create": [creates[0]]})
+    assert r.status_code == 200, r.text
+    ids = {l["id"] for l in client.get(f"/api/projects/{pid}/links").json()}
+    assert len(ids) == 4 and created[0]["id"] not in ids and r.json()["created"][0]["id"] in ids
@@ -0,0 +1,105 @@
+import os, json
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app import ingest as ingest_mod
+from backend.app import oplog
+from backend.app.entities_store import entities_path
+
+
+client = TestClient(app)
+
+
+def _create_project(tmp_path, monkeypatch):
+    monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
+    pid = "proj_batch"
+    pdir = os.path.join(str(tmp_path), pid)
+    os.makedirs(os.path.join(pdir, "pages"), exist_ok=True)
+    with open(os.path.join(pdir, "manifest.json"), "w") as f:
+        f.write(
+            """
+{"project_id":"proj_batch","status":"complete","num_pages":1,"stages":{"render":{"done":1,"total":1},"ocr":{"done":1,"total":1}},"started_at":0,"completed_at":0,"error":null}
+""".strip()
+        )
+    return pid
+
+
+def _log_lines(pid):
+    lpath = oplog.log_path(entities_path(pid))
+    if not os.path.exists(lpath):
+        return []
+    with open(lpath) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_batch_resolves_forward_refs_and_writes_once(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    ops = [
+        {"op": "create", "ref": "leg", "data": {"entity_type": "legend", "source_sheet_number": 1, "bounding_box": [0, 0, 200, 200]}},
+        {"op": "create", "ref": "item", "data": {"entity_type": "legend_item", "legend_id": "$leg", "symbol_text": "A"}},
+        {"op": "create", "ref": "sym", "data": {"entity_type": "symbol_definition", "source_sheet_number": 1, "bounding_box": [10, 10, 20, 20], "name": "Sym", "scope": "project", "defined_in_id": "$leg"}},
+        {"op": "update", "id": "$item", "data": {"description": "Door"}},
+    ]
+    r = client.post(f"/api/projects/{pid}/entities:batch", json={"operations": ops})
+    assert r.status_code == 200, r.text
+    results = r.json()["results"]
+    assert [x["op"] for x in results] == ["create", "create", "create", "update"]
+    leg_id = results[0]["id"]
+    assert results[1]["entity"]["legend_id"] == leg_id
+    assert results[2]["entity"]["defined_in_id"] == leg_id
+    assert results[3]["entity"]["description"] == "Door"
+
+    # One append for the whole batch: the three creates plus the final state of
+    # the updated item, written together after everything validated.
+    lpath = oplog.log_path(entities_path(pid))
+    assert os.path.getsize(lpath) > 0
+    assert len(_log_lines(pid)) >= 3
+    listed = client.get(f"/api/projects/{pid}/entities").json()
+    assert sorted(e["id"] for e in listed) == sorted({x["id"] for x in results})
+
+
+def test_batch_is_all_or_nothing(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    r = client.post(
+        f"/api/projects/{pid}/entities",
+        json={"entity_type": "drawing", "source_sheet_number": 1, "bounding_box": [0, 0, 100, 100]},
+    )
+    drawing = r.json()
+    before = _log_lines(pid)
+
+    ops = [
+        {"op": "update", "id": drawing["id"], "data": {"title": "Changed"}},
+        {"op": "create", "data": {"entity_type": "drawing", "source_sheet_number": 1, "bounding_box": [200, 200, 300, 300]}},
+        {"op": "delete", "id": "missing"},
+    ]
+    r = client.post(f"/api/projects/{pid}/entities:batch", json={"operations": ops})
+    assert r.status_code == 422
+    assert r.json()["detail"].startswith("operation 2:")
+
+    assert _log_lines(pid) == before
+    listed = client.get(f"/api/projects/{pid}/entities").json()
+    assert [e["id"] for e in listed] == [drawing["id"]]
+    assert listed[0].get("title") is None
+
+
+def test_batch_unknown_ref_rejected(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    ops = [{"op": "create", "data": {"entity_type": "legend_item", "legend_id": "$nope"}}]
+    r = client.post(f"/api/projects/{pid}/entities:batch", json={"operations": ops})
+    assert r.status_code == 422
+    assert "$nope" in r.json()["detail"]
+
+
+def test_batch_rejects_wrongly_typed_update_fields(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    drawing = client.post(
+        f"/api/projects/{pid}/entities",
+        json={"entity_type": "drawing", "source_sheet_number": 1, "bounding_box": [0, 0, 100, 100]},
+    ).json()
+    for data in ({"bounding_box": 5}, {"status": ["complete"]}):
+        ops = [{"op": "update", "id": drawing["id"], "data": data}]
+        r = client.post(f"/api/projects/{pid}/entities:batch", json={"operations": ops})
+        assert r.status_code == 422, r.text
+        assert r.json()["detail"].startswith("operation 0:")
+        r = client.patch(f"/api/projects/{pid}/entities/{drawing['id']}", json=data)
+        assert r.status_code == 422, r.text
@@ -0,0 +1,62 @@
+import os
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app import ingest as ingest_mod
+
+
+client = TestClient(app)
+
+
+def _create_project(tmp_path, monkeypatch):
+    monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
+    pid = "proj_query"
+    pdir = os.path.join(str(tmp_path), pid)
+    os.makedirs(os.path.join(pdir, "pages"), exist_ok=True)
+    with open(os.path.join(pdir, "manifest.json"), "w") as f:
+        f.write(
+            """
+{"project_id":"proj_query","status":"complete","num_pages":2,"stages":{"render":{"done":2,"total":2},"ocr":{"done":2,"total":2}},"started_at":0,"completed_at":0,"error":null}
+""".strip()
+        )
+    return pid
+
+
+def _post(pid, payload):
+    r = client.post(f"/api/projects/{pid}/entities", json=payload)
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def test_entities_filtered_by_sheet_type_and_viewport(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    d1 = _post(pid, {"entity_type": "drawing", "source_sheet_number": 1, "bounding_box": [0, 0, 500, 500]})
+    leg = _post(pid, {"entity_type": "legend", "source_sheet_number": 1, "bounding_box": [600, 600, 900, 900]})
+    item = _post(pid, {"entity_type": "legend_item", "legend_id": leg["id"], "symbol_text": "A"})
+    note = _post(pid, {"entity_type": "note", "source_sheet_number": 1, "bounding_box": [700, 50, 800, 100], "text": "x"})
+    d2 = _post(pid, {"entity_type": "drawing", "source_sheet_number": 2, "bounding_box": [0, 0, 500, 500]})
+
+    def ids(**params):
+        r = client.get(f"/api/projects/{pid}/entities", params=params)
+        assert r.status_code == 200, r.text
+        return [e["id"] for e in r.json()]
+
+    assert ids() == [d1["id"], leg["id"], item["id"], note["id"], d2["id"]]
+    assert ids(sheet=1) == [d1["id"], leg["id"], note["id"]]
+    assert ids(sheet="1,2", entity_type="drawing") == [d1["id"], d2["id"]]
+    assert ids(entity_type="legend_item") == [item["id"]]
+    assert ids(sheet=1, bbox="450,0,750,650") == [d1["id"], leg["id"], note["id"]]
+    assert ids(sheet=1, bbox="550,550,1000,1000") == [leg["id"]]
+    assert ids(sheet=2, bbox="550,550,1000,1000") == []
+
+    # Moving an entity moves it between query results
+    r = client.patch(f"/api/projects/{pid}/entities/{note['id']}", json={"source_sheet_number": 2, "bounding_box": [600, 600, 650, 650]})
+    assert r.status_code == 200, r.text
+    assert ids(sheet=1, bbox="450,0,750,650") == [d1["id"], leg["id"]]
+    assert ids(sheet=2, bbox="550,550,1000,1000") == [note["id"]]
+    # A viewport far larger than the page is clipped to the occupied cells
+    assert ids(sheet=1, bbox="-1e7,-1e7,1e7,1e7") == [d1["id"], leg["id"]]
+    assert ids(sheet=1, bbox="1e6,1e6,1e7,1e7") == []
+
+    assert client.get(f"/api/projects/{pid}/entities", params={"bbox": "1,2,3"}).status_code == 422
+    assert client.get(f"/api/projects/{pid}/entities", params={"sheet": "one"}).status_code == 422
@@ -0,0 +1,111 @@
+import os, time
+import pytest
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app import ingest as ingest_mod
+from backend.app import graph_index
+from backend.app.fsck import fsck_all
+from backend.app.graph_index import Change, ENTITIES
+
+
+client = TestClient(app)
+
+
+def _create_project(tmp_path, monkeypatch, pid="proj_fsck"):
+    monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
+    pdir = os.path.join(str(tmp_path), pid)
+    os.makedirs(os.path.join(pdir, "pages"), exist_ok=True)
+    os.makedirs(os.path.join(pdir, "ocr"), exist_ok=True)
+    with open(os.path.join(pdir, "manifest.json"), "w") as f:
+        f.write(
+            """
+{"project_id":"%s","status":"complete","num_pages":1,"stages":{"render":{"done":1,"total":1},"ocr":{"done":1,"total":1}},"started_at":0,"completed_at":0,"error":null}
+""".strip() % pid
+        )
+    for name in ("pages/page_1.png", "ocr/page_1.json"):
+        open(os.path.join(pdir, name), "w").close()
+    return pid
+
+
+def _break(pid):
+    """A project with one of each repairable problem, made behind the store guards."""
+    ops = [
+        {"op": "create", "ref": "plan", "data": {"entity_type": "drawing", "source_sheet_number": 1, "bounding_box": [0, 0, 500, 500], "title": "Plan"}},
+        {"op": "create", "ref": "sched", "data": {"entity_type": "schedule", "source_sheet_number": 1, "bounding_box": [600, 0, 900, 300]}},
+        {"op": "create", "ref": "w1", "data": {"entity_type": "schedule_item", "schedule_id": "$sched", "mark": "W1"}},
+        {"op": "create", "ref": "w2", "data": {"entity_type": "schedule_item", "schedule_id": "$sched", "mark": "W2"}},
+        {"op": "create", "ref": "sym", "data": {"entity_type": "symbol_definition", "source_sheet_number": 1, "bounding_box": [610, 10, 620, 20], "name": "Tag", "scope": "project"}},
+        {"op": "create", "ref": "inst", "data": {"entity_type": "symbol_instance", "source_sheet_number": 1, "bounding_box": [100, 100, 120, 120], "symbol_definition_id": "$sym", "definition_item_id": "$w1", "definition_item_type": "schedule_item"}},
+    ]
+    results = client.post(f"/api/projects/{pid}/entities:batch", json={"operations": ops}).json()["results"]
+    ids = {op["ref"]: res["id"] for op, res in zip(ops, results)}
+    scope = client.post(f"/api/projects/{pid}/concepts", json={"kind": "scope", "description": "Demo"}).json()
+    client.post(f"/api/projects/{pid}/links", json={"rel_type": "JUSTIFIED_BY", "source_id": scope["id"], "target_id": ids["inst"]})
+    idx = graph_index.get_index(pid)
+    moved = {**idx.get(ids["inst"]).dict(), "bounding_box": {"x1": 700, "y1": 700, "x2": 720, "y2": 720}}
+    graph_index.commit(pid, [
+        Change(ENTITIES, ids["inst"], idx.get(ids["inst"]), moved),  # left the plan, still claims it
+        Change(ENTITIES, ids["w1"], idx.get(ids["w1"]), None),  # definition item gone
+        Change(ENTITIES, ids["sched"], idx.get(ids["sched"]), None),  # container gone (required ref)
+        Change("concepts", scope["id"], idx.get(scope["id"]), None),  # link left dangling
+    ])
+    return ids
+
+
+def test_fsck_reports_and_repairs_in_one_write_per_store(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    ids = _break(pid)
+    with pytest.raises(ValueError, match="TIMBERGEM_LOCK_MODE=file"):
+        fsck_all(jobs=1, repair=True)  # thread locks would not exclude a running server
+    monkeypatch.setenv("TIMBERGEM_LOCK_MODE", "file")
+    pdir = os.path.join(str(tmp_path), pid)
+    stale = os.path.join(pdir, "entities.json.tmp")
+    open(stale, "w").close()
+    os.utime(stale, (time.time() - 3600,) * 2)
+    open(os.path.join(pdir, "links.json.tmp"), "w").close()  # too recent: may be in flight
+    os.remove(os.path.join(pdir, "ocr", "page_1.json"))
+    leftover = os.path.join(str(tmp_path), ".tmp-import-abc")
+    os.makedirs(leftover)
+    os.utime(leftover, (time.time() - 3600,) * 2)
+
+    report = fsck_all(jobs=1, tmp_age=60)
+    assert report["checked"] == 1 and report["leftovers"] == [".tmp-import-abc"]
+    found = {(p["check"], p.get("field") or p.get("path") or p.get("page")) for p in report["projects"][0]["problems"]}
+    assert found == {
+        ("dangling_link", None),
+        ("broken_ref", "definition_item_id"),
+        ("broken_ref", "schedule_id"),
+        ("stale_instantiated_in", None),
+        ("orphan_tmp", "entities.json.tmp"),
+        ("missing_ocr", 1),
+    }
+    assert report["repaired"] == 0 and os.path.exists(stale)
+
+    logs = ("entities.log.jsonl", "links.log.jsonl")
+    before = [open(os.path.join(pdir, n)).read().count("\n") for n in logs]
+    report = fsck_all(jobs=1, tmp_age=60, repair=True)
+    assert report["repaired"] == 4  # the instance, the link, the tmp file and the leftover
+    assert not os.path.exists(stale) and not os.path.exists(leftover)
+    after = [open(os.path.join(pdir, n)).read().count("\n") for n in logs]
+    assert [a - b for a, b in zip(after, before)] == [1, 1]
+    assert client.get(f"/api/projects/{pid}/history").json()["undo"] >= 1
+
+    graph_index._cache.clear()
+    inst = graph_index.get_index(pid).get(ids["inst"])
+    assert inst.definition_item_id is None and inst.definition_item_type is None
+    assert inst.instantiated_in_id is None
+    assert client.get(f"/api/projects/{pid}/links").json() == []
+    left = {p["check"] for p in fsck_all(jobs=1, tmp_age=60)["projects"][0]["problems"]}
+    assert left == {"broken_ref", "missing_ocr"}  # w2 without its schedule cannot be fixed by clearing
+
+
+def test_fsck_runs_projects_in_a_process_pool(tmp_path, monkeypatch):
+    _create_project(tmp_path, monkeypatch, "proj_a")
+    _create_project(tmp_path, monkeypatch, "proj_b")
+    _break("proj_b")
+    report = fsck_all(jobs=2)
+    assert [p["project_id"] for p in report["projects"]] == ["proj_a", "proj_b"]
+    assert report["projects"][0]["problems"] == []
+    assert {p["check"] for p in report["projects"][1]["problems"]} >= {"dangling_link", "stale_instantiated_in"}
+    assert fsck_all(["nope"], jobs=1)["errors"] == 1
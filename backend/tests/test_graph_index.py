@@ -0,0 +1,75 @@
+import os, json
+from backend.app import ingest as ingest_mod
+from backend.app.graph_index import get_index, ENTITIES, CONCEPTS, LINKS
+from backend.app.entities_models import CreateDrawing
+from backend.app.concepts_models import CreateRelationship, CreateSpace
+from backend.app.entities_store import create_entity, delete_entity, entities_path
+from backend.app.concepts_store import create_concept
+from backend.app.links_store import create_link
+
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
+    os.makedirs(os.path.join(str(tmp_path), "p1"), exist_ok=True)
+    return "p1"
+
+
+def test_index_tracks_ids_across_stores(tmp_path, monkeypatch):
+    pid = _setup(tmp_path, monkeypatch)
+    d = create_entity(pid, CreateDrawing(entity_type="drawing", source_sheet_number=1, bounding_box=[0, 0, 10, 10]))
+    space = create_concept(pid, CreateSpace(kind="space", name="Kitchen"))
+    link = create_link(pid, CreateRelationship(rel_type="DEPICTS", source_id=d.id, target_id=space.id))
+
+    idx = get_index(pid)
+    assert idx.kind_of(d.id) == (ENTITIES, "drawing")
+    assert idx.kind_of(space.id) == (CONCEPTS, "space")
+    assert idx.kind_of(link.id) == (LINKS, "DEPICTS")
+    assert idx.get(space.id).name == "Kitchen"
+
+    delete_entity(pid, d.id)
+    assert idx.kind_of(d.id) is None
+    assert idx.kind_of(link.id) is None  # cascaded
+
+
+def test_external_write_invalidates_cached_store(tmp_path, monkeypatch):
+    pid = _setup(tmp_path, monkeypatch)
+    d = create_entity(pid, CreateDrawing(entity_type="drawing", source_sheet_number=1, bounding_box=[0, 0, 10, 10]))
+    assert d.id in get_index(pid).entities
+    # Another process rewrites the snapshot and drops the log
+    path = entities_path(pid)
+    os.remove(path.replace(".json", ".log.jsonl"))
+    with open(path, "w") as f:
+        json.dump([], f)
+    assert get_index(pid).kind_of(d.id) is None
+
+
+def test_reverse_refs_drive_delete_guards_and_cascades(tmp_path, monkeypatch):
+    from backend.app.entities_models import CreateLegend, CreateLegendItem, CreateSymbolDefinition, CreateSymbolInstance
+
+    pid = _setup(tmp_path, monkeypatch)
+    legend = create_entity(pid, CreateLegend(entity_type="legend", source_sheet_number=1, bounding_box=[0, 0, 100, 100]))
+    item = create_entity(pid, CreateLegendItem(entity_type="legend_item", legend_id=legend.id, symbol_text="1"))
+    sym = create_entity(pid, CreateSymbolDefinition(entity_type="symbol_definition", source_sheet_number=1, bounding_box=[10, 10, 20, 20], name="K", scope="project"))
+    inst = create_entity(pid, CreateSymbolInstance(
+        entity_type="symbol_instance", source_sheet_number=1, bounding_box=[500, 500, 510, 510],
+        symbol_definition_id=sym.id, definition_item_id=item.id, definition_item_type="legend_item"))
+    space = create_concept(pid, CreateSpace(kind="space", name="Hall"))
+    create_link(pid, CreateRelationship(rel_type="LOCATED_IN", source_id=inst.id, target_id=space.id))
+
+    idx = get_index(pid)
+    assert idx.referrers("symbol_definition_id", sym.id) == {inst.id}
+    assert idx.referrers("legend_id", legend.id) == {item.id}
+    assert len(idx.incident_links(space.id)) == 1
+
+    for blocked in (sym.id, legend.id, item.id):
+        try:
+            delete_entity(pid, blocked)
+            raise AssertionError("delete should have been refused")
+        except ValueError:
+            pass
+
+    assert delete_entity(pid, inst.id) is True
+    assert not idx.incident_links(space.id)
+    assert not idx.referrers("definition_item_id", item.id)
+    assert delete_entity(pid, item.id) and delete_entity(pid, legend.id) and delete_entity(pid, sym.id)
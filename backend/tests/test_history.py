@@ -0,0 +1,84 @@
+import os
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app import ingest as ingest_mod
+from backend.app import oplog
+from backend.app.entities_store import load_entities, save_entities
+
+
+client = TestClient(app)
+
+
+def _create_project(tmp_path, monkeypatch):
+    monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
+    pid = "proj_history"
+    pdir = os.path.join(str(tmp_path), pid)
+    os.makedirs(os.path.join(pdir, "pages"), exist_ok=True)
+    with open(os.path.join(pdir, "manifest.json"), "w") as f:
+        f.write(
+            """
+{"project_id":"proj_history","status":"complete","num_pages":1,"stages":{"render":{"done":1,"total":1},"ocr":{"done":1,"total":1}},"started_at":0,"completed_at":0,"error":null}
+""".strip()
+        )
+    return pid
+
+
+def _state(pid):
+    ents = client.get(f"/api/projects/{pid}/entities").json()
+    links = client.get(f"/api/projects/{pid}/links").json()
+    return ents, links
+
+
+def test_undo_redo_delete_restores_ids_and_cascaded_links(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    drawing = client.post(f"/api/projects/{pid}/entities", json={"entity_type": "drawing", "source_sheet_number": 1, "bounding_box": [100, 100, 900, 900]}).json()
+    space = client.post(f"/api/projects/{pid}/concepts", json={"kind": "space", "name": "Kitchen"}).json()
+    r = client.post(f"/api/projects/{pid}/links", json={"rel_type": "DEPICTS", "source_id": drawing["id"], "target_id": space["id"]})
+    assert r.status_code == 201
+    before = _state(pid)
+
+    r = client.delete(f"/api/projects/{pid}/entities/{drawing['id']}")
+    assert r.status_code == 200
+    assert _state(pid) == ([], [])
+
+    appends = []
+    real_append = oplog.append_ops
+    monkeypatch.setattr(oplog, "append_ops", lambda path, ops: (appends.append(os.path.basename(path)), real_append(path, ops)))
+    r = client.post(f"/api/projects/{pid}/undo")
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert sorted((c["store"], c["op"]) for c in body["changes"]) == [("entities", "upsert"), ("links", "upsert")]
+    assert body["undo"] == 3 and body["redo"] == 1
+    assert sorted(appends) == ["entities.json", "links.json"]  # one write per store
+    assert _state(pid) == before  # same ids, link included
+
+    r = client.post(f"/api/projects/{pid}/redo")
+    assert r.status_code == 200
+    assert _state(pid) == ([], [])
+
+    # Undo everything, then the redo stack is dropped by a new edit
+    for _ in range(4):
+        assert client.post(f"/api/projects/{pid}/undo").status_code == 200
+    assert client.post(f"/api/projects/{pid}/undo").status_code == 409
+    assert client.get(f"/api/projects/{pid}/concepts").json() == []
+    client.post(f"/api/projects/{pid}/concepts", json={"kind": "space", "name": "Bath"})
+    assert client.get(f"/api/projects/{pid}/history").json() == {"undo": 1, "redo": 0}
+    assert client.post(f"/api/projects/{pid}/redo").status_code == 409
+
+
+def test_undo_refuses_records_changed_outside_history(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    d = client.post(f"/api/projects/{pid}/entities", json={"entity_type": "drawing", "source_sheet_number": 1, "bounding_box": [0, 0, 100, 100]}).json()
+    client.patch(f"/api/projects/{pid}/entities/{d['id']}", json={"title": "Plan"})
+    # Rewriting a whole store clears the history it invalidates
+    save_entities(pid, load_entities(pid))
+    assert client.get(f"/api/projects/{pid}/history").json() == {"undo": 0, "redo": 0}
+
+    client.patch(f"/api/projects/{pid}/entities/{d['id']}", json={"title": "Level 1"})
+    # An out-of-band edit (another tool appending to the log) makes the step stale
+    ent = load_entities(pid)[0].dict()
+    oplog.append_ops(os.path.join(str(tmp_path), pid, "entities.json"), [oplog.update_op({**ent, "title": "Elsewhere"})])
+    r = client.post(f"/api/projects/{pid}/undo")
+    assert r.status_code == 409 and "changed outside the history" in r.json()["detail"]
+    assert load_entities(pid)[0].title == "Elsewhere"
@@ -0,0 +1,64 @@
+import os, json
+from backend.app import ingest as ingest_mod
+from backend.app import oplog
+from backend.app.entities_models import CreateDrawing
+from backend.app.entities_store import create_entity, entities_path, load_entities
+from backend.app.graph_index import get_index, ENTITIES
+from backend.app.verify import verify_project
+
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
+    os.makedirs(os.path.join(str(tmp_path), "p1"), exist_ok=True)
+    return "p1"
+
+
+def test_load_defers_model_construction(tmp_path, monkeypatch):
+    pid = _setup(tmp_path, monkeypatch)
+    for i in range(3):
+        create_entity(pid, CreateDrawing(entity_type="drawing", source_sheet_number=1, bounding_box=[i * 20, 0, i * 20 + 10, 10]))
+    expected = [json.loads(e.model_dump_json()) for e in load_entities(pid)]
+    get_index(pid).signatures.clear()  # force a reload from disk
+    index = get_index(pid)
+    assert all(type(r) is dict for _, r in index.entities.raw_items())
+    assert json.loads(index.encoded(ENTITIES)[1]) == expected
+    assert len(index.containing(1, (1, 1, 2, 2), "drawing")) == 1
+    assert sum(type(r) is not dict for _, r in index.entities.raw_items()) == 1
+
+
+def test_loaded_records_round_trip(tmp_path, monkeypatch):
+    pid = _setup(tmp_path, monkeypatch)
+    d = create_entity(pid, CreateDrawing(entity_type="drawing", source_sheet_number=1, bounding_box=[0, 0, 10, 10], title="T"))
+    with open(entities_path(pid), "w") as f:
+        json.dump([d.dict()], f)
+    os.remove(oplog.log_path(entities_path(pid)))
+    loaded = load_entities(pid)
+    assert loaded[0].bounding_box.x2 == 10 and loaded[0].title == "T"
+    assert json.loads(loaded[0].model_dump_json()) == json.loads(d.model_dump_json())
+
+
+def test_corrupt_records_reported_not_dropped_silently(tmp_path, monkeypatch):
+    pid = _setup(tmp_path, monkeypatch)
+    good = create_entity(pid, CreateDrawing(entity_type="drawing", source_sheet_number=1, bounding_box=[0, 0, 10, 10]))
+    bad_bbox = dict(good.dict(), id="bad1", bounding_box={"x1": 5, "y1": 0, "x2": 1, "y2": 10})
+    with open(entities_path(pid), "w") as f:
+        json.dump([good.dict(), bad_bbox, {"id": "bad2", "entity_type": "drawing"}, {"id": "bad3", "entity_type": "nope"}], f)
+    os.remove(oplog.log_path(entities_path(pid)))
+    with open(oplog.log_path(entities_path(pid)), "w") as f:
+        f.write("not json\n")
+        f.write(json.dumps({"op": "delete", "id": "missing"}) + "\n")
+
+    # Structurally broken records are skipped and reported on load; the
+    # invalid-but-complete one stays visible and is reported when hydrated.
+    ids = [e.id for e in load_entities(pid)]
+    assert ids == [good.id, "bad1"]
+    problems = get_index(pid).problems[ENTITIES]
+    assert [(p["id"], p["reason"].split()[0]) for p in problems[:2]] == [("bad2", "missing"), ("bad3", "unknown")]
+    assert problems[2]["id"] == "bad1" and "x2 must be > x1" in problems[2]["reason"]
+
+    report = verify_project(pid)
+    assert any(p["id"] == "bad1" and "x2 must be > x1" in p["reason"] for p in report["problems"])
+    assert any(p["id"] is None and "corrupt JSON" in p["reason"] for p in report["problems"])
+    assert {p["id"] for p in report["problems"]} >= {"bad1", "bad2", "bad3"}
+    assert report["records"][ENTITIES] == 4
@@ -1,6 +1,7 @@
 import io, json, os, time
 from fastapi.testclient import TestClient
 from backend.app.main import app
+from backend.app import ingest as ingest_mod
 
 client = TestClient(app)
 
@@ -10,6 +11,7 @@ SAMPLE_PDF_BYTES = b"%PDF-1.4\n1 0 obj<<>>endobj\ntrailer<<>>\n%%EOF"  # minimal
 def test_upload_and_status_flow(tmp_path, monkeypatch):
     # Override BASE_DIR via env
     monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
     # NOTE: This PDF is not a valid full PDF; in real test supply a tiny valid sample.
     # Here we mainly exercise endpoint wiring (will likely error in ingestion -> error state).
     files = {"file": ("sample.pdf", SAMPLE_PDF_BYTES, "application/pdf")}
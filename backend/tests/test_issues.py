@@ -0,0 +1,136 @@
+import os
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app import ingest as ingest_mod
+from backend.app import graph_index
+from backend.app.graph_index import Change, ENTITIES
+
+
+client = TestClient(app)
+
+
+def _create_project(tmp_path, monkeypatch):
+    monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
+    pid = "proj_issues"
+    pdir = os.path.join(str(tmp_path), pid)
+    os.makedirs(os.path.join(pdir, "pages"), exist_ok=True)
+    with open(os.path.join(pdir, "manifest.json"), "w") as f:
+        f.write(
+            """
+{"project_id":"proj_issues","status":"complete","num_pages":2,"stages":{"render":{"done":2,"total":2},"ocr":{"done":2,"total":2}},"started_at":0,"completed_at":0,"error":null}
+""".strip()
+        )
+    return pid
+
+
+def _issues(pid, **params):
+    r = client.get(f"/api/projects/{pid}/issues", params={"limit": 1000, **params})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _maintained(pid):
+    return {(i["id"], c["code"]) for i in _issues(pid)["items"] for c in i["issues"]}
+
+
+def _recheck(pid):
+    """Every rule evaluated from scratch over the listed records."""
+    ents = {e["id"]: e for e in client.get(f"/api/projects/{pid}/entities").json()}
+    concepts = client.get(f"/api/projects/{pid}/concepts").json()
+    links = [l for l in client.get(f"/api/projects/{pid}/links").json() if l["rel_type"] == "JUSTIFIED_BY"]
+    known = set(ents) | {c["id"] for c in concepts}
+    sources, targets = {l["source_id"] for l in links}, {l["target_id"] for l in links}
+    out = set()
+    for e in ents.values():
+        t, i = e["entity_type"], e["id"]
+        if t in ("drawing", "legend", "schedule") and not (e.get("title") or "").strip():
+            out.add((i, "untitled"))
+        if t == "note" and not (e.get("text") or "").strip():
+            out.add((i, "untitled"))
+        if t == "scope":
+            if not (e.get("name") or "").strip() or not (e.get("description") or "").strip():
+                out.add((i, "scope_incomplete"))
+            if i not in sources:
+                out.add((i, "scope_without_evidence"))
+        if t.endswith("_definition"):
+            if not (e.get("name") or "").strip():
+                out.add((i, "unnamed_definition"))
+            if not e.get("defined_in_id"):
+                out.add((i, "definition_not_placed"))
+        if t.endswith("_instance"):
+            if (e.get("symbol_definition_id") or e.get("component_definition_id")) not in known:
+                out.add((i, "missing_definition"))
+            if e.get("bounding_box") is not None and not e.get("instantiated_in_id"):
+                out.add((i, "instance_outside_drawing"))
+            if i not in targets:
+                out.add((i, "instance_without_scope"))
+        parent = {"schedule_item": "schedule_id", "assembly": "assembly_group_id", "legend_item": "legend_id"}.get(t)
+        if parent and e.get(parent) not in known:
+            out.add((i, "orphaned_item"))
+    out |= {(c["id"], "scope_without_evidence") for c in concepts if c["kind"] == "scope" and c["id"] not in sources}
+    return out
+
+
+def test_issue_sets_follow_every_write(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    ops = [
+        {"op": "create", "ref": "plan", "data": {"entity_type": "drawing", "source_sheet_number": 1, "bounding_box": [0, 0, 500, 500], "title": "Plan"}},
+        {"op": "create", "ref": "sched", "data": {"entity_type": "schedule", "source_sheet_number": 2, "bounding_box": [0, 0, 500, 500]}},
+        {"op": "create", "ref": "w1", "data": {"entity_type": "schedule_item", "schedule_id": "$sched", "mark": "W1"}},
+        {"op": "create", "ref": "sym", "data": {"entity_type": "symbol_definition", "source_sheet_number": 2, "bounding_box": [10, 10, 20, 20], "name": "Tag", "scope": "project"}},
+        {"op": "create", "ref": "inside", "data": {"entity_type": "symbol_instance", "source_sheet_number": 1, "bounding_box": [100, 100, 120, 120], "symbol_definition_id": "$sym"}},
+        {"op": "create", "ref": "outside", "data": {"entity_type": "symbol_instance", "source_sheet_number": 1, "bounding_box": [600, 600, 620, 620], "symbol_definition_id": "$sym"}},
+    ]
+    results = client.post(f"/api/projects/{pid}/entities:batch", json={"operations": ops}).json()["results"]
+    ids = {op["ref"]: res["id"] for op, res in zip(ops, results)}
+    scope = client.post(f"/api/projects/{pid}/concepts", json={"kind": "scope", "description": "Install windows"}).json()
+
+    assert _maintained(pid) == _recheck(pid)
+    assert (ids["sched"], "untitled") in _maintained(pid)
+    assert (ids["outside"], "instance_outside_drawing") in _maintained(pid)
+    assert (ids["sym"], "definition_not_placed") in _maintained(pid)
+    assert (scope["id"], "scope_without_evidence") in _maintained(pid)
+
+    # Evidence clears both ends; deleting it brings them back
+    link = client.post(f"/api/projects/{pid}/links", json={"rel_type": "JUSTIFIED_BY", "source_id": scope["id"], "target_id": ids["inside"]}).json()
+    assert {(scope["id"], "scope_without_evidence"), (ids["inside"], "instance_without_scope")}.isdisjoint(_maintained(pid))
+    client.patch(f"/api/projects/{pid}/entities/{ids['sched']}", json={"title": "Window Schedule"})
+    assert _maintained(pid) == _recheck(pid)
+    client.delete(f"/api/projects/{pid}/links/{link['id']}")
+    assert (scope["id"], "scope_without_evidence") in _maintained(pid)
+
+    # A container or definition removed behind the guards (cleanup script, another worker)
+    graph_index.commit(pid, [Change(ENTITIES, ids["sched"], graph_index.get_index(pid).get(ids["sched"]), None)])
+    graph_index.commit(pid, [Change(ENTITIES, ids["sym"], graph_index.get_index(pid).get(ids["sym"]), None)])
+    flagged = _maintained(pid)
+    assert (ids["w1"], "orphaned_item") in flagged and (ids["outside"], "missing_definition") in flagged
+    assert flagged == _recheck(pid)
+
+    client.post(f"/api/projects/{pid}/undo")  # the definition is back
+    assert (ids["outside"], "missing_definition") not in _maintained(pid)
+    graph_index._cache.clear()  # rebuilt from disk, links and entities loaded separately
+    assert _maintained(pid) == _recheck(pid)
+
+
+def test_issues_page_and_filter(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    ops = [{"op": "create", "data": {"entity_type": "note", "source_sheet_number": 1, "bounding_box": [i * 10, 0, i * 10 + 5, 5]}} for i in range(5)]
+    results = client.post(f"/api/projects/{pid}/entities:batch", json={"operations": ops}).json()["results"]
+    notes = [r["id"] for r in results]
+    scope = client.post(f"/api/projects/{pid}/concepts", json={"kind": "scope", "description": "Demo"}).json()
+
+    body = _issues(pid, offset=1, limit=2)
+    assert body["total"] == 6 and [i["id"] for i in body["items"]] == notes[1:3]
+    assert body["counts"]["untitled"] == 5 and body["counts"]["scope_without_evidence"] == 1
+    assert body["items"][0]["issues"] == [{"code": "untitled", "category": "drawing"}]
+    assert body["items"][0]["kind"] == "note" and body["items"][0]["sheet"] == 1
+
+    assert [i["id"] for i in _issues(pid, category="scope")["items"]] == [scope["id"]]
+    assert _issues(pid, code="untitled", category="scope")["total"] == 6
+    client.patch(f"/api/projects/{pid}/entities/{notes[0]}", json={"text": "Verify in field"})
+    assert _issues(pid, code="untitled")["total"] == 4
+
+    assert client.get(f"/api/projects/{pid}/issues", params={"code": "nope"}).status_code == 422
+    assert client.get(f"/api/projects/{pid}/issues", params={"category": "nope"}).status_code == 422
+    assert client.get("/api/projects/missing/issues").status_code == 404
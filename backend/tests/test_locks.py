@@ -0,0 +1,110 @@
+import os, subprocess, sys, threading
+from concurrent.futures import ThreadPoolExecutor
+from backend.app import ingest as ingest_mod
+from backend.app import locks, oplog
+from backend.app.entities_models import CreateDrawing
+from backend.app.concepts_models import CreateRelationship, CreateSpace
+from backend.app.entities_store import create_entity, entities_path, load_entities, update_entity
+from backend.app.graph_index import GraphIndex
+from backend.app.concepts_store import create_concept
+from backend.app.links_store import create_link, load_links
+
+
+def _setup(tmp_path, monkeypatch, mode="thread"):
+    monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setenv("TIMBERGEM_LOCK_MODE", mode)
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
+    for pid in ("p1", "p2"):
+        os.makedirs(os.path.join(str(tmp_path), pid), exist_ok=True)
+
+
+def _drawing(pid, i=0):
+    return create_entity(
+        pid,
+        CreateDrawing(entity_type="drawing", source_sheet_number=1, bounding_box=[i, i, i + 10, i + 10]),
+    )
+
+
+def test_concurrent_updates_do_not_lose_writes(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    d = _drawing("p1")
+    # Each thread patches a different field of the same entity; all must survive.
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        for _ in range(20):
+            a = pool.submit(update_entity, "p1", d.id, title="T")
+            b = pool.submit(update_entity, "p1", d.id, description="D")
+            a.result(), b.result()
+    stored = load_entities("p1")[0]
+    assert stored.title == "T" and stored.description == "D"
+
+
+def test_concurrent_duplicate_links_rejected(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch, mode="file")
+    d = _drawing("p1")
+    space = create_concept("p1", CreateSpace(kind="space", name="Kitchen"))
+    payload = CreateRelationship(rel_type="DEPICTS", source_id=d.id, target_id=space.id)
+
+    def attempt():
+        try:
+            create_link("p1", payload)
+            return True
+        except ValueError:
+            return False
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: attempt(), range(16)))
+    assert results.count(True) == 1
+    assert len(load_links("p1")) == 1
+
+
+def test_projects_do_not_contend(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    done = threading.Event()
+    with locks.project_lock("p1"):
+        t = threading.Thread(target=lambda: (_drawing("p2"), done.set()))
+        t.start()
+        assert done.wait(5), "writer on another project was blocked"
+        blocked = threading.Thread(target=_drawing, args=("p1",))
+        blocked.start()
+        blocked.join(0.2)
+        assert blocked.is_alive()
+    blocked.join(5)
+    assert len(load_entities("p1")) == 1
+
+
+_OTHER_WORKER = """
+from backend.app.entities_models import CreateDrawing
+from backend.app.entities_store import create_entity, update_entity
+import sys
+d = create_entity("p1", CreateDrawing(entity_type="drawing", source_sheet_number=1, bounding_box=[50, 50, 60, 60]))
+update_entity("p1", sys.argv[1], title="from worker 2")
+print(d.id)
+"""
+
+
+def test_workers_see_each_others_writes_incrementally(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch, mode="file")
+    d1 = _drawing("p1")
+    assert [e.id for e in load_entities("p1")] == [d1.id]
+    reloads = []
+    real_load = GraphIndex.load_store
+    monkeypatch.setattr(GraphIndex, "load_store", lambda self, *a: (reloads.append(a[0]), real_load(self, *a)))
+
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    out = subprocess.run(
+        [sys.executable, "-c", _OTHER_WORKER, d1.id],
+        cwd=root, env=dict(os.environ), capture_output=True, text=True, timeout=60, check=True,
+    )
+    d2_id = out.stdout.strip().splitlines()[-1]
+    ents = {e.id: e for e in load_entities("p1")}
+    assert set(ents) == {d1.id, d2_id} and ents[d1.id].title == "from worker 2"
+    assert reloads == []  # applied from the log tail, no full reload
+
+    # Another worker's append in progress is neither applied nor cut off
+    lpath = oplog.log_path(entities_path("p1"))
+    with open(lpath, "a") as f:
+        f.write('{"op":"delete","id":"%s"' % d2_id)
+    assert len(load_entities("p1")) == 2
+    with open(lpath, "a") as f:
+        f.write("}\n")
+    assert [e.id for e in load_entities("p1")] == [d1.id]
@@ -0,0 +1,106 @@
+import os, json
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app import ingest as ingest_mod
+from backend.app import oplog
+from backend.app.entities_store import entities_path, load_entities
+
+
+client = TestClient(app)
+
+
+def _create_project(tmp_path, monkeypatch):
+    monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
+    pid = "proj_oplog"
+    pdir = os.path.join(str(tmp_path), pid)
+    os.makedirs(os.path.join(pdir, "pages"), exist_ok=True)
+    with open(os.path.join(pdir, "manifest.json"), "w") as f:
+        f.write(
+            """
+{"project_id":"proj_oplog","status":"complete","num_pages":1,"stages":{"render":{"done":1,"total":1},"ocr":{"done":1,"total":1}},"started_at":0,"completed_at":0,"error":null}
+""".strip()
+        )
+    return pid
+
+
+def _drawing(pid, bbox=(0, 0, 100, 100)):
+    r = client.post(
+        f"/api/projects/{pid}/entities",
+        json={"entity_type": "drawing", "source_sheet_number": 1, "bounding_box": list(bbox)},
+    )
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def test_mutations_append_to_log(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    d1 = _drawing(pid)
+    d2 = _drawing(pid, (200, 200, 300, 300))
+    r = client.patch(f"/api/projects/{pid}/entities/{d1['id']}", json={"title": "Plan"})
+    assert r.status_code == 200
+    r = client.delete(f"/api/projects/{pid}/entities/{d2['id']}")
+    assert r.status_code == 200
+
+    path = entities_path(pid)
+    assert not os.path.exists(path)  # nothing folded into a snapshot yet
+    with open(oplog.log_path(path)) as f:
+        ops = [json.loads(line)["op"] for line in f]
+    assert ops == ["create", "create", "update", "delete"]
+
+    listed = client.get(f"/api/projects/{pid}/entities").json()
+    assert [e["id"] for e in listed] == [d1["id"]]
+    assert listed[0]["title"] == "Plan"
+
+
+def test_torn_final_record_is_recovered(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    d1 = _drawing(pid)
+    lpath = oplog.log_path(entities_path(pid))
+    with open(lpath, "a") as f:
+        f.write('{"op":"create","id":"half","data":{"id":"ha')
+    ents = load_entities(pid)
+    assert [e.id for e in ents] == [d1["id"]]
+    with open(lpath, "rb") as f:
+        assert f.read().endswith(b"\n")  # torn tail truncated on load
+    d2 = _drawing(pid, (200, 200, 300, 300))
+    assert [e.id for e in load_entities(pid)] == [d1["id"], d2["id"]]
+
+
+def test_compaction_folds_log_into_snapshot(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    d1 = _drawing(pid)
+    d2 = _drawing(pid, (200, 200, 300, 300))
+    client.delete(f"/api/projects/{pid}/entities/{d1['id']}")
+    path = entities_path(pid)
+    assert oplog.compact(path) is True
+    assert not os.path.exists(oplog.log_path(path))
+    with open(path) as f:
+        assert [e["id"] for e in json.load(f)] == [d2["id"]]
+    assert [e.id for e in load_entities(pid)] == [d2["id"]]
+    assert oplog.compact(path) is False
+
+
+def test_snapshot_format_is_detected_on_read(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    d1 = _drawing(pid)
+    path = entities_path(pid)
+    # A snapshot in the old pretty-printed format, followed by a logged create
+    with open(path, "w") as f:
+        json.dump([d1], f, indent=2)
+    os.remove(oplog.log_path(path))
+    d2 = _drawing(pid, (200, 200, 300, 300))
+
+    monkeypatch.setenv("TIMBERGEM_STORE_FORMAT", "gzip")
+    assert oplog.compact(path) is True
+    with open(path, "rb") as f:
+        assert f.read(2) == b"\x1f\x8b"  # gzip magic
+    assert [e.id for e in load_entities(pid)] == [d1["id"], d2["id"]]
+
+    monkeypatch.setenv("TIMBERGEM_STORE_FORMAT", "json")
+    client.delete(f"/api/projects/{pid}/entities/{d1['id']}")
+    assert oplog.compact(path) is True
+    with open(path, "rb") as f:
+        raw = f.read()
+    assert raw.startswith(b"[") and b"\n" not in raw
+    assert [r["id"] for r in oplog.read_records(path)] == [d2["id"]]
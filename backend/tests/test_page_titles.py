@@ -153,3 +153,37 @@ def test_backwards_compatibility_no_page_titles(tmp_path, monkeypatch):
     finally:
         main_module.project_dir = original_project_dir
 
+
+
+def test_manifest_is_parsed_again_only_when_it_changes(tmp_path, monkeypatch):
+    """The manifest registry serves unchanged manifests without reading the file."""
+    pid = _create_project(tmp_path, monkeypatch)
+    import app.ingest as ingest_module
+    reads = []
+    real_read = ingest_module.codec.read_file
+    monkeypatch.setattr(ingest_module.codec, "read_file", lambda path: reads.append(path) or real_read(path))
+
+    # Written through init_manifest: already registered
+    assert ingest_module.project_known(pid)
+    manifest = read_manifest(pid)
+    manifest["page_titles"]["0"] = "Not saved"
+    assert read_manifest(pid)["page_titles"] == {}
+    ingest_module.patch_manifest(pid, status="complete")
+    assert read_manifest(pid)["status"] == "complete"
+    assert reads == []
+
+    # Replaced behind the registry's back (restore, another process)
+    with open(ingest_module.manifest_path(pid), "w") as f:
+        json.dump({"project_id": pid, "status": "error", "stages": {}}, f)
+    assert read_manifest(pid)["status"] == "error"
+    assert read_manifest(pid)["status"] == "error"
+    assert len(reads) == 1
+
+    # A deleted project is evicted by the existence check itself
+    os.remove(ingest_module.manifest_path(pid))
+    from fastapi.testclient import TestClient
+    from app.main import app
+    assert TestClient(app).get(f"/api/projects/{pid}/entities").status_code == 404
+    assert not ingest_module.project_known(pid)
+    assert ingest_module.manifest_path(pid) not in ingest_module._manifests
+    assert read_manifest(pid) is None
@@ -0,0 +1,108 @@
+import os
+from collections import Counter
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app import ingest as ingest_mod
+from backend.app import graph_index
+
+
+client = TestClient(app)
+
+
+def _create_project(tmp_path, monkeypatch):
+    monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
+    pid = "proj_quantities"
+    pdir = os.path.join(str(tmp_path), pid)
+    os.makedirs(os.path.join(pdir, "pages"), exist_ok=True)
+    with open(os.path.join(pdir, "manifest.json"), "w") as f:
+        f.write(
+            """
+{"project_id":"proj_quantities","status":"complete","num_pages":3,"stages":{"render":{"done":3,"total":3},"ocr":{"done":3,"total":3}},"started_at":0,"completed_at":0,"error":null}
+""".strip()
+        )
+    return pid
+
+
+def _q(pid, by, key):
+    r = client.get(f"/api/projects/{pid}/quantities", params={"by": by, "key": key})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    return body["count"], {s["sheet"]: s["count"] for s in body["sheets"]}
+
+
+def _recount(pid):
+    """Aggregates rebuilt by brute force from the listed records."""
+    ents = {e["id"]: e for e in client.get(f"/api/projects/{pid}/entities").json()}
+    links = client.get(f"/api/projects/{pid}/links").json()
+    out = {d: Counter() for d in graph_index.QUANTITY_DIMENSIONS}
+    for e in ents.values():
+        if e["entity_type"] not in graph_index.INSTANCE_TYPES:
+            continue
+        sheet = e.get("source_sheet_number")
+        out["definition"][(e.get("symbol_definition_id") or e.get("component_definition_id"), sheet)] += 1
+        for dim, field in (("item", "definition_item_id"), ("drawing", "instantiated_in_id")):
+            if e.get(field):
+                out[dim][(e[field], sheet)] += 1
+        if sheet is not None:
+            out["sheet"][(str(sheet), sheet)] += 1
+    for l in links:
+        src = ents.get(l["source_id"])
+        if l["rel_type"] == "LOCATED_IN" and src is not None:
+            out["space"][(l["target_id"], src.get("source_sheet_number"))] += 1
+    return out
+
+
+def _maintained(pid):
+    body = client.get(f"/api/projects/{pid}/quantities").json()
+    out = {d: Counter() for d in graph_index.QUANTITY_DIMENSIONS}
+    for dim, entries in body.items():
+        for key, q in entries.items():
+            assert q["count"] == sum(s["count"] for s in q["sheets"])
+            for s in q["sheets"]:
+                out[dim][(key, s["sheet"])] += s["count"]
+    return out
+
+
+def test_quantities_follow_every_write(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    ops = [
+        {"op": "create", "ref": "plan1", "data": {"entity_type": "drawing", "source_sheet_number": 1, "bounding_box": [0, 0, 1000, 1000]}},
+        {"op": "create", "ref": "plan2", "data": {"entity_type": "drawing", "source_sheet_number": 2, "bounding_box": [0, 0, 1000, 1000]}},
+        {"op": "create", "ref": "sched", "data": {"entity_type": "schedule", "source_sheet_number": 3, "bounding_box": [0, 0, 500, 500]}},
+        {"op": "create", "ref": "d2", "data": {"entity_type": "schedule_item", "schedule_id": "$sched", "mark": "D2"}},
+        {"op": "create", "ref": "sym", "data": {"entity_type": "symbol_definition", "source_sheet_number": 3, "bounding_box": [10, 10, 20, 20], "name": "Door Tag", "scope": "project"}},
+    ]
+    for i, sheet in enumerate((1, 1, 2)):
+        ops.append({"op": "create", "ref": f"i{i}", "data": {"entity_type": "symbol_instance", "source_sheet_number": sheet, "bounding_box": [100 + i * 50, 100, 120 + i * 50, 120], "symbol_definition_id": "$sym", "definition_item_id": "$d2", "definition_item_type": "schedule_item"}})
+    results = client.post(f"/api/projects/{pid}/entities:batch", json={"operations": ops}).json()["results"]
+    ids = {op["ref"]: res["id"] for op, res in zip(ops, results)}
+
+    assert _q(pid, "item", ids["d2"]) == (3, {1: 2, 2: 1})
+    assert _q(pid, "definition", ids["sym"]) == (3, {1: 2, 2: 1})
+    assert _q(pid, "sheet", "1") == (2, {1: 2})
+
+    kitchen = client.post(f"/api/projects/{pid}/concepts", json={"kind": "space", "name": "Kitchen"}).json()
+    link = client.post(f"/api/projects/{pid}/links", json={"rel_type": "LOCATED_IN", "source_id": ids["i0"], "target_id": kitchen["id"]}).json()
+    client.post(f"/api/projects/{pid}/links", json={"rel_type": "LOCATED_IN", "source_id": ids["i2"], "target_id": kitchen["id"]})
+    assert _q(pid, "space", kitchen["id"]) == (2, {1: 1, 2: 1})
+
+    # Moving an instance moves its space count along with it
+    client.patch(f"/api/projects/{pid}/entities/{ids['i0']}", json={"source_sheet_number": 2, "bounding_box": [10, 10, 20, 20]})
+    assert _q(pid, "item", ids["d2"]) == (3, {1: 1, 2: 2})
+    assert _q(pid, "space", kitchen["id"]) == (2, {2: 2})
+
+    client.delete(f"/api/projects/{pid}/links/{link['id']}")
+    client.delete(f"/api/projects/{pid}/entities/{ids['i2']}")  # cascades its LOCATED_IN link
+    assert _q(pid, "space", kitchen["id"]) == (0, {})
+    assert _q(pid, "item", ids["d2"]) == (2, {1: 1, 2: 1})
+    assert _q(pid, "drawing", "nope") == (0, {})
+
+    assert _maintained(pid) == _recount(pid)
+    client.post(f"/api/projects/{pid}/undo")  # restores i2 and its link in one step
+    assert _q(pid, "space", kitchen["id"]) == (1, {2: 1})
+    graph_index._cache.clear()  # rebuilt from disk, links and entities loaded separately
+    assert _maintained(pid) == _recount(pid)
+
+    assert client.get(f"/api/projects/{pid}/quantities", params={"by": "mark"}).status_code == 422
+    assert client.get(f"/api/projects/{pid}/quantities", params={"key": "x"}).status_code == 422
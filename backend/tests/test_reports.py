@@ -0,0 +1,99 @@
+import csv, io, os, zipfile
+import xml.etree.ElementTree as ET
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app import ingest as ingest_mod
+from backend.app import graph_index, reports
+
+
+client = TestClient(app)
+
+
+def _create_project(tmp_path, monkeypatch):
+    monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
+    pid = "proj_reports"
+    pdir = os.path.join(str(tmp_path), pid)
+    os.makedirs(os.path.join(pdir, "pages"), exist_ok=True)
+    with open(os.path.join(pdir, "manifest.json"), "w") as f:
+        f.write(
+            """
+{"project_id":"proj_reports","status":"complete","num_pages":2,"stages":{"render":{"done":2,"total":2},"ocr":{"done":2,"total":2}},"started_at":0,"completed_at":0,"error":null,"page_titles":{"1":"A-201 Second Floor"}}
+""".strip()
+        )
+    return pid
+
+
+def _build_graph(pid):
+    ops = [
+        {"op": "create", "ref": "plan", "data": {"entity_type": "drawing", "source_sheet_number": 2, "bounding_box": [0, 0, 1000, 1000], "title": "Floor Plan"}},
+        {"op": "create", "ref": "sched", "data": {"entity_type": "schedule", "source_sheet_number": 1, "bounding_box": [0, 0, 500, 500], "title": "Window Schedule"}},
+        {"op": "create", "ref": "w1", "data": {"entity_type": "schedule_item", "schedule_id": "$sched", "mark": "W1", "description": "Casement 36x48"}},
+        {"op": "create", "ref": "w2", "data": {"entity_type": "schedule_item", "schedule_id": "$sched", "mark": "W2"}},
+        {"op": "create", "ref": "sym", "data": {"entity_type": "symbol_definition", "source_sheet_number": 1, "bounding_box": [10, 10, 20, 20], "name": "Window Tag", "scope": "project"}},
+        {"op": "create", "ref": "a", "data": {"entity_type": "symbol_instance", "source_sheet_number": 2, "bounding_box": [100, 100, 120, 120], "symbol_definition_id": "$sym", "definition_item_id": "$w1", "definition_item_type": "schedule_item", "recognized_text": "W1"}},
+        {"op": "create", "ref": "b", "data": {"entity_type": "symbol_instance", "source_sheet_number": 2, "bounding_box": [300, 300, 320, 320], "symbol_definition_id": "$sym", "definition_item_id": "$w2", "definition_item_type": "schedule_item"}},
+        {"op": "create", "ref": "c", "data": {"entity_type": "symbol_instance", "source_sheet_number": 2, "bounding_box": [500, 500, 520, 520], "symbol_definition_id": "$sym", "definition_item_id": "$w1", "definition_item_type": "schedule_item"}},
+    ]
+    r = client.post(f"/api/projects/{pid}/entities:batch", json={"operations": ops})
+    assert r.status_code == 200, r.text
+    ids = {op["ref"]: res["id"] for op, res in zip(ops, r.json()["results"])}
+    kitchen = client.post(f"/api/projects/{pid}/concepts", json={"kind": "space", "name": "Kitchen"}).json()
+    bath = client.post(f"/api/projects/{pid}/concepts", json={"kind": "space", "name": "Bath"}).json()
+    for space in (kitchen, bath):
+        client.post(f"/api/projects/{pid}/links", json={"rel_type": "LOCATED_IN", "source_id": ids["a"], "target_id": space["id"]})
+    return ids
+
+
+def test_takeoff_csv_joins_definitions_items_drawings_and_spaces(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    ids = _build_graph(pid)
+
+    r = client.get(f"/api/projects/{pid}/reports/takeoff", params={"mark": "w1"})
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert [row["instance_id"] for row in rows] == [ids["a"], ids["c"]]
+    a = rows[0]
+    assert a["definition_name"] == "Window Tag" and a["mark"] == "W1" and a["item_description"] == "Casement 36x48"
+    assert a["item_container_title"] == "Window Schedule" and a["item_type"] == "schedule_item"
+    assert a["sheet"] == "2" and a["sheet_title"] == "A-201 Second Floor"
+    assert a["drawing_id"] == ids["plan"] and a["drawing_title"] == "Floor Plan"
+    assert a["spaces"] == "Bath; Kitchen" and a["recognized_text"] == "W1"
+    assert rows[1]["spaces"] == ""
+
+    everything = list(csv.DictReader(io.StringIO(client.get(f"/api/projects/{pid}/reports/takeoff").text)))
+    assert len(everything) == 3
+    by_def = client.get(f"/api/projects/{pid}/reports/takeoff", params={"definition_id": ids["sym"], "mark": "W2"})
+    assert [row["instance_id"] for row in csv.DictReader(io.StringIO(by_def.text))] == [ids["b"]]
+    assert client.get(f"/api/projects/{pid}/reports/takeoff", params={"sheet": "1"}).text.count("\n") == 1  # header only
+    # Selecting by mark reads the items' raw records, a fresh index stays unhydrated
+    graph_index._cache.clear()
+    b"".join(reports.takeoff_report(pid, "csv", marks=["W1"]))
+    entities = graph_index.get_index(pid).entities
+    assert all(type(rec) is dict for _, rec in entities.raw_items())
+    assert client.get(f"/api/projects/{pid}/reports/takeoff", params={"format": "pdf"}).status_code == 422
+    assert client.get(f"/api/projects/{pid}/reports/takeoff", params={"instance_type": "drawing"}).status_code == 422
+
+
+def test_takeoff_streams_in_batches_and_as_xlsx(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    ids = _build_graph(pid)
+    monkeypatch.setattr(reports, "BATCH_ROWS", 1)
+    assert len(list(reports.takeoff_report(pid, "csv"))) == 4  # one chunk per row, then the rest
+
+    zf = zipfile.ZipFile(io.BytesIO(b"".join(reports.takeoff_report(pid, "xlsx"))))
+    assert zf.testzip() is None
+    ns = {"s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+    sheet = ET.fromstring(zf.read("xl/worksheets/sheet1.xml"))
+    rows = sheet.findall(".//s:row", ns)
+    assert len(rows) == 4
+    header = ["".join(c.itertext()) for c in rows[0]]
+    assert header == list(reports.COLUMNS)
+    first = ["".join(c.itertext()) for c in rows[1]]
+    assert first[0] == ids["a"] and first[header.index("spaces")] == "Bath; Kitchen"
+    assert rows[1][header.index("x1")].find("s:v", ns).text == "100.0"
+
+    r = client.get(f"/api/projects/{pid}/reports/takeoff", params={"format": "xlsx"})
+    assert r.headers["content-type"] == reports.MEDIA_TYPES["xlsx"]
+    assert zipfile.ZipFile(io.BytesIO(r.content)).namelist()[0] == "[Content_Types].xml"
@@ -0,0 +1,68 @@
+import os, json
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app import ingest as ingest_mod
+from backend.app.entities_models import Drawing
+from backend.app.entities_store import load_entities
+
+
+client = TestClient(app)
+
+
+def _create_project(tmp_path, monkeypatch):
+    monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
+    pid = "proj_cache"
+    pdir = os.path.join(str(tmp_path), pid)
+    os.makedirs(os.path.join(pdir, "pages"), exist_ok=True)
+    with open(os.path.join(pdir, "manifest.json"), "w") as f:
+        f.write(
+            """
+{"project_id":"proj_cache","status":"complete","num_pages":1,"stages":{"render":{"done":1,"total":1},"ocr":{"done":1,"total":1}},"started_at":0,"completed_at":0,"error":null}
+""".strip()
+        )
+    return pid
+
+
+def test_list_served_from_cache_with_etag(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    for i in range(3):
+        r = client.post(
+            f"/api/projects/{pid}/entities",
+            json={"entity_type": "drawing", "source_sheet_number": 1, "bounding_box": [i * 200, 0, i * 200 + 100, 100], "title": "Plän"},
+        )
+        assert r.status_code == 201
+    url = f"/api/projects/{pid}/entities"
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.json() == [json.loads(e.model_dump_json()) for e in load_entities(pid)]
+    etag = first.headers["ETag"]
+
+    # Second read must not serialize any model
+    def boom(*a, **k):
+        raise AssertionError("model serialized on a cached read")
+
+    with monkeypatch.context() as m:
+        m.setattr(Drawing, "model_dump_json", boom)
+        again = client.get(url)
+        assert again.content == first.content and again.headers["ETag"] == etag
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    ent_id = first.json()[0]["id"]
+    client.patch(f"{url}/{ent_id}", json={"title": "Renamed"})
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert changed.json()[0]["title"] == "Renamed"
+    assert [e["id"] for e in changed.json()] == [e["id"] for e in first.json()]
+
+
+def test_concepts_and_links_cached(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    r = client.get(f"/api/projects/{pid}/concepts")
+    assert r.status_code == 200 and r.json() == []
+    etag = r.headers["ETag"]
+    client.post(f"/api/projects/{pid}/concepts", json={"kind": "space", "name": "Kitchen"})
+    r = client.get(f"/api/projects/{pid}/concepts", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and [c["name"] for c in r.json()] == ["Kitchen"]
+    r = client.get(f"/api/projects/{pid}/links")
+    assert r.status_code == 200 and r.json() == [] and "ETag" in r.headers
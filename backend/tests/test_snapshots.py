@@ -0,0 +1,102 @@
+import os
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app import ingest as ingest_mod
+from backend.app import oplog
+
+
+client = TestClient(app)
+
+
+def _create_project(tmp_path, monkeypatch, pages=3):
+    monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
+    pid = "proj_snapshots"
+    pdir = os.path.join(str(tmp_path), pid)
+    os.makedirs(os.path.join(pdir, "pages"), exist_ok=True)
+    os.makedirs(os.path.join(pdir, "ocr"), exist_ok=True)
+    for i in range(1, pages + 1):
+        with open(os.path.join(pdir, "pages", f"page_{i}.png"), "wb") as f:
+            f.write(b"\x89PNG" + os.urandom(4096))
+        with open(os.path.join(pdir, "ocr", f"page_{i}.json"), "w") as f:
+            f.write('{"blocks": []}')
+    with open(os.path.join(pdir, "original.pdf"), "wb") as f:
+        f.write(b"%PDF-1.7")
+    with open(os.path.join(pdir, "manifest.json"), "w") as f:
+        f.write(
+            """
+{"project_id":"proj_snapshots","status":"complete","num_pages":%d,"stages":{"render":{"done":1,"total":1},"ocr":{"done":1,"total":1}},"started_at":0,"completed_at":0,"error":null}
+""".strip()
+            % pages
+        )
+    return pid, pdir
+
+
+def _new_drawing(pid):
+    return client.post(
+        f"/api/projects/{pid}/entities",
+        json={"entity_type": "drawing", "source_sheet_number": 1, "bounding_box": [0, 0, 100, 100]},
+    ).json()
+
+
+def test_snapshot_links_assets_and_restore_brings_data_back(tmp_path, monkeypatch):
+    pid, pdir = _create_project(tmp_path, monkeypatch)
+    d = _new_drawing(pid)
+    r = client.post(f"/api/projects/{pid}/snapshots", json={"label": "before edits"})
+    assert r.status_code == 201, r.text
+    snap = r.json()
+    assert snap["label"] == "before edits" and snap["linked"] == 7  # 3 pages, 3 OCR, the PDF
+    sdir = os.path.join(pdir, "snapshots", snap["id"])
+    assert os.stat(os.path.join(sdir, "pages", "page_1.png")).st_ino == os.stat(os.path.join(pdir, "pages", "page_1.png")).st_ino
+    # Stores are copies: later edits must not reach the snapshot
+    log = os.path.basename(oplog.log_path("entities.json"))
+    assert os.stat(os.path.join(sdir, log)).st_ino != os.stat(os.path.join(pdir, log)).st_ino
+
+    client.patch(f"/api/projects/{pid}/entities/{d['id']}", json={"title": "Renamed"})
+    client.delete(f"/api/projects/{pid}/entities/{d['id']}")
+    client.post(f"/api/projects/{pid}/concepts", json={"kind": "space", "name": "Kitchen"})
+    rev = client.get(f"/api/projects/{pid}/changes").json()["revision"]
+
+    r = client.post(f"/api/projects/{pid}/snapshots/{snap['id']}/restore")
+    assert r.status_code == 200, r.text
+    assert client.get(f"/api/projects/{pid}/entities").json() == [d]
+    assert client.get(f"/api/projects/{pid}/concepts").json() == []
+    assert client.get(f"/api/projects/{pid}/changes", params={"since": rev}).json()["reset"] is True
+    assert client.get(f"/api/projects/{pid}/history").json() == {"undo": 0, "redo": 0}
+
+    assert [s["id"] for s in client.get(f"/api/projects/{pid}/snapshots").json()] == [snap["id"]]
+    assert client.delete(f"/api/projects/{pid}/snapshots/{snap['id']}").status_code == 200
+    assert client.get(f"/api/projects/{pid}/snapshots").json() == []
+    assert client.post(f"/api/projects/{pid}/snapshots/{snap['id']}/restore").status_code == 404
+    assert client.post(f"/api/projects/{pid}/snapshots/..%2F..%2Fx/restore").status_code == 404
+
+
+def test_clone_is_an_independent_project(tmp_path, monkeypatch):
+    pid, pdir = _create_project(tmp_path, monkeypatch)
+    d = _new_drawing(pid)
+    snap = client.post(f"/api/projects/{pid}/snapshots").json()
+    client.patch(f"/api/projects/{pid}/entities/{d['id']}", json={"title": "Latest"})
+
+    r = client.post(f"/api/projects/{pid}/clone")
+    assert r.status_code == 201, r.text
+    clone = r.json()["project_id"]
+    status = client.get(f"/api/projects/{clone}/status").json()
+    assert status["project_id"] == clone and status["num_pages"] == 3
+    assert client.get(f"/api/projects/{clone}/entities").json()[0]["title"] == "Latest"
+    assert client.get(f"/api/projects/{clone}/pages/2.png").content == client.get(f"/api/projects/{pid}/pages/2.png").content
+    assert client.get(f"/api/projects/{clone}/snapshots").json() == []
+    assert client.get(f"/api/projects/{clone}/history").json() == {"undo": 0, "redo": 0}
+
+    client.delete(f"/api/projects/{clone}/entities/{d['id']}")
+    assert client.get(f"/api/projects/{clone}/entities").json() == []
+    assert len(client.get(f"/api/projects/{pid}/entities").json()) == 1
+
+    from_snap = client.post(f"/api/projects/{pid}/clone", json={"snapshot_id": snap["id"]}).json()["project_id"]
+    assert client.get(f"/api/projects/{from_snap}/entities").json() == [d]
+
+
+def test_snapshot_refused_while_processing(tmp_path, monkeypatch):
+    pid, _ = _create_project(tmp_path, monkeypatch)
+    ingest_mod.patch_manifest(pid, status="ocr")
+    assert client.post(f"/api/projects/{pid}/snapshots").status_code == 409
+    assert client.post(f"/api/projects/{pid}/clone").status_code == 409
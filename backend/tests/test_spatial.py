@@ -0,0 +1,122 @@
+import os
+from backend.app import ingest as ingest_mod
+from backend.app.spatial import GridIndex
+from backend.app.entities_models import CreateDrawing, CreateSymbolDefinition, CreateSymbolInstance, CreateLegend
+from backend.app.entities_store import create_entity, update_entity, delete_entity
+from backend.app.graph_index import get_index
+
+
+def test_grid_containing_and_intersecting():
+    g = GridIndex(cell=100)
+    g.insert("big", (0, 0, 1000, 1000), order=0)
+    g.insert("left", (0, 0, 500, 1000), order=1)
+    g.insert("far", (2000, 2000, 2100, 2100), order=2)
+    assert g.containing((10, 10, 20, 20)) == ["big", "left"]
+    assert g.containing((600, 10, 620, 20)) == ["big"]
+    assert g.intersecting((450, 450, 2050, 2050)) == ["big", "left", "far"]
+    # Touching edges do not intersect
+    assert g.intersecting((1000, 0, 1100, 10)) == []
+    g.remove("big")
+    assert g.containing((600, 10, 620, 20)) == []
+    assert len(g) == 2
+
+
+def test_huge_boxes_are_kept_out_of_the_cells():
+    g = GridIndex(cell=256)
+    g.insert("huge", (0, 0, 300_000, 300_000), order=0)
+    g.insert("inf", (0, 0, float("inf"), float("inf")), order=1)
+    g.insert("small", (10, 10, 20, 20), order=2)
+    assert g.large == {"huge", "inf"} and len(g.buckets) == 1
+    assert g.containing((12, 12, 14, 14)) == ["huge", "inf", "small"]
+    assert g.intersecting((250_000, 250_000, 250_010, 250_010)) == ["huge", "inf"]
+    g.remove("huge")
+    g.remove("inf")
+    assert not g.large and g.intersecting((0, 0, 100, 100)) == ["small"]
+
+
+def test_huge_viewports_do_not_walk_every_cell():
+    g = GridIndex(cell=1)
+    g.insert("a", (0, 0, 2, 2), order=0)
+    g.insert("b", (50, 50, 52, 52), order=1)
+    assert g.bounds == (0, 0, 52, 52)
+    # 1e14 cells if walked; clipped and then smaller than a scan of two boxes
+    assert g.intersecting((-1e7, -1e7, 1e7, 1e7)) == ["a", "b"]
+    assert g.intersecting((1, 1, 51, 51)) == ["a", "b"]
+    assert g.intersecting((1e6, 1e6, 1e7, 1e7)) == []
+
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
+    os.makedirs(os.path.join(str(tmp_path), "p1"), exist_ok=True)
+    return "p1"
+
+
+def test_index_tracks_moves_and_deletes(tmp_path, monkeypatch):
+    pid = _setup(tmp_path, monkeypatch)
+    d1 = create_entity(pid, CreateDrawing(entity_type="drawing", source_sheet_number=1, bounding_box=[0, 0, 500, 500]))
+    d2 = create_entity(pid, CreateDrawing(entity_type="drawing", source_sheet_number=2, bounding_box=[0, 0, 500, 500]))
+    sym = create_entity(pid, CreateSymbolDefinition(entity_type="symbol_definition", source_sheet_number=1, bounding_box=[900, 900, 950, 950], name="W1", scope="project"))
+
+    def place(sheet, box):
+        return create_entity(pid, CreateSymbolInstance(
+            entity_type="symbol_instance", source_sheet_number=sheet, bounding_box=box, symbol_definition_id=sym.id))
+
+    # Many instances on one sheet do not confuse containment
+    for i in range(50):
+        assert place(1, [i * 5, 10, i * 5 + 4, 14]).instantiated_in_id == d1.id
+    assert place(2, [10, 10, 20, 20]).instantiated_in_id == d2.id
+
+    # Moving the drawing away removes it from the old cells
+    update_entity(pid, d1.id, bounding_box=[1000, 1000, 1500, 1500])
+    assert place(1, [10, 10, 20, 20]).instantiated_in_id is None
+    assert place(1, [1100, 1100, 1120, 1120]).instantiated_in_id == d1.id
+
+    # Legends intersecting a definition are found through the index too
+    legend = create_entity(pid, CreateLegend(entity_type="legend", source_sheet_number=1, bounding_box=[880, 880, 1000, 1000]))
+    moved = update_entity(pid, sym.id, description="moved")
+    assert moved.defined_in_id == legend.id
+
+    assert delete_entity(pid, d2.id) is True
+    assert place(2, [30, 30, 40, 40]).instantiated_in_id is None
+
+
+def test_moving_or_deleting_containers_recomputes_dependents(tmp_path, monkeypatch):
+    pid = _setup(tmp_path, monkeypatch)
+    plan = create_entity(pid, CreateDrawing(entity_type="drawing", source_sheet_number=1, bounding_box=[0, 0, 500, 500]))
+    detail = create_entity(pid, CreateDrawing(entity_type="drawing", source_sheet_number=1, bounding_box=[400, 0, 900, 500]))
+    legend = create_entity(pid, CreateLegend(entity_type="legend", source_sheet_number=1, bounding_box=[1000, 0, 1200, 200]))
+    sym = create_entity(pid, CreateSymbolDefinition(entity_type="symbol_definition", source_sheet_number=1, bounding_box=[1010, 10, 1020, 20], name="W", scope="project"))
+    assert sym.defined_in_id == legend.id
+
+    def place(box):
+        return create_entity(pid, CreateSymbolInstance(entity_type="symbol_instance", source_sheet_number=1, bounding_box=box, symbol_definition_id=sym.id)).id
+
+    a, b, c = place([10, 10, 20, 20]), place([450, 10, 460, 20]), place([600, 10, 610, 20])
+    linked = lambda i: get_index(pid).get(i).instantiated_in_id
+    assert (linked(a), linked(b), linked(c)) == (plan.id, plan.id, detail.id)
+
+    # The plan slides right: a falls out, b stays, c is now inside the (older) plan too
+    report: list = []
+    update_entity(pid, plan.id, bounding_box=[300, 0, 800, 500], recomputed=report)
+    assert (linked(a), linked(b), linked(c)) == (None, plan.id, plan.id)
+    assert report == [
+        {"id": a, "field": "instantiated_in_id", "before": plan.id, "after": None},
+        {"id": c, "field": "instantiated_in_id", "before": detail.id, "after": plan.id},
+    ]
+    report = []
+    update_entity(pid, plan.id, title="Plan", recomputed=report)
+    assert report == []  # geometry unchanged: nothing to look at
+
+    # Deleting it hands its instances to the next containing drawing
+    report = []
+    assert delete_entity(pid, plan.id, recomputed=report)
+    assert (linked(b), linked(c)) == (detail.id, detail.id) and len(report) == 2
+
+    # The legend moves off its definition, then back over it
+    report = []
+    update_entity(pid, legend.id, bounding_box=[1500, 0, 1700, 200], recomputed=report)
+    assert get_index(pid).get(sym.id).defined_in_id is None
+    assert report == [{"id": sym.id, "field": "defined_in_id", "before": legend.id, "after": None}]
+    update_entity(pid, legend.id, bounding_box=[1000, 0, 1200, 200])
+    assert get_index(pid).get(sym.id).defined_in_id == legend.id
@@ -0,0 +1,98 @@
+import os
+from fastapi.testclient import TestClient
+from backend.app.main import app
+from backend.app import ingest as ingest_mod
+
+
+client = TestClient(app)
+
+
+def _create_project(tmp_path, monkeypatch):
+    monkeypatch.setenv("TIMBERGEM_PROJECTS_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest_mod, "BASE_DIR", str(tmp_path), raising=False)
+    pid = "proj_traversal"
+    pdir = os.path.join(str(tmp_path), pid)
+    os.makedirs(os.path.join(pdir, "pages"), exist_ok=True)
+    with open(os.path.join(pdir, "manifest.json"), "w") as f:
+        f.write(
+            """
+{"project_id":"proj_traversal","status":"complete","num_pages":2,"stages":{"render":{"done":2,"total":2},"ocr":{"done":2,"total":2}},"started_at":0,"completed_at":0,"error":null}
+""".strip()
+        )
+    return pid
+
+
+def _build_graph(pid, instances=3):
+    ops = [
+        {"op": "create", "ref": "plan", "data": {"entity_type": "drawing", "source_sheet_number": 1, "bounding_box": [0, 0, 1000, 1000]}},
+        {"op": "create", "ref": "sched", "data": {"entity_type": "schedule", "source_sheet_number": 2, "bounding_box": [0, 0, 500, 500]}},
+        {"op": "create", "ref": "w1", "data": {"entity_type": "schedule_item", "schedule_id": "$sched", "mark": "W1"}},
+        {"op": "create", "ref": "sym", "data": {"entity_type": "symbol_definition", "source_sheet_number": 2, "bounding_box": [10, 10, 20, 20], "name": "Tag", "scope": "project"}},
+    ]
+    for i in range(instances):
+        ops.append({"op": "create", "ref": f"i{i}", "data": {"entity_type": "symbol_instance", "source_sheet_number": 1, "bounding_box": [100 + i * 30, 100, 120 + i * 30, 120], "symbol_definition_id": "$sym", "definition_item_id": "$w1", "definition_item_type": "schedule_item"}})
+    results = client.post(f"/api/projects/{pid}/entities:batch", json={"operations": ops}).json()["results"]
+    ids = {op["ref"]: res["id"] for op, res in zip(ops, results)}
+    scope = client.post(f"/api/projects/{pid}/concepts", json={"kind": "scope", "description": "Install windows"}).json()
+    ids["scope"] = scope["id"]
+    for i in range(instances):
+        r = client.post(f"/api/projects/{pid}/links", json={"rel_type": "JUSTIFIED_BY", "source_id": scope["id"], "target_id": ids[f"i{i}"]})
+        assert r.status_code == 201, r.text
+    return ids
+
+
+EVIDENCE = [
+    {
+        "edge": "JUSTIFIED_BY",
+        "then": [
+            {"edge": "item", "then": [{"edge": "parent"}]},
+            {"edge": "instantiated_in", "kinds": ["drawing"]},
+        ],
+    }
+]
+
+
+def test_pattern_walk_returns_evidence_subgraph_in_one_call(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    ids = _build_graph(pid)
+
+    r = client.post(f"/api/projects/{pid}/traverse", json={"start": [ids["scope"]], "steps": EVIDENCE})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["truncated"] is False
+    assert [n["id"] for n in body["nodes"]] == [ids[k] for k in ("scope", "i0", "i1", "i2", "w1", "sched", "plan")]
+    edges = {(e["type"], e["source_id"], e["target_id"]) for e in body["edges"]}
+    assert ("JUSTIFIED_BY", ids["scope"], ids["i1"]) in edges
+    assert ("definition_item_id", ids["i1"], ids["w1"]) in edges
+    assert ("schedule_id", ids["w1"], ids["sched"]) in edges
+    assert ("instantiated_in_id", ids["i2"], ids["plan"]) in edges
+    assert len(edges) == 3 + 3 + 1 + 3
+    assert all("link_id" in e for e in body["edges"] if e["type"] == "JUSTIFIED_BY")
+
+    # Reverse step: from a schedule item to its instances, then their scopes
+    r = client.post(f"/api/projects/{pid}/traverse", json={"start": [ids["w1"]], "steps": [{"edge": "item", "direction": "in", "then": [{"edge": "JUSTIFIED_BY", "direction": "in"}]}]})
+    assert [n["id"] for n in r.json()["nodes"]] == [ids["w1"], ids["i0"], ids["i1"], ids["i2"], ids["scope"]]
+
+
+def test_limits_cap_the_walk(tmp_path, monkeypatch):
+    pid = _create_project(tmp_path, monkeypatch)
+    ids = _build_graph(pid, instances=5)
+
+    body = client.post(f"/api/projects/{pid}/traverse", json={"start": [ids["scope"]], "steps": EVIDENCE, "max_fanout": 2}).json()
+    assert body["truncated"] and body["truncations"][0] == {"node": ids["scope"], "edge": "JUSTIFIED_BY", "reason": "max_fanout", "dropped": 3}
+    assert [n["id"] for n in body["nodes"]][:3] == [ids["scope"], ids["i0"], ids["i1"]]
+
+    body = client.post(f"/api/projects/{pid}/traverse", json={"start": [ids["scope"]], "steps": EVIDENCE, "max_nodes": 4}).json()
+    assert len(body["nodes"]) == 4 and body["truncations"][0]["reason"] == "max_nodes"
+
+    # Without a pattern every edge is followed both ways, hop by hop
+    body = client.post(f"/api/projects/{pid}/traverse", json={"start": [ids["w1"]], "max_depth": 1}).json()
+    assert {n["id"] for n in body["nodes"]} == {ids["w1"], ids["sched"]} | {ids[f"i{i}"] for i in range(5)}
+    assert body["truncations"] == [{"node": None, "edge": None, "reason": "max_depth"}]
+    body = client.post(f"/api/projects/{pid}/traverse", json={"start": [ids["w1"]], "max_depth": 3}).json()
+    assert not body["truncated"] and len(body["nodes"]) == 10
+
+    deep = [{"edge": "item", "then": [{"edge": "parent", "then": [{"edge": "parent"}]}]}]
+    assert client.post(f"/api/projects/{pid}/traverse", json={"start": [ids["i0"]], "steps": deep, "max_depth": 2}).status_code == 422
+    assert client.post(f"/api/projects/{pid}/traverse", json={"start": [ids["i0"]], "steps": [{"edge": "nope"}]}).status_code == 422
+    assert client.post(f"/api/projects/{pid}/traverse", json={"start": ["missing"]}).status_code == 404
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Verify a project's entity, concept and link stores.
+
+Normal loads trust the data on disk and skip Pydantic validation. This script
+runs the full validation for every record and lists anything the loader would
+skip or could not read: invalid or unknown records, corrupt or torn log lines,
+and ids that appear in more than one store. Nothing is modified.
+
+Usage:
+    python verify_project.py <project_id>
+"""
+
+import sys
+import os
+
+# Add app directory to path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+from app.verify import verify_project
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python verify_project.py <project_id>")
+        print("\nExample:")
+        print("  python verify_project.py 0148e57bf39b4c2ca2cd0d629168a4a0")
+        sys.exit(1)
+
+    report = verify_project(sys.argv[1])
+    counts = ", ".join(f"{n} {store}" for store, n in report['records'].items())
+    print(f"[Verify] {report['project_id']}: {counts}")
+    for p in report['problems']:
+        where = f"{p['store']}/{p['id']}" if p['id'] else p['store']
+        print(f"  - {where}: {p['reason']}")
+    if report['problems']:
+        print(f"❌ {len(report['problems'])} problem(s) found")
+        sys.exit(1)
+    print("✅ All records valid")
@@ -0,0 +1,26 @@
+// API client for the per-project change feed (delta sync)
+
+import type { Entity } from './entities';
+import type { Concept } from './concepts';
+import type { Relationship } from './links';
+
+export type StoreName = 'entities' | 'concepts' | 'links';
+
+export interface ChangeSet {
+  revision: number;
+  // True when the server cannot answer for `since`; reload the stores in full.
+  reset: boolean;
+  upserts: { entities?: Entity[]; concepts?: Concept[]; links?: Relationship[] };
+  deletes: { entities?: string[]; concepts?: string[]; links?: string[] };
+}
+
+// Without `since` only the current revision is returned (with reset = true).
+export async function fetchChanges(projectId: string, since?: number, stores?: StoreName[]): Promise<ChangeSet> {
+  const q = new URLSearchParams();
+  if (since != null) q.set('since', String(since));
+  for (const s of stores || []) q.append('store', s);
+  const qs = q.toString();
+  const r = await fetch(`/api/projects/${projectId}/changes${qs ? '?' + qs : ''}`);
+  if (!r.ok) throw new Error('Failed to fetch changes');
+  return r.json();
+}
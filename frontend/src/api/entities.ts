@@ -151,8 +151,17 @@ type PatchPayload = Partial<{
     validation?: EntityValidation;
 }>;
 
-export async function fetchEntities(projectId: string): Promise<Entity[]> {
-    const r = await fetch(`/api/projects/${projectId}/entities`);
+// Optional filters: sheet numbers (1-based), entity types, and a PDF-space viewport [x1, y1, x2, y2]
+// (boxless items such as legend/schedule items are excluded when a viewport is given).
+export type EntityQuery = { sheet?: number | number[]; entity_type?: EntityType | EntityType[]; bbox?: [number, number, number, number] };
+
+export async function fetchEntities(projectId: string, params?: EntityQuery): Promise<Entity[]> {
+    const q = new URLSearchParams();
+    for (const s of Array.isArray(params?.sheet) ? params!.sheet : params?.sheet != null ? [params.sheet] : []) q.append('sheet', String(s));
+    for (const t of Array.isArray(params?.entity_type) ? params!.entity_type : params?.entity_type ? [params.entity_type] : []) q.append('entity_type', t);
+    if (params?.bbox) q.set('bbox', params.bbox.join(','));
+    const qs = q.toString();
+    const r = await fetch(`/api/projects/${projectId}/entities${qs ? '?' + qs : ''}`);
     if (!r.ok) throw new Error('Failed to fetch entities');
     return r.json();
 }
@@ -193,3 +202,30 @@ export async function deleteEntity(projectId: string, id: string): Promise<void>
         throw new Error(msg);
     }
 }
+
+// Batch operations: ids and *_id fields may be "$<ref>" to point at an entity
+// created earlier in the same batch. All-or-nothing on the server.
+export type EntityBatchOperation =
+    | { op: 'create'; ref?: string; data: CreateEntityInput | Record<string, unknown> }
+    | { op: 'update'; id: string; data: PatchPayload | Record<string, unknown> }
+    | { op: 'delete'; id: string };
+
+// Derived links (instantiated_in_id, defined_in_id) the server re-resolved on other
+// entities because a drawing, legend or schedule moved or was deleted.
+export type RecomputedField = { id: string; field: 'instantiated_in_id' | 'defined_in_id'; before: string | null; after: string | null };
+export type EntityBatchResult = { op: EntityBatchOperation['op']; id: string; ref?: string | null; entity: Entity | null; recomputed?: RecomputedField[] };
+
+export async function batchEntities(projectId: string, operations: EntityBatchOperation[]): Promise<EntityBatchResult[]> {
+    const r = await fetch(`/api/projects/${projectId}/entities:batch`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ operations })
+    });
+    if (!r.ok) {
+        let msg = 'Failed to apply entity batch';
+        try { const j = await r.json(); msg = j.detail || msg; } catch { }
+        throw new Error(msg);
+    }
+    const j = await r.json();
+    return j.results;
+}
@@ -0,0 +1,28 @@
+// API client for server-side undo/redo (every change is recorded by the backend)
+
+import type { StoreName } from './changes';
+
+export interface HistoryDepth { undo: number; redo: number; }
+
+export interface HistoryStep extends HistoryDepth {
+  revision: number;
+  // Records restored or removed by the step; fetch these stores to catch up.
+  changes: { store: StoreName; id: string; op: 'upsert' | 'delete' }[];
+}
+
+export async function fetchHistory(projectId: string): Promise<HistoryDepth> {
+  const r = await fetch(`/api/projects/${projectId}/history`);
+  if (!r.ok) throw new Error('Failed to fetch history');
+  return r.json();
+}
+
+// Reverts (undo) or re-applies (redo) one whole change, cascades included, in one atomic write.
+export async function stepHistory(projectId: string, op: 'undo' | 'redo'): Promise<HistoryStep> {
+  const r = await fetch(`/api/projects/${projectId}/${op}`, { method: 'POST' });
+  if (!r.ok) {
+    let msg = op === 'undo' ? 'Undo failed' : 'Redo failed';
+    try { const j = await r.json(); msg = j.detail || msg; } catch {}
+    throw new Error(msg);
+  }
+  return r.json();
+}
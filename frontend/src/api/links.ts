@@ -12,11 +12,15 @@ export interface Relationship {
 
 export interface CreateRelationshipInput { rel_type: RelationshipType; source_id: string; target_id: string; }
 
-export async function fetchLinks(projectId: string, params?: { source_id?: string; target_id?: string; rel_type?: RelationshipType }): Promise<Relationship[]> {
+// Each filter accepts one value or several (any-of), e.g. evidence for a whole selection in one call.
+export async function fetchLinks(projectId: string, params?: { source_id?: string | string[]; target_id?: string | string[]; rel_type?: RelationshipType | RelationshipType[] }): Promise<Relationship[]> {
   const q = new URLSearchParams();
-  if (params?.source_id) q.set('source_id', params.source_id);
-  if (params?.target_id) q.set('target_id', params.target_id);
-  if (params?.rel_type) q.set('rel_type', params.rel_type);
+  const add = (key: string, v?: string | string[]) => {
+    for (const item of Array.isArray(v) ? v : v ? [v] : []) q.append(key, item);
+  };
+  add('source_id', params?.source_id);
+  add('target_id', params?.target_id);
+  add('rel_type', params?.rel_type);
   const qs = q.toString();
   const r = await fetch(`/api/projects/${projectId}/links${qs ? '?' + qs : ''}`);
   if (!r.ok) throw new Error('Failed to fetch links');
@@ -45,3 +49,17 @@ export async function deleteLink(projectId: string, id: string): Promise<void> {
 }
 
 
+
+// Many creates/deletes in one request; the server applies deletes first and rejects the whole batch on any error.
+export async function batchLinks(projectId: string, ops: { create?: CreateRelationshipInput[]; delete?: string[] }): Promise<{ created: Relationship[]; deleted: string[] }> {
+  const r = await fetch(`/api/projects/${projectId}/links:batch`, {
+    method: 'POST', headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ create: ops.create || [], delete: ops.delete || [] })
+  });
+  if (!r.ok) {
+    let msg = 'Failed to update links';
+    try { const j = await r.json(); msg = j.detail || msg; } catch {}
+    throw new Error(msg);
+  }
+  return r.json();
+}
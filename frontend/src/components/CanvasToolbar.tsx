@@ -2,11 +2,12 @@ import React from 'react';
 import { useProjectStore } from '../state/store';
 
 export const CanvasToolbar: React.FC = () => {
-    const { layers, setLayer, undo, redo, creatingEntity, cancelEntityCreation } = useProjectStore((s: any) => ({ 
+    const { layers, setLayer, undo, redo, historyDepth, creatingEntity, cancelEntityCreation } = useProjectStore((s: any) => ({ 
         layers: s.layers, 
         setLayer: s.setLayer, 
         undo: s.undo, 
         redo: s.redo,
+        historyDepth: s.historyDepth,
         creatingEntity: s.creatingEntity,
         cancelEntityCreation: s.cancelEntityCreation,
     }));
@@ -44,8 +45,8 @@ export const CanvasToolbar: React.FC = () => {
     return (
         <>
             <div className="canvas-toolbar" style={{ position: 'absolute', top: 12, left: 12, zIndex: 15, background: 'rgba(32,37,43,0.9)', color: '#fff', padding: 8, borderRadius: 8, display: 'flex', gap: 6, alignItems: 'center' }}>
-                <button onClick={() => undo()} title="Undo (⌘/Ctrl+Z)" style={{ background: '#f5f7fa', color: '#111', border: '1px solid #e1e6eb', borderRadius: 6, padding: '4px 6px', cursor: 'pointer' }}>Undo</button>
-                <button onClick={() => redo()} title="Redo (⇧⌘/Ctrl+Y|Z)" style={{ background: '#f5f7fa', color: '#111', border: '1px solid #e1e6eb', borderRadius: 6, padding: '4px 6px', cursor: 'pointer' }}>Redo</button>
+                <button onClick={() => undo()} disabled={!historyDepth.undo} title="Undo (⌘/Ctrl+Z)" style={{ background: '#f5f7fa', color: '#111', border: '1px solid #e1e6eb', borderRadius: 6, padding: '4px 6px', cursor: historyDepth.undo ? 'pointer' : 'default', opacity: historyDepth.undo ? 1 : 0.5 }}>Undo</button>
+                <button onClick={() => redo()} disabled={!historyDepth.redo} title="Redo (⇧⌘/Ctrl+Y|Z)" style={{ background: '#f5f7fa', color: '#111', border: '1px solid #e1e6eb', borderRadius: 6, padding: '4px 6px', cursor: historyDepth.redo ? 'pointer' : 'default', opacity: historyDepth.redo ? 1 : 0.5 }}>Redo</button>
                 <Toggle label="OCR" checked={layers.ocr} onChange={(v) => setLayer('ocr', v)} />
                 <Toggle label="Drawings" checked={layers.drawings} onChange={(v) => setLayer('drawings', v)} />
                 <Toggle label="Legends" checked={layers.legends} onChange={(v) => setLayer('legends', v)} />
@@ -5,123 +5,103 @@ import { useProjectStore } from '../../state/store';
 type Ent = any;
 type Lnk = any;
 
-describe('history undo/redo core flows', () => {
+// The server owns undo/redo: each POST /undo or /redo swaps the backend state for a
+// recorded one, and the client only has to resync the stores the step touched.
+describe('server-side undo/redo', () => {
   const projectId = 'proj_test';
-  let backend: { entities: Ent[]; links: Lnk[]; entCounter: number; linkCounter: number };
+  let backend: { entities: Ent[]; links: Lnk[]; calls: string[]; revision: number; steps: { entities: Ent[]; links: Lnk[] }[]; undone: { entities: Ent[]; links: Lnk[] }[] };
 
   beforeEach(() => {
-    backend = { entities: [], links: [], entCounter: 0, linkCounter: 0 };
-    // reset store
+    backend = { entities: [], links: [], calls: [], revision: 0, steps: [], undone: [] };
     useProjectStore.setState({
       projectId,
       entities: [],
       links: [],
-      historyPast: [],
-      historyFuture: [],
-      historyIdMap: {},
+      toasts: [],
+      historyDepth: { undo: 0, redo: 0 },
+      historyRevision: null,
+      revisions: {},
     } as any);
 
-    // basic fetch mock with in-memory backend
+    const json = (body: any, status = 200) => new Response(JSON.stringify(body), { status, headers: { 'Content-Type': 'application/json' } });
     global.fetch = vi.fn(async (input: RequestInfo | URL, init?: RequestInit) => {
       const url = String(input);
       const method = (init?.method || 'GET').toUpperCase();
-      const json = async () => (init?.body ? JSON.parse(String(init.body)) : undefined);
-
-      const entRe = /\/api\/projects\/.+\/entities(?:\/(.+))?$/;
-      const linkRe = /\/api\/projects\/.+\/links(?:\/(.+))?$/;
-
-      if (url.includes('/entities')) {
-        const m = url.match(entRe);
-        const id = m?.[1];
-        if (method === 'GET') {
-          return new Response(JSON.stringify(backend.entities), { status: 200, headers: { 'Content-Type': 'application/json' } });
-        }
-        if (method === 'POST') {
-          const body = await json();
-          const created = { id: 'ent_' + (++backend.entCounter), ...normalizeEntity(body) };
-          backend.entities.push(created);
-          return new Response(JSON.stringify(created), { status: 201, headers: { 'Content-Type': 'application/json' } });
-        }
-        if (method === 'PATCH' && id) {
-          const body = await json();
-          const idx = backend.entities.findIndex(e => e.id === id);
-          if (idx === -1) return new Response(JSON.stringify({ detail: 'Not found' }), { status: 404 });
-          backend.entities[idx] = { ...backend.entities[idx], ...body, bounding_box: body?.bounding_box ?? backend.entities[idx].bounding_box };
-          return new Response(JSON.stringify(backend.entities[idx]), { status: 200, headers: { 'Content-Type': 'application/json' } });
-        }
-        if (method === 'DELETE' && id) {
-          const before = backend.entities.length;
-          backend.entities = backend.entities.filter(e => e.id !== id);
-          if (backend.entities.length === before) return new Response(JSON.stringify({ detail: 'Not found' }), { status: 404 });
-          return new Response(JSON.stringify({ deleted: true }), { status: 200, headers: { 'Content-Type': 'application/json' } });
-        }
-      }
-      if (url.includes('/links')) {
-        const m = url.match(linkRe);
-        const id = m?.[1];
-        if (method === 'GET') {
-          return new Response(JSON.stringify(backend.links), { status: 200, headers: { 'Content-Type': 'application/json' } });
-        }
-        if (method === 'POST') {
-          const body = await json();
-          const created = { id: 'lnk_' + (++backend.linkCounter), ...body };
-          backend.links.push(created);
-          return new Response(JSON.stringify(created), { status: 201, headers: { 'Content-Type': 'application/json' } });
-        }
-        if (method === 'DELETE' && id) {
-          const before = backend.links.length;
-          backend.links = backend.links.filter(l => l.id !== id);
-          if (backend.links.length === before) return new Response(JSON.stringify({ detail: 'Not found' }), { status: 404 });
-          return new Response(JSON.stringify({ deleted: true }), { status: 200, headers: { 'Content-Type': 'application/json' } });
-        }
-      }
-      // OCR/status/pages endpoints (minimal stubs)
-      if (url.includes('/status')) {
-        return new Response(JSON.stringify({ status: 'complete', total_pages: 1, stages: {} }), { status: 200, headers: { 'Content-Type': 'application/json' } });
-      }
-      if (url.includes('/ocr/')) {
-        return new Response(JSON.stringify({ width_pts: 612, height_pts: 792, blocks: [] }), { status: 200, headers: { 'Content-Type': 'application/json' } });
+      backend.calls.push(`${method} ${url.replace(/^.*\/api\/projects\/[^/]+/, '')}`);
+      if (method === 'POST' && /\/(undo|redo)$/.test(url)) {
+        const undo = url.endsWith('/undo');
+        const from = undo ? backend.steps : backend.undone;
+        const to = undo ? backend.undone : backend.steps;
+        const prev = from.pop();
+        if (!prev) return json({ detail: `Nothing to ${undo ? 'undo' : 'redo'}` }, 409);
+        to.push({ entities: backend.entities, links: backend.links });
+        const touched = [...(prev.entities !== backend.entities ? ['entities'] : []), ...(prev.links !== backend.links ? ['links'] : [])];
+        backend.entities = prev.entities; backend.links = prev.links;
+        backend.revision++;
+        return json({
+          revision: backend.revision,
+          changes: touched.map(store => ({ store, id: 'x', op: 'upsert' })),
+          undo: backend.steps.length,
+          redo: backend.undone.length,
+        });
       }
-      if (url.endsWith('.png') || url.endsWith('.pdf')) {
-        return new Response(new Blob(), { status: 200 });
-      }
-      return new Response(JSON.stringify({ ok: true }), { status: 200, headers: { 'Content-Type': 'application/json' } });
+      if (url.endsWith('/history')) return json({ undo: backend.steps.length, redo: backend.undone.length });
+      if (url.includes('/changes')) return json({ revision: backend.revision, reset: true, upserts: {}, deletes: {} });
+      if (url.includes('/entities')) return json(backend.entities);
+      if (url.includes('/links')) return json(backend.links);
+      return json({ ok: true });
     }) as any;
   });
 
-  it('undo/redo edit_entity (bbox) applies before/after to correct id', async () => {
-    // seed entity
-    backend.entities.push(entity('e1'));
-    useProjectStore.setState({ entities: backend.entities.slice() } as any);
-    // Simulate that an edit was undone previously -> entry sits in future for redo
-    useProjectStore.setState(s => ({ historyFuture: [{ type: 'edit_entity', id: 'e1', before: { bounding_box: [0, 0, 10, 10] }, after: { bounding_box: [10, 10, 20, 20] } }], historyPast: (s as any).historyPast } as any));
-    await useProjectStore.getState().redo(); // apply after
-    expect(backend.entities.find(e => e.id === 'e1')!.bounding_box).toEqual([10, 10, 20, 20]);
+  function record(next: { entities?: Ent[]; links?: Lnk[] }) {
+    backend.steps.push({ entities: backend.entities, links: backend.links });
+    backend.undone = [];
+    if (next.entities) backend.entities = next.entities;
+    if (next.links) backend.links = next.links;
+    backend.revision++;
+  }
+
+  it('undo restores the deleted entity and its cascaded links with their ids', async () => {
+    const e1 = entity('e1');
+    const link = { id: 'l1', rel_type: 'JUSTIFIED_BY', source_id: 'scope_1', target_id: 'e1' };
+    backend.entities = [e1]; backend.links = [link];
+    record({ entities: [], links: [] }); // delete e1, links cascade
+
     await useProjectStore.getState().undo();
-    expect(backend.entities.find(e => e.id === 'e1')!.bounding_box).toEqual([0, 0, 10, 10]);
+    const st: any = useProjectStore.getState();
+    expect(st.entities.map((e: any) => e.id)).toEqual(['e1']);
+    expect(st.links).toEqual([link]);
+    expect(st.historyDepth).toEqual({ undo: 0, redo: 1 });
+    // One request to the server for the whole step, then store resyncs
+    expect(backend.calls.filter(c => c.startsWith('POST'))).toEqual(['POST /undo']);
+
+    await useProjectStore.getState().redo();
+    expect((useProjectStore.getState() as any).entities).toEqual([]);
+    expect((useProjectStore.getState() as any).links).toEqual([]);
   });
 
-  it('undo/redo delete_entity recreates from payload and deletes by current id', async () => {
-    // Simulate an entity that was deleted previously (no entity currently present)
-    const payload = entity('e2');
-    useProjectStore.setState(s => ({ historyPast: [...(s as any).historyPast, { type: 'delete_entity', entity: payload }] } as any));
-    await useProjectStore.getState().undo(); // recreate from payload
-    expect(backend.entities.length).toBe(1);
-    await useProjectStore.getState().redo(); // delete recreated entity
-    expect(backend.entities.length).toBe(0);
+  it('only refetches the stores the step touched', async () => {
+    backend.entities = [entity('e1')];
+    record({ entities: [{ ...entity('e1'), title: 'Renamed' }] });
+    await useProjectStore.getState().undo();
+    expect(backend.calls.some(c => c.startsWith('GET /links'))).toBe(false);
+    expect((useProjectStore.getState() as any).entities[0].title).toBe('D');
   });
 
-  it('undo/redo create_links/delete_links toggles links without duplicates', async () => {
-    const scopeId = 'scope_1'; const evId = 'e3'; backend.entities.push(entity(evId));
-    // Start with no links; simulate that a delete occurred (historyPast has delete_links)
-    const link = { rel_type: 'JUSTIFIED_BY', source_id: scopeId, target_id: evId } as any;
-    useProjectStore.setState(s => ({ historyPast: [...(s as any).historyPast, { type: 'delete_links', links: [link] } ] } as any));
-    await useProjectStore.getState().undo(); // recreate link
-    // Sync store.links to backend so redo can resolve ids when deleting
+  it('keeps the depth current after ordinary edits, fetching it once per revision', async () => {
+    await useProjectStore.getState().fetchEntities();
+    expect((useProjectStore.getState() as any).historyDepth).toEqual({ undo: 0, redo: 0 });
+    record({ entities: [entity('e1')] });
+    await useProjectStore.getState().fetchEntities();
     await useProjectStore.getState().fetchLinks();
-    expect(backend.links.length).toBe(1);
-    await useProjectStore.getState().redo(); // delete created link
-    expect(backend.links.length).toBe(0);
+    expect((useProjectStore.getState() as any).historyDepth).toEqual({ undo: 1, redo: 0 });
+    expect(backend.calls.filter(c => c === 'GET /history')).toHaveLength(2);
+  });
+
+  it('reports an empty history as an error toast', async () => {
+    await useProjectStore.getState().undo();
+    const toasts = (useProjectStore.getState() as any).toasts;
+    expect(toasts.at(-1)).toMatchObject({ kind: 'error', message: 'Nothing to undo' });
   });
 });
 
@@ -134,23 +114,3 @@ function entity(id: string): Ent {
     title: 'D',
   };
 }
-
-function normalizeEntity(body: any) {
-  const raw = body?.bounding_box;
-  let bbObj: any;
-  if (Array.isArray(raw)) {
-    const [x1 = 0, y1 = 0, x2 = 10, y2 = 10] = raw as number[];
-    bbObj = { x1, y1, x2, y2 };
-  } else if (raw && typeof raw === 'object') {
-    const x1 = Number.isFinite(raw.x1) ? raw.x1 : 0;
-    const y1 = Number.isFinite(raw.y1) ? raw.y1 : 0;
-    const x2 = Number.isFinite(raw.x2) ? raw.x2 : 10;
-    const y2 = Number.isFinite(raw.y2) ? raw.y2 : 10;
-    bbObj = { x1, y1, x2, y2 };
-  } else {
-    bbObj = { x1: 0, y1: 0, x2: 10, y2: 10 };
-  }
-  return { ...body, bounding_box: bbObj };
-}
-
-
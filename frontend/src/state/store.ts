@@ -4,8 +4,12 @@ import { canvasToPdf } from '../utils/coords';
 import type { Concept } from '../api/concepts';
 import { fetchConcepts as apiFetchConcepts, createConcept as apiCreateConcept, patchConcept as apiPatchConcept, deleteConcept as apiDeleteConcept } from '../api/concepts';
 import type { Relationship, RelationshipType } from '../api/links';
-import { fetchLinks as apiFetchLinks, createLink as apiCreateLink, deleteLink as apiDeleteLink } from '../api/links';
+import { fetchLinks as apiFetchLinks, deleteLink as apiDeleteLink, batchLinks as apiBatchLinks } from '../api/links';
 import type { EntityType } from '../api/entities';
+import type { StoreName } from '../api/changes';
+import { fetchChanges as apiFetchChanges } from '../api/changes';
+import type { HistoryDepth } from '../api/history';
+import { fetchHistory as apiFetchHistory, stepHistory as apiStepHistory } from '../api/history';
 import { deriveEntityFlags } from './entity_flags';
 
 // Page raster meta at 300 DPI baseline
@@ -77,6 +81,10 @@ interface AppState {
     entities: any[]; // typed later via api/entities
     entitiesStatus: 'idle' | 'loading' | 'error';
     fetchEntities: () => Promise<void>;
+    // Change-feed revision each store reflects; null/undefined until the first full load
+    revisions: Partial<Record<StoreName, number | null>>;
+    // Apply server changes since the store's revision; false means a full reload is needed
+    syncStore: (store: StoreName) => Promise<boolean>;
     // UI density
     uiDensity: 'comfortable' | 'compact';
     setUiDensity: (d: 'comfortable' | 'compact') => void;
@@ -154,13 +162,14 @@ interface AppState {
     toasts: { id: string; kind: 'info' | 'error' | 'success'; message: string; createdAt: number; timeoutMs?: number; }[];
     addToast: (t: { kind?: 'info' | 'error' | 'success'; message: string; timeoutMs?: number; }) => void;
     dismissToast: (id: string) => void;
-    // --- Simple history (undo/redo) for core actions ---
-    historyPast: any[];
-    historyFuture: any[];
-    pushHistory: (entry: any) => void;
+    // --- Undo/redo: recorded and applied by the server (backend/app/history.py) ---
+    historyDepth: HistoryDepth;
+    // Change-feed revision historyDepth was fetched at; every recorded change moves it
+    historyRevision: number | null;
+    refreshHistory: (revision: number | null) => Promise<void>;
+    stepHistory: (op: 'undo' | 'redo') => Promise<void>;
     undo: () => Promise<void>;
     redo: () => Promise<void>;
-    historyIdMap: Record<string, string>; // originalId -> currentId mapping for recreated entities
     // Persisted Notes from OCR selection
     promoteSelectionToNotePersist: (pageIndex: number) => Promise<void>;
     // Scope creation mode
@@ -227,6 +236,7 @@ export const useProjectStore = createWithEqualityFn<AppState>((set, get): AppSta
     scrollTarget: null,
     entities: [],
     entitiesStatus: 'idle',
+    revisions: {},
     concepts: [],
     conceptsStatus: 'idle',
     links: [],
@@ -247,7 +257,7 @@ export const useProjectStore = createWithEqualityFn<AppState>((set, get): AppSta
                 .then(r => { if (!r.ok) throw new Error('Upload failed'); return r.json(); });
             await get().loadPdf(file); // local preview
             const resp = await uploadPromise;
-            set({ projectId: resp.project_id, manifestStatus: 'polling' });
+            set({ projectId: resp.project_id, manifestStatus: 'polling', revisions: {}, historyDepth: { undo: 0, redo: 0 }, historyRevision: null });
             try { localStorage.setItem('lastProjectId', resp.project_id); } catch {}
             try { if (typeof window !== 'undefined') window.location.hash = `#p=${resp.project_id}`; } catch {}
             get().pollManifest();
@@ -259,7 +269,7 @@ export const useProjectStore = createWithEqualityFn<AppState>((set, get): AppSta
     },
     initProjectById: async (projectId: string) => {
         if (!projectId) return;
-        set({ projectId, manifestStatus: 'polling' });
+        set({ projectId, manifestStatus: 'polling', revisions: {}, historyDepth: { undo: 0, redo: 0 }, historyRevision: null });
         try { localStorage.setItem('lastProjectId', projectId); } catch {}
         // Try to load original PDF from backend so pdf.js can compute pages/fit scales
         try {
@@ -588,9 +598,41 @@ export const useProjectStore = createWithEqualityFn<AppState>((set, get): AppSta
         const combined = blockIds.map(i => blocks[i]?.text || '').filter(Boolean).join(' ').replace(/\s+/g, ' ').trim();
         if (combined) setPageTitle(pageIndex, combined, blockIds);
     },
+    syncStore: async (store) => {
+        const { projectId } = get();
+        if (!projectId) return false;
+        const since = get().revisions[store];
+        let cs;
+        try {
+            cs = await apiFetchChanges(projectId, since ?? undefined, [store]);
+        } catch (e) {
+            console.error(e);
+            set(state => ({ revisions: { ...state.revisions, [store]: null } }));
+            return false;
+        }
+        // Taken before any full reload, so a change racing the reload is simply re-applied next time
+        set(state => ({ revisions: { ...state.revisions, [store]: cs.revision } }));
+        // Every mutation ends in a sync, so this keeps the undo/redo depth current
+        if (cs.revision !== get().historyRevision) await get().refreshHistory(cs.revision);
+        if (since == null || cs.reset) return false;
+        const deleted = new Set<string>(cs.deletes[store] || []);
+        const upserts: any[] = cs.upserts[store] || [];
+        if (!deleted.size && !upserts.length) return true;
+        const byId = new Map<string, any>(upserts.map((x: any) => [x.id, x]));
+        const current: any[] = (get() as any)[store] || [];
+        const merged = current.filter(x => !deleted.has(x.id)).map(x => {
+            const next = byId.get(x.id);
+            if (next) byId.delete(x.id);
+            return next || x;
+        });
+        for (const x of byId.values()) merged.push(x);
+        set({ [store]: merged } as any);
+        return true;
+    },
     fetchEntities: async () => {
-        const { projectId, addToast } = get();
+        const { projectId, addToast, syncStore } = get();
         if (!projectId) return;
+        if (await syncStore('entities')) return;
         set({ entitiesStatus: 'loading' });
         try {
             const r = await fetch(`/api/projects/${projectId}/entities`);
@@ -599,21 +641,22 @@ export const useProjectStore = createWithEqualityFn<AppState>((set, get): AppSta
             set({ entities: data, entitiesStatus: 'idle' });
         } catch (e) {
             console.error(e);
-            set({ entitiesStatus: 'error' });
+            set(state => ({ entitiesStatus: 'error', revisions: { ...state.revisions, entities: null } }));
             addToast({ kind: 'error', message: 'Failed to load entities' });
         }
     },
     setUiDensity: (d) => set(() => { try { localStorage.setItem('ui:density', d); } catch {} return { uiDensity: d } as any; }),
     fetchConcepts: async () => {
-        const { projectId, addToast } = get();
+        const { projectId, addToast, syncStore } = get();
         if (!projectId) return;
+        if (await syncStore('concepts')) return;
         set({ conceptsStatus: 'loading' });
         try {
             const data = await apiFetchConcepts(projectId);
             set({ concepts: data, conceptsStatus: 'idle' });
         } catch (e) {
             console.error(e);
-            set({ conceptsStatus: 'error' });
+            set(state => ({ conceptsStatus: 'error', revisions: { ...state.revisions, concepts: null } }));
             addToast({ kind: 'error', message: 'Failed to load concepts' });
         }
     },
@@ -654,27 +697,28 @@ export const useProjectStore = createWithEqualityFn<AppState>((set, get): AppSta
         }
     },
     fetchLinks: async (filters) => {
-        const { projectId, addToast } = get();
+        const { projectId, addToast, syncStore } = get();
         if (!projectId) return;
+        const filtered = !!(filters && Object.values(filters).some(v => v));
+        if (!filtered && await syncStore('links')) return;
         set({ linksStatus: 'loading' });
         try {
             const data = await apiFetchLinks(projectId, filters as any);
-            set({ links: data, linksStatus: 'idle' });
+            // A filtered list is not a full mirror of the store, so it cannot be delta-synced
+            set(state => ({ links: data, linksStatus: 'idle', ...(filtered ? { revisions: { ...state.revisions, links: null } } : {}) }));
         } catch (e) {
             console.error(e);
-            set({ linksStatus: 'error' });
+            set(state => ({ linksStatus: 'error', revisions: { ...state.revisions, links: null } }));
             addToast({ kind: 'error', message: 'Failed to load links' });
         }
     },
     deleteLinkById: async (id) => {
-        const { projectId, addToast, fetchLinks, pushHistory } = get() as any;
+        const { projectId, addToast, fetchLinks } = get() as any;
         if (!projectId) return;
         try {
-            const linkObj = (get() as any).links.find((l: any) => l.id === id);
             await apiDeleteLink(projectId, id);
             await fetchLinks();
             addToast({ kind: 'success', message: 'Link deleted' });
-            if (linkObj) try { pushHistory({ type: 'delete_links', links: [linkObj] }); } catch {}
         } catch (e: any) {
             console.error(e);
             addToast({ kind: 'error', message: e?.message || 'Failed to delete link' });
@@ -703,7 +747,7 @@ export const useProjectStore = createWithEqualityFn<AppState>((set, get): AppSta
         return { linking: { ...linking, selectedTargetIds: Array.from(setIds) } } as Partial<AppState> as any;
     }),
     finishLinking: async () => {
-        const { projectId, linking, addToast, fetchLinks, entities, concepts, pushHistory } = get() as any;
+        const { projectId, linking, addToast, fetchLinks, entities, concepts } = get() as any;
         if (!projectId || !linking) return;
         if (!linking.selectedTargetIds.length) { addToast({ kind: 'error', message: 'No targets selected' }); return; }
         // Helper: find kind of an id from entities/concepts
@@ -739,16 +783,10 @@ export const useProjectStore = createWithEqualityFn<AppState>((set, get): AppSta
             }
         }
         try {
-            const before = new Set(((get() as any).links || []).map((l: any) => l.id));
-            for (const p of payloads) {
-                await apiCreateLink(projectId, p as any);
-            }
+            await apiBatchLinks(projectId, { create: payloads });
             await fetchLinks();
-            const after = (get() as any).links || [];
-            const created = after.filter((l: any) => !before.has(l.id));
             set({ linking: null });
             addToast({ kind: 'success', message: 'Links created' });
-            try { pushHistory({ type: 'create_links', links: created }); } catch {}
         } catch (e: any) {
             console.error(e);
             addToast({ kind: 'error', message: e?.message || 'Failed to create links' });
@@ -775,7 +813,7 @@ export const useProjectStore = createWithEqualityFn<AppState>((set, get): AppSta
     
     cancelEntityCreation: () => set({ creatingEntity: null }),
     finalizeEntityCreation: async (x1, y1, x2, y2) => {
-        const { creatingEntity, projectId, currentPageIndex, addToast, fetchEntities, setSelectedEntityId, fetchPageOcr, pushHistory } = get() as any;
+        const { creatingEntity, projectId, currentPageIndex, addToast, fetchEntities, setSelectedEntityId, fetchPageOcr } = get() as any;
         if (!creatingEntity || !projectId) return;
         const sheetNumber = currentPageIndex + 1; // 1-based
         try {
@@ -838,7 +876,6 @@ export const useProjectStore = createWithEqualityFn<AppState>((set, get): AppSta
             await fetchEntities();
             setSelectedEntityId(created?.id || null);
             addToast({ kind: 'success', message: `${creatingEntity.type} created` });
-            try { pushHistory({ type: 'create_entity', entity: created }); } catch {}
         } catch (e: any) {
             console.error(e);
             addToast({ kind: 'error', message: e.message || 'Create failed' });
@@ -865,7 +902,7 @@ export const useProjectStore = createWithEqualityFn<AppState>((set, get): AppSta
         }, 100);
     },
     updateEntityBBox: async (id, bbox) => {
-        const { projectId, addToast, fetchEntities, fetchPageOcr, pushHistory } = get() as any;
+        const { projectId, addToast, fetchEntities, fetchPageOcr } = get() as any;
         if (!projectId) return;
         try {
             // Convert canvas -> PDF using current page meta
@@ -881,43 +918,33 @@ export const useProjectStore = createWithEqualityFn<AppState>((set, get): AppSta
                 rasterHeightPx: pageMeta.nativeHeight,
                 rotation: 0 as 0,
             };
-            const beforeEnt = (get() as any).entities.find((e: any) => e.id === id);
-            const beforeBox = beforeEnt ? [beforeEnt.bounding_box.x1, beforeEnt.bounding_box.y1, beforeEnt.bounding_box.x2, beforeEnt.bounding_box.y2] : null;
             const [px1, py1, px2, py2] = canvasToPdf(bbox as any, renderMeta as any);
             const afterBox = [px1, py1, px2, py2];
             await fetch(`/api/projects/${projectId}/entities/${id}`, { method: 'PATCH', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ bounding_box: afterBox }) });
             await fetchEntities();
-            try { if (beforeBox) pushHistory({ type: 'edit_entity', id, before: { bounding_box: beforeBox }, after: { bounding_box: afterBox } }); } catch {}
         } catch (e: any) {
             console.error(e); addToast({ kind: 'error', message: e.message || 'Update failed' });
         }
     },
     updateEntityMeta: async (id, data) => {
-        const { projectId, addToast, fetchEntities, pushHistory } = get() as any;
+        const { projectId, addToast, fetchEntities } = get() as any;
         if (!projectId) return;
         try {
-            const beforeEnt = (get() as any).entities.find((e: any) => e.id === id) || {};
-            const keys = Object.keys(data || {});
-            const before: any = {};
-            keys.forEach(k => { if (k in beforeEnt) before[k] = (beforeEnt as any)[k]; });
             await fetch(`/api/projects/${projectId}/entities/${id}`, { method: 'PATCH', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(data) });
             await fetchEntities();
             addToast({ kind: 'success', message: 'Updated' });
-            try { pushHistory({ type: 'edit_entity', id, before, after: data }); } catch {}
         } catch (e: any) {
             console.error(e); addToast({ kind: 'error', message: e.message || 'Update failed' });
         }
     },
     deleteEntity: async (id) => {
-        const { projectId, addToast, fetchEntities, selectedEntityId, setSelectedEntityId, pushHistory } = get() as any;
+        const { projectId, addToast, fetchEntities, selectedEntityId, setSelectedEntityId } = get() as any;
         if (!projectId) return;
         try {
-            const ent = (get() as any).entities.find((e: any) => e.id === id);
             await fetch(`/api/projects/${projectId}/entities/${id}`, { method: 'DELETE' });
             if (selectedEntityId === id) setSelectedEntityId(null);
             await fetchEntities();
             addToast({ kind: 'success', message: 'Entity deleted' });
-            if (ent) try { pushHistory({ type: 'delete_entity', entity: ent }); } catch {}
         } catch (e: any) {
             console.error(e); addToast({ kind: 'error', message: e.message || 'Delete failed' });
         }
@@ -999,11 +1026,21 @@ export const useProjectStore = createWithEqualityFn<AppState>((set, get): AppSta
         }
     },
     dismissToast: (id: string) => set(state => ({ toasts: state.toasts.filter(t => t.id !== id) })),
-    // --- Simple history (undo/redo) for core actions ---
-    historyPast: [],
-    historyFuture: [],
-    pushHistory: (entry: any) => set(state => ({ historyPast: [...(state as any).historyPast, entry], historyFuture: [] } as any)),
-    historyIdMap: {},
+    // --- Undo/redo: recorded and applied by the server (backend/app/history.py) ---
+    historyDepth: { undo: 0, redo: 0 },
+    historyRevision: null,
+    refreshHistory: async (revision) => {
+        const { projectId } = get();
+        if (!projectId) return;
+        set({ historyRevision: revision });
+        try {
+            const depth = await apiFetchHistory(projectId);
+            if (get().projectId === projectId) set({ historyDepth: { undo: depth.undo, redo: depth.redo } });
+        } catch (e) {
+            console.error(e);
+            set({ historyRevision: null });
+        }
+    },
     scopeCreationMode: {
         active: false,
         type: null,
@@ -1055,131 +1092,24 @@ export const useProjectStore = createWithEqualityFn<AppState>((set, get): AppSta
             addToast({ kind: 'error', message: e?.message || 'Create note failed' });
         }
     },
-    undo: async () => {
-        const st: any = get();
-        const past: any[] = st.historyPast || [];
-        if (!past.length) return;
-        const entry = past[past.length - 1];
-        set({ historyPast: past.slice(0, -1), historyFuture: [entry, ...(st.historyFuture || [])] } as any);
-        const projectId = st.projectId; if (!projectId) return;
-        try {
-            if (entry.type === 'create_entity') {
-                const alias = (get() as any).historyIdMap || {};
-                const id = entry.currentId || alias[entry.entity.id] || entry.entity.id;
-                // If the entity still exists, delete it; else no-op
-                const e = (get() as any).entities.find((x: any) => x.id === id);
-                if (e) await fetch(`/api/projects/${projectId}/entities/${id}`, { method: 'DELETE' });
-                await st.fetchEntities();
-            } else if (entry.type === 'edit_entity') {
-                // Undo edit: apply `before` fields
-                const payload = { ...(entry.before || {}) };
-                const alias = (get() as any).historyIdMap || {};
-                const id = entry.currentId || alias[entry.id] || entry.id;
-                await fetch(`/api/projects/${projectId}/entities/${id}`, { method: 'PATCH', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(payload) });
-                await st.fetchEntities();
-            } else if (entry.type === 'delete_entity') {
-                const e = entry.entity;
-                const payload: any = { entity_type: e.entity_type, source_sheet_number: e.source_sheet_number, bounding_box: [e.bounding_box.x1, e.bounding_box.y1, e.bounding_box.x2, e.bounding_box.y2] };
-                if (['drawing','legend','schedule'].includes(e.entity_type)) payload.title = e.title || null;
-                if (e.entity_type === 'note') payload.text = e.text || null;
-                if (['symbol_definition','component_definition'].includes(e.entity_type)) {
-                    payload.name = e.name || null; payload.description = e.description || null; payload.scope = e.scope || 'sheet'; payload.defined_in_id = e.defined_in_id || null;
-                    if (e.entity_type === 'symbol_definition') payload.visual_pattern_description = e.visual_pattern_description || null;
-                    if (e.entity_type === 'component_definition') payload.specifications = e.specifications || {};
-                }
-                if (e.entity_type === 'symbol_instance') payload.symbol_definition_id = e.symbol_definition_id;
-                if (e.entity_type === 'component_instance') payload.component_definition_id = e.component_definition_id;
-                const resp = await fetch(`/api/projects/${projectId}/entities`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(payload) });
-                const recreated = await resp.json();
-                entry.currentId = recreated?.id;
-                const alias = (get() as any).historyIdMap || {};
-                set({ historyIdMap: { ...alias, [entry.entity.id]: recreated?.id } } as any);
-                await st.fetchEntities();
-            } else if (entry.type === 'create_links') {
-                for (const l of entry.links) {
-                    // If id known delete by id; else try to find by triple
-                    if (l.id) {
-                        await fetch(`/api/projects/${projectId}/links/${l.id}`, { method: 'DELETE' });
-                    } else {
-                        const match = (get() as any).links.find((x: any) => x.rel_type === l.rel_type && x.source_id === l.source_id && x.target_id === l.target_id);
-                        if (match) await fetch(`/api/projects/${projectId}/links/${match.id}`, { method: 'DELETE' });
-                    }
-                }
-                await st.fetchLinks();
-            } else if (entry.type === 'delete_links') {
-                const newIds: any[] = [];
-                for (const l of entry.links) {
-                    const resp = await fetch(`/api/projects/${projectId}/links`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ rel_type: l.rel_type, source_id: l.source_id, target_id: l.target_id }) });
-                    const created = await resp.json();
-                    newIds.push(created?.id);
-                }
-                await st.fetchLinks();
-                // store current ids for redo delete (after links are fetched)
-                entry.links = (get() as any).links.filter((x: any) => newIds.includes(x.id));
-            }
-        } catch (e) { console.error('Undo failed', e); }
-    },
-    redo: async () => {
-        const st: any = get();
-        const future: any[] = st.historyFuture || [];
-        if (!future.length) return;
-        const entry = future[0];
-        set({ historyFuture: future.slice(1), historyPast: [ ...(st.historyPast || []), entry ] } as any);
-        const projectId = st.projectId; if (!projectId) return;
+    stepHistory: async (op) => {
+        const { projectId, addToast, fetchEntities, fetchConcepts, fetchLinks } = get() as any;
+        if (!projectId) return;
         try {
-            if (entry.type === 'create_entity') {
-                const e = entry.entity;
-                const payload: any = { entity_type: e.entity_type, source_sheet_number: e.source_sheet_number, bounding_box: [e.bounding_box.x1, e.bounding_box.y1, e.bounding_box.x2, e.bounding_box.y2] };
-                if (['drawing','legend','schedule'].includes(e.entity_type)) payload.title = e.title || null;
-                if (e.entity_type === 'note') payload.text = e.text || null;
-                if (['symbol_definition','component_definition'].includes(e.entity_type)) {
-                    payload.name = e.name || null; payload.description = e.description || null; payload.scope = e.scope || 'sheet'; payload.defined_in_id = e.defined_in_id || null;
-                    if (e.entity_type === 'symbol_definition') payload.visual_pattern_description = e.visual_pattern_description || null;
-                    if (e.entity_type === 'component_definition') payload.specifications = e.specifications || {};
-                }
-                if (e.entity_type === 'symbol_instance') payload.symbol_definition_id = e.symbol_definition_id;
-                if (e.entity_type === 'component_instance') payload.component_definition_id = e.component_definition_id;
-                const resp = await fetch(`/api/projects/${projectId}/entities`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(payload) });
-                const created = await resp.json();
-                entry.currentId = created?.id;
-                const alias = (get() as any).historyIdMap || {};
-                set({ historyIdMap: { ...alias, [entry.entity.id]: created?.id } } as any);
-                await st.fetchEntities();
-            } else if (entry.type === 'edit_entity') {
-                // Redo edit: apply `after` fields again
-                const payload = { ...(entry.after || {}) };
-                const alias = (get() as any).historyIdMap || {};
-                const id = entry.currentId || alias[entry.id] || entry.id;
-                await fetch(`/api/projects/${projectId}/entities/${id}`, { method: 'PATCH', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(payload) });
-                await st.fetchEntities();
-            } else if (entry.type === 'delete_entity') {
-                const alias = (get() as any).historyIdMap || {};
-                const id = entry.currentId || alias[entry.entity.id] || entry.entity.id;
-                const e = (get() as any).entities.find((x: any) => x.id === id);
-                if (e) await fetch(`/api/projects/${projectId}/entities/${id}`, { method: 'DELETE' });
-                await st.fetchEntities();
-            } else if (entry.type === 'create_links') {
-                const newIds: any[] = [];
-                for (const l of entry.links) {
-                    const resp = await fetch(`/api/projects/${projectId}/links`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ rel_type: l.rel_type, source_id: l.source_id, target_id: l.target_id }) });
-                    const created = await resp.json();
-                    newIds.push(created?.id);
-                }
-                await st.fetchLinks();
-                entry.links = (get() as any).links.filter((x: any) => newIds.includes(x.id));
-            } else if (entry.type === 'delete_links') {
-                for (const l of entry.links) {
-                    // If link id known, delete by id; else search
-                    if (l.id) await fetch(`/api/projects/${projectId}/links/${l.id}`, { method: 'DELETE' });
-                    else {
-                        const match = (get() as any).links.find((x: any) => x.rel_type === l.rel_type && x.source_id === l.source_id && x.target_id === l.target_id);
-                        if (match) await fetch(`/api/projects/${projectId}/links/${match.id}`, { method: 'DELETE' });
-                    }
-                }
-                await st.fetchLinks();
-            }
-        } catch (e) { console.error('Redo failed', e); }
+            const step = await apiStepHistory(projectId, op);
+            set({ historyDepth: { undo: step.undo, redo: step.redo } } as any);
+            // Ids are restored as they were, so delta sync picks up exactly the touched records
+            const stores = new Set(step.changes.map(c => c.store));
+            if (stores.has('entities')) await fetchEntities();
+            if (stores.has('concepts')) await fetchConcepts();
+            if (stores.has('links')) await fetchLinks();
+        } catch (e: any) {
+            console.error(e);
+            addToast({ kind: 'error', message: e?.message || (op === 'undo' ? 'Undo failed' : 'Redo failed') });
+        }
     },
+    undo: async () => get().stepHistory('undo'),
+    redo: async () => get().stepHistory('redo'),
     // Scope creation actions
     startScopeCreation: (type: 'canvas' | 'conceptual') => {
         set({ 
@@ -217,7 +217,6 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
     addToast,
     fetchEntities,
     fetchLinks,
-    pushHistory,
     deleteEntity,
     selectedEntityId,
     setSelectedEntityId,
@@ -237,7 +236,6 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
     addToast: state.addToast,
     fetchEntities: state.fetchEntities,
     fetchLinks: state.fetchLinks,
-    pushHistory: state.pushHistory,
     deleteEntity: state.deleteEntity,
     selectedEntityId: state.selectedEntityId,
     setSelectedEntityId: state.setSelectedEntityId,
@@ -783,18 +781,13 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
             sheetId: String(created.source_sheet_number),
           },
         ]);
-        try {
-          pushHistory({ type: 'create_entity', entity: created });
-        } catch (error) {
-          console.warn('history push failed', error);
-        }
         addToast({ kind: 'success', message: 'Entity duplicated' });
       } catch (error: any) {
         console.error(error);
         addToast({ kind: 'error', message: error?.message || 'Failed to duplicate entity' });
       }
     },
-    [addToast, fetchEntities, pageIndex, pageOcr, pagesMeta, projectId, pushHistory, setSelection]
+    [addToast, fetchEntities, pageIndex, pageOcr, pagesMeta, projectId, setSelection]
   );
 
   const beginEditSession = useCallback(
@@ -893,17 +886,11 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
           return [pdfX1, pdfY1, pdfX2, pdfY2];
         };
 
-        const before = toPdf(beforeRect);
         const after = toPdf(finalRect);
 
         try {
           await patchEntity(projectId, active.id, { bounding_box: after });
           await fetchEntities();
-          try {
-            pushHistory({ type: 'edit_entity', id: active.id, before: { bounding_box: before }, after: { bounding_box: after } });
-          } catch (error) {
-            console.warn('history push failed', error);
-          }
           addToast({ kind: 'success', message: 'Bounding box updated' });
           const updated = entityMeta.get(active.id) ?? entity;
           setSelection([
@@ -934,7 +921,6 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
       pageOcr,
       pagesMeta,
       projectId,
-      pushHistory,
       scale,
       setSelection,
     ]
@@ -1524,11 +1510,6 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
         const created = await createEntity(projectId, payload as any);
         await fetchEntities();
         addToast({ kind: 'success', message: `Instance placed` });
-        try {
-          pushHistory({ type: 'create_entity', entity: created });
-        } catch (error) {
-          console.warn('history push failed', error);
-        }
         // Keep stamping mode active (creatingEntity stays set)
         // User can continue clicking to place more instances
       } catch (error: any) {
@@ -1536,7 +1517,7 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
         addToast({ kind: 'error', message: error?.message || 'Failed to create instance' });
       }
     },
-    [stampSizePts, creatingEntity, projectId, pageIndex, pagesMeta, pageOcr, scale, addToast, fetchEntities, pushHistory]
+    [stampSizePts, creatingEntity, projectId, pageIndex, pagesMeta, pageOcr, scale, addToast, fetchEntities]
   );
 
   const handlePointerDown = useCallback(
@@ -1995,10 +1976,6 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
           closeForm();
           return;
         }
-        const before: Record<string, any> = {};
-        Object.keys(patch).forEach((key) => {
-          before[key] = (entity as any)[key];
-        });
         const attrSource = { ...entity, ...patch };
         Object.assign(patch, deriveEntityFlags(entity.entity_type, attrSource, links));
         try {
@@ -2012,12 +1989,6 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
             },
           ]);
           addToast({ kind: 'success', message: 'Entity updated' });
-          try {
-            const after = { ...patch };
-            pushHistory({ type: 'edit_entity', id: entity.id, before, after });
-          } catch (error) {
-            console.warn('history push failed', error);
-          }
         } catch (error: any) {
           console.error(error);
           addToast({ kind: 'error', message: error?.message || 'Failed to update entity' });
@@ -2061,11 +2032,6 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
               sheetId: pending.sheetId,
             },
           ]);
-          try {
-            pushHistory({ type: 'create_entity', entity: created });
-          } catch (e) {
-            console.warn('history push failed', e);
-          }
           addToast({ kind: 'success', message: 'Drawing created' });
         } catch (error: any) {
           console.error(error);
@@ -2090,11 +2056,6 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
               sheetId: pending.sheetId,
             },
           ]);
-          try {
-            pushHistory({ type: 'create_entity', entity: created });
-          } catch (e) {
-            console.warn('history push failed', e);
-          }
           addToast({ kind: 'success', message: 'Legend created' });
         } catch (error: any) {
           console.error(error);
@@ -2120,11 +2081,6 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
               sheetId: pending.sheetId,
             },
           ]);
-          try {
-            pushHistory({ type: 'create_entity', entity: created });
-          } catch (e) {
-            console.warn('history push failed', e);
-          }
           addToast({ kind: 'success', message: 'Schedule created' });
         } catch (error: any) {
           console.error(error);
@@ -2149,11 +2105,6 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
               sheetId: pending.sheetId,
             },
           ]);
-          try {
-            pushHistory({ type: 'create_entity', entity: created });
-          } catch (e) {
-            console.warn('history push failed', e);
-          }
           addToast({ kind: 'success', message: 'Assembly Group created' });
         } catch (error: any) {
           console.error(error);
@@ -2185,11 +2136,6 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
               sheetId: pending.sheetId,
             },
           ]);
-          try {
-            pushHistory({ type: 'create_entity', entity: created });
-          } catch (e) {
-            console.warn('history push failed', e);
-          }
           addToast({ kind: 'success', message: 'Symbol instance created' });
           
           // Multi-stamp mode: keep drawing active if we're in stamp mode
@@ -2224,11 +2170,6 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
               sheetId: pending.sheetId,
             },
           ]);
-          try {
-            pushHistory({ type: 'create_entity', entity: created });
-          } catch (e) {
-            console.warn('history push failed', e);
-          }
           addToast({ kind: 'success', message: 'Scope created' });
         } catch (error: any) {
           console.error(error);
@@ -2252,11 +2193,6 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
               sheetId: pending.sheetId,
             },
           ]);
-          try {
-            pushHistory({ type: 'create_entity', entity: created });
-          } catch (e) {
-            console.warn('history push failed', e);
-          }
           addToast({ kind: 'success', message: 'Note created' });
         } catch (error: any) {
           console.error(error);
@@ -2312,11 +2248,6 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
                 sheetId: pending.sheetId,
               },
             ]);
-            try {
-              pushHistory({ type: 'create_entity', entity: created });
-            } catch (e) {
-              console.warn('history push failed', e);
-            }
             addToast({ kind: 'success', message: 'Symbol definition created' });
           }
         } catch (error: any) {
@@ -2379,11 +2310,6 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
                 sheetId: pending.sheetId,
               },
             ]);
-            try {
-              pushHistory({ type: 'create_entity', entity: created });
-            } catch (e) {
-              console.warn('history push failed', e);
-            }
             addToast({ kind: 'success', message: 'Component definition created' });
           }
         } catch (error: any) {
@@ -2413,11 +2339,6 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
               sheetId: pending.sheetId,
             },
           ]);
-          try {
-            pushHistory({ type: 'create_entity', entity: created });
-          } catch (e) {
-            console.warn('history push failed', e);
-          }
           addToast({ kind: 'success', message: 'Component instance created' });
           
           // Multi-stamp mode: keep drawing active if we're in stamp mode
@@ -2450,7 +2371,6 @@ export function OverlayLayer({ pageIndex, scale, wrapperRef }: OverlayLayerProps
       inlineForm.pendingBBox,
       inlineForm.type,
       projectId,
-      pushHistory,
       setSelection,
     ]
   );